@@ -5,7 +5,7 @@ import colour
 import os
 import cv2
 import itertools
-from ImageAnalysis.ColorConversion import sRGB_to_lab
+from ImageAnalysis.ColorConversion.sRGB_conversions import sRGB_to_lab_fused
 from ImageAnalysis.ImageIO import readImage
 from typing import Union, List, Any
 
@@ -34,13 +34,15 @@ def extract_lab_validation(input: Union[np.ndarray, str], normalize_by: int)-> n
         return lab_validation
 
         
-def extract_lab(input: Union[np.ndarray, str], convert=True, todtype=np.uint16) -> np.ndarray:
+def extract_lab(input: Union[np.ndarray, str], convert=True, todtype=np.uint16, lab_dtype=np.float64) -> np.ndarray:
         """
         takes input image data (either as a numpy array or a file path), converts it to the Lab color space, 
         using the functions from ImageAnalysis (internal) library,and returns the resulting Lab internal data
 
         :param input: Image data as a numpy array or path to the image file.
         :type input: Union[np.ndarray, str]
+        :param lab_dtype: Data type of the Lab output, np.float32 halves the memory footprint.
+        :type lab_dtype: type
         :return: Lab internal data converted from the input.
         :rtype: numpy.ndarray
         """           
@@ -51,20 +53,22 @@ def extract_lab(input: Union[np.ndarray, str], convert=True, todtype=np.uint16)
                         arr = input.astype(todtype)
         else:
                 arr = input
-        lab_internal = conv_sRGB_to_Lab_internallib(arr)
+        lab_internal = conv_sRGB_to_Lab_internallib(arr, lab_dtype)
         return lab_internal
 
 
-def conv_sRGB_to_Lab_internallib(im: np.ndarray) -> np.ndarray:
+def conv_sRGB_to_Lab_internallib(im: np.ndarray, dtype=np.float64) -> np.ndarray:
         """
-        Convert image from sRGB color space to Lab color space using the function from internal ImageAnalysis library.
+        Convert image from sRGB color space to Lab color space using the fused single pass function from internal ImageAnalysis library.
 
         :param im: Image data in the sRGB color space.
         :type im: numpy.ndarray
+        :param dtype: Data type of the Lab output (np.float32 or np.float64).
+        :type dtype: type
         :return: Image data converted to the Lab color space.
         :rtype: numpy.ndarray
         """
-        return sRGB_to_lab(im)
+        return sRGB_to_lab_fused(im, dtype=dtype)
 
 
 def conv_sRGB_to_lab_externallib(im: np.ndarray) -> np.ndarray:
@@ -142,7 +142,7 @@ def main() -> None:
                 if "T02" in fn and fn[2:4] not in [str(i) for i in range(12, 56)]:
                     coords = (2750, 4892, 100, 100)
                 mask = create_roi_mask(Img, coords)
-                lab_arr = extract_lab(Img[:, :, ::-1], convert=False)
+                lab_arr = extract_lab(Img[:, :, ::-1], convert=False, lab_dtype=np.float32)
                 l_val = np.median(lab_arr[:, :, 0][mask[:, :, 0] == 1])
                 colors_dict[colorname] = (fn, l_val)
                 if SAVE_MASKS_FLAG:
@@ -1,15 +1,17 @@
 import cv2
 import pytesseract
 import re
-from matplotlib import pyplot as plt
 import os
 import pickle
+import argparse
 import numpy as np
-import math
 from time import sleep
 from Util import readData, getAllFiles
 from ImageAnalysis import writeImage, readRGBImage
 from typing import Dict, Tuple
+from bmp_roi import read_image_rois, VIVASCOPE_TEXT_ROIS, VIVASCOPE_SIGN_ROIS
+from ocr_service import parse_overlay_text, OcrService, collect_stacks_and_blocks
+from coord_matching import collect_subject_coordinates, match_stacks_to_blocks, DirectoryIndex
 
 # download and install if necessary ; and assign path to tesseract executable
 pytesseract.pytesseract.tesseract_cmd = r"local_path_to_tessaract_install\Tesseract-OCR\tesseract.exe"
@@ -18,7 +20,7 @@ pytesseract.pytesseract.tesseract_cmd = r"local_path_to_tessaract_install\Tesser
 #1 OCR finding coordinates..................................
 
 
-def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
     """
     Specifies the image slice that corresponds to the text of interest.
 
@@ -26,93 +28,93 @@ def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], np.nda
         imagepath (str): The file path to the image.
 
     Returns:
-        Tuple[Dict[str, np.ndarray], np.ndarray]: A dictionary mapping text labels to their corresponding image slices and the original image.
+        Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]: A dictionary mapping text labels to their corresponding image slices
+        and a dictionary with the pixels at the minus sign of the x and y value.
+        Uncompressed BMPs are read only at these rows (see bmp_roi), other formats are decoded completely.
     """
-    image = cv2.imread(imagepath)
+    rois = read_image_rois(imagepath, dict(VIVASCOPE_TEXT_ROIS, **{"sign_" + k: v for k, v in VIVASCOPE_SIGN_ROIS.items()}))
 
-    text_dict = {
-        "filename": image[1000:1000+22, 0:0+180],
-        "x": image[1019:1019+25, 0:600],
-        "y": image[1019:1019+25, 0:600]
-    }
+    text_dict = {k: rois[k] for k in VIVASCOPE_TEXT_ROIS}
+    sign_dict = {k: rois["sign_" + k] for k in VIVASCOPE_SIGN_ROIS}
 
-    return text_dict, image
+    return text_dict, sign_dict
 
-def get_text_from_crp_img(crp_img: np.ndarray) -> str:
+def get_text_from_crp_img(crp_img: np.ndarray, display: bool = True) -> str:
     """
     Retrieves text, symbols, and digits from a cropped image slice using Tesseract OCR.
 
     Args:
         crp_img (np.ndarray): The cropped image slice.
+        display (bool): Show the thresholded crop with matplotlib, False does not import matplotlib.
 
     Returns:
         str: The extracted text, symbols, and numbers in string format.
     """
     gray_image = cv2.cvtColor(crp_img, cv2.COLOR_BGR2GRAY)
 
-    # Apply thresholding
-    threshold_image = cv2.threshold(gray_image, 1, 255, cv2.THRESH_BINARY_INV)[1]
+    if display:
+        from matplotlib import pyplot as plt
 
-    plt.imshow(threshold_image)
+        # Apply thresholding
+        threshold_image = cv2.threshold(gray_image, 1, 255, cv2.THRESH_BINARY_INV)[1]
+
+        plt.imshow(threshold_image)
 
     # Apply OCR
     text = pytesseract.image_to_string(gray_image)
 
     return text
 
-def extract_text_from_img_coords(img_path: str) -> Tuple[str, str, str]:
+def extract_text_from_img_coords(img_path: str, display: bool = True) -> Tuple[str, str, str]:
     """
     Extracts text from an image using OCR and processes the output to retrieve specific information.
 
     Args:
         img_path (str): The file path to the image.
+        display (bool): Show the crops with matplotlib.
 
     Returns:
         Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
     """
-    filename_regx = r"v[0-9]*.bmp"
-
-    img_coords_dict, img = create_img_coord_dict(img_path)
+    img_coords_dict, sign_dict = create_img_coord_dict(img_path)
 
     extracted_text_dict = {}
     for k, v in img_coords_dict.items():
-        text = get_text_from_crp_img(v)
+        text = get_text_from_crp_img(v, display)
         extracted_text_dict[k] = str(text)
 
     print(extracted_text_dict)
 
-    filename = re.search(filename_regx, extracted_text_dict["filename"]).group(0)
-    x_coord = re.findall(r'[-+]?\d*\.\d+', extracted_text_dict["x"])[0]
-    imgx = np.array(img[1029:1029+3, 21:21+1])
-
-    # Count the number of black pixels in the image
-    num_black_pixels_x = np.count_nonzero(imgx == 0)
-
-    if x_coord[0] != "-" and num_black_pixels_x == 3:
-        x_coord = "-" + x_coord
-
-    y_coord = re.findall(r'[-+]?\d*\.\d+', extracted_text_dict["y"])[1]
-    imgy = np.array(img[1029:1029+3, 105:105+1])
-
-    # Count the number of black pixels in the image
-    num_black_pixels_y = np.count_nonzero(imgy == 0)
-
-    if y_coord[0] != "-" and num_black_pixels_y == 3:
-        y_coord = "-" + y_coord
-
-    print(num_black_pixels_x, num_black_pixels_y)
+    filename, x_coord, y_coord = parse_overlay_text(extracted_text_dict, sign_dict)
     print(filename, x_coord, y_coord)
 
     return filename, x_coord, y_coord
 
-def create_pickled_dict_containing_stacks_and_blocks_per_subject(inpath: str, outpath_pickle: str) -> None:
+def create_pickled_dict_containing_stacks_and_blocks_per_subject(inpath: str, outpath_pickle: str, workers: int = 1,
+                                                                  display: bool = True, ocr_cache: str = None,
+                                                                  glyph_templates: str = None) -> None:
     """
     Creates a pickled dictionary containing stacks and blocks per subject.
 
     Args:
         inpath (str): The input directory path.
         outpath_pickle (str): The output path for the pickled dictionary.
+        workers (int): The number of OCR worker processes (ocr_service, nothing is displayed), 1 runs the OCR serially.
+        display (bool): Show the crops with matplotlib in the serial OCR.
+        ocr_cache (str): SQLite file of the OCR cache (ocr_service, nothing is displayed), crops read in an earlier run
+            are not read again, defaults to None.
+        glyph_templates (str): The .npz file of glyph_ocr.py, reads the overlay by glyph templates (ocr_service,
+            nothing is displayed) and tesseract only for crops read with low confidence, defaults to None.
     """
+    if workers > 1 or ocr_cache is not None or glyph_templates is not None:
+        engine = "auto" if glyph_templates is None else "glyph"
+        with OcrService(workers, engine, pytesseract.pytesseract.tesseract_cmd, cache=ocr_cache,
+                        templates=glyph_templates) as service:
+            subj_dict = collect_stacks_and_blocks(inpath, service)
+        with open(outpath_pickle, "wb") as f:
+            pickle.dump(subj_dict, f)
+        return
+
     subj_dict = {}
     for root, dirs, _ in os.walk(inpath):
         if len(dirs) != 0:
@@ -126,7 +128,7 @@ def create_pickled_dict_containing_stacks_and_blocks_per_subject(inpath: str, ou
                     img_tup_list_temp = []
                     for imgname in os.listdir(folderpath):
                         if imgname[0] == "v" and "#" not in imgname:
-                            fn, x, y = extract_text_from_img_coords(os.path.join(folderpath, imgname))
+                            fn, x, y = extract_text_from_img_coords(os.path.join(folderpath, imgname), display)
                             img_tup_list_temp.append((x, y, os.path.join(folderpath, fn)))
                     Block_dict[dirname] = img_tup_list_temp
 
@@ -135,7 +137,7 @@ def create_pickled_dict_containing_stacks_and_blocks_per_subject(inpath: str, ou
                     folderpath = os.path.join(root, dirname)
                     for imgname in os.listdir(folderpath):
                         if imgname == "v0000000.bmp":
-                            fn, x, y = extract_text_from_img_coords(os.path.join(os.path.join(root, dirname), imgname))
+                            fn, x, y = extract_text_from_img_coords(os.path.join(os.path.join(root, dirname), imgname), display)
                     Stack_dict[dirname] = (x, y, os.path.join(folderpath, fn))
 
             if subj_no is not None and "S" in subj_no:
@@ -147,28 +149,31 @@ def create_pickled_dict_containing_stacks_and_blocks_per_subject(inpath: str, ou
 
 
 #2 marking block images according to closest stacks..................................
-def mark_block_images_according_to_stack_coordinates(inpath: str, main_dict_path: str) -> None:
+def mark_block_images_according_to_stack_coordinates(inpath: str, main_dict_path: str,
+                                                      max_distance: float = None) -> None:
     """
     Marks block images according to the closest stack coordinates.
 
     Args:
         inpath (str): The input directory path.
         main_dict_path (str): The path to the main dictionary.
+        max_distance (float): Stacks farther away from every image of a block are not marked in that block,
+            defaults to None (every stack is marked in every block).
     """
     main_dict = readData(main_dict_path)
+    directories = DirectoryIndex(inpath)
 
     for subj in main_dict.keys():
-        for block_name, v in main_dict[subj][1].items():
-            block_path = [r for r, _, _ in os.walk(inpath) if subj in r and block_name in r][0]
+        # nearest block image of all stacks per block by a KD-tree query (coord_matching)
+        subject = collect_subject_coordinates(main_dict[subj])
+        for block_name, matches in match_stacks_to_blocks(subject, max_distance).items():
+            block_path = directories.find(subj, block_name)
 
-            block_coordinates = [(float(x[0]), float(x[1])) for x in main_dict[subj][1][block_name]]
-            for stack_name, v in main_dict[subj][0].items():
-                target = (float(v[0]), float(v[1]))
-                print(stack_name, min(enumerate(block_coordinates), key=lambda point: math.hypot(target[1]-point[1][1], target[0]-point[1][0])))
+            block_coordinates = subject.block_xy[block_name]
+            for stack_name, best_image_idx, _ in matches:
+                print(stack_name, (best_image_idx, tuple(block_coordinates[best_image_idx].tolist())))
 
-                best_image_data = min(enumerate(block_coordinates), key=lambda point: math.hypot(target[1]-point[1][1], target[0]-point[1][0]))
-
-                target_image = os.path.join(block_path, "v0000%03d.bmp" % best_image_data[0])
+                target_image = os.path.join(block_path, "v0000%03d.bmp" % best_image_idx)
 
                 arr = cv2.imread(target_image)
 
@@ -205,10 +210,11 @@ def create_mosaic_from_marked_stacks(inpath: str, main_dict_path: str) -> None:
         main_dict_path (str): The path to the main dictionary.
     """
     main_dict = readData(main_dict_path)
+    directories = DirectoryIndex(inpath)
 
     for subj in main_dict.keys():
         for block_name, _ in main_dict[subj][1].items():
-            block_path = [r for r, _, _ in os.walk(inpath) if subj in r and block_name in r][0]
+            block_path = directories.find(subj, block_name)
             block_name = block_name.replace(" #", "")
             mosaic_name = f"{subj}_F1_T2_{block_name}.png"
             out_path = os.path.join(block_path, mosaic_name)
@@ -236,10 +242,18 @@ def main() -> None:
     """
     Main function to process images, create pickled dictionaries, mark block images, and create mosaics.
     """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="OCR worker processes, 1 runs the OCR serially")
+    parser.add_argument("--no-display", action="store_true", help="do not show the crops with matplotlib")
+    parser.add_argument("--ocr-cache", default=None, help="SQLite file of the OCR cache, crops read before are not read again")
+    parser.add_argument("--glyph-templates", default=None, help="templates of glyph_ocr.py, tesseract only reads uncertain crops")
+    args = parser.parse_args()
+
     PATH = r"path_to_images"
     OUTPATH = os.path.join(r"path_to_images\data", PATH.split("\\")[-1] + "_pickled_dict.pkl")
 
-    create_pickled_dict_containing_stacks_and_blocks_per_subject(PATH, OUTPATH)
+    create_pickled_dict_containing_stacks_and_blocks_per_subject(PATH, OUTPATH, args.workers, not args.no_display,
+                                                                 args.ocr_cache, args.glyph_templates)
     # sleep(5)
     # mark_block_images_according_to_stack_coordinates(PATH, OUTPATH)
     # sleep(5)
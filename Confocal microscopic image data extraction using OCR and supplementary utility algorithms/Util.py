@@ -40,6 +40,9 @@ from builtins import input
 from future import standard_library
 from past.utils import old_div
 standard_library.install_aliases()
+# file name parsing (one compiled parse mask per process) is shared with the file wrangling Util
+from ImageAnalysis.Util import (compile_parse_mask, getDataFromFile, getDataFromFile_traits, parse_parameter_definition,
+                                parse_parameter_definition_traits)
 
 UTIL_LOGGER = logging.getLogger("Util_logger")
 UTIL_LOGGER.setLevel(logging.DEBUG)
@@ -824,120 +827,6 @@ def parseParameterDefinition(value: object, paraName: str) -> object:
         return value
 
 
-def parse_parameter_definition(value: object, paraName: str) -> object:
-    """if the parameter name has the format xy_int_xy or xy__float_xy returns the value as int/float else the original value
-
-    :param value: value of the parameter
-    :type value: object
-    :param paraName: parameter name
-    :type paraName: str
-    :return: value as int/float/original value
-    :rtype: object
-    """
-    name = paraName.split('_')[0]
-    typ = paraName.split('_')[1]
-    if typ == "int":
-        return int(value)
-    elif typ == "float":
-        return float(value)
-    else:
-        return value
-
-
-def parse_parameter_definition_traits(value: object, typ: str) -> object:
-    """if the type is "int" or "float" returns the value as int or float, else return original value
-
-    :param value: value of the type
-    :type value: object
-    :param typ: type as str
-    :type typ: str
-    :return: value as int/float/original value
-    :rtype: object
-    """
-    if typ == "int":
-        return int(value)
-    elif typ == "float":
-        return float(value)
-    else:
-        return value
-
-
-def getDataFromFile_traits(filename: str, parseMask: str, parseParameters: list[object]) -> list[object]:
-    """gets traits from file
-
-    :param filename: path of the file
-    :type filename: str
-    :param parseMask: regular expression pattern must have same amount of groups as parseParameters have elements
-    :type parseMask: str
-    :param parseParameters: list of parameters to parse
-    :type parseParameters: list of parameters
-    :return: list of the parsed parameters
-    :rtype: list
-    """
-    fileformat = re.compile(parseMask)
-    m = fileformat.search(os.path.split(filename)[-1])
-    if m is None:
-        return None
-    else:
-        outList = []
-        for para in range(len(parseParameters)):
-            outList.append(parse_parameter_definition_traits(
-                m.group(para+1), parseParameters[para].type))
-        outList.append(filename)
-    return outList
-
-
-def getDataFromFile(filename: str, parseMask: str, parseParameters: object) -> list[str, str, str, object]:
-    """returns data parsed from filename (without path)
-
-    :param filename: file name (base)
-    :type filename: str
-    :param parseMask: regular expression pattern
-    :type parseMask: str
-    :param parseParameters: parameters to parse
-    :type parseParameters: list
-    :raises Exception: different values
-    :return: [subj, area, day, type(Lesion or not)]
-    :rtype: list[str, str, str,object]
-    """
-    if str(type(parseParameters)).find("traits.") >= 0:
-        return getDataFromFile_traits(filename, parseMask, parseParameters)
-    elif isinstance(parseMask, (list, tuple)):  # parse list of filesmasks
-        filename_local = filename
-        out_dict = {}
-        for idx, parseMask_loc in enumerate(parseMask[::-1]):
-            filename_local, fname = os.path.split(filename_local)
-            if parseMask_loc is not None:
-                ol = getDataFromFile(fname, parseMask_loc, parseParameters)
-                if ol is None:
-                    return None
-                for value, param in zip(ol[:-1], parseParameters):
-                    if value is None:
-                        continue
-                    if param in out_dict:
-                        if out_dict[param] != value:
-                            raise Exception
-                    out_dict[param] = value
-        outList = []
-        for param in parseParameters:
-            if param in out_dict:
-                outList.append(out_dict[param])
-            else:
-                outList.append(None)
-        outList.append(filename)
-        return outList
-    else:
-        fileformat = re.compile(parseMask)
-        m = fileformat.search(os.path.split(filename)[-1])
-        if m is None:
-            return None
-        else:
-            outList = [parse_parameter_definition(
-                m.group(para), para) for para in parseParameters]
-            outList.append(filename)
-            return outList
-
-
 class NumPyArangeEncoder(json.JSONEncoder):
     """Class for encoding NumpyArray to json (helper class for json encoding)
 
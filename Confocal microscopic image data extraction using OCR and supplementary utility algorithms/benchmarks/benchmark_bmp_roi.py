@@ -0,0 +1,151 @@
+"""
+Benchmark of the OCR crops: full decode with cv2.imread and slicing against bmp_roi.read_image_rois, which reads only
+the scanlines of the text overlay. Writes synthetic VivaScope like BMPs (8 bit grayscale, 1000 x 1050 by default) or uses
+the BMPs of --directory, checks that both paths return equal crops and reports images per second and bytes per image.
+
+usage:
+    python benchmark_bmp_roi.py --images 500 --output bmp_roi.json
+    python benchmark_bmp_roi.py --directory path_to_images\\S03\\F1_T1\\VivaBlock_1
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Optional
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bmp_roi import read_bmp_layout, read_image_rois, VIVASCOPE_TEXT_ROIS, VIVASCOPE_SIGN_ROIS  # noqa: E402
+
+ROIS = dict(VIVASCOPE_TEXT_ROIS, **{"sign_" + k: v for k, v in VIVASCOPE_SIGN_ROIS.items()})
+
+
+def create_images(directory: str, images: int, width: int, height: int, seed: int = 0) -> list:
+    """
+    Writes grayscale BMPs with random pixels and a white text band.
+
+    Args:
+        directory (str): The output directory.
+        images (int): The number of images.
+        width (int): The image width.
+        height (int): The image height.
+        seed (int): The random seed.
+
+    Returns:
+        list: The file paths.
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    for idx in range(images):
+        image = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        image[1000:] = 255
+        path = os.path.join(directory, "v%07d.bmp" % idx)
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def full_decode(path: str) -> Dict[str, np.ndarray]:
+    """
+    Crops like create_img_coord_dict before bmp_roi.
+
+    Args:
+        path (str): The file path to the image.
+
+    Returns:
+        Dict[str, np.ndarray]: The crops by name.
+    """
+    image = cv2.imread(path)
+    return {name: image[rows, cols] for name, (rows, cols) in ROIS.items()}
+
+
+def timed(function: Callable, paths: list) -> tuple:
+    """
+    Runs function over all paths.
+
+    Args:
+        function (Callable): The crop function.
+        paths (list): The images.
+
+    Returns:
+        tuple: The crops per image and the wall time in s.
+    """
+    start = time.perf_counter()
+    crops = [function(path) for path in paths]
+    return crops, time.perf_counter() - start
+
+
+def roi_bytes(path: str) -> int:
+    """
+    Bytes of the scanlines read by read_image_rois, the whole file for formats decoded completely.
+
+    Args:
+        path (str): The file path to the image.
+
+    Returns:
+        int: The number of bytes.
+    """
+    layout = read_bmp_layout(path)
+    if layout is None:
+        return os.path.getsize(path)
+    rows = set()
+    for row_slice, _ in ROIS.values():
+        rows.update(range(*row_slice.indices(layout.height)))
+    return layout.offset + len(rows) * layout.row_stride
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Runs both paths and writes the json.
+
+    Args:
+        argv (Optional[list]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if the crops differ.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", default=None, help="BMPs to use instead of synthetic images")
+    parser.add_argument("--images", type=int, default=500)
+    parser.add_argument("--width", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=1050)
+    parser.add_argument("--output", default="bmp_roi_results.json")
+    args = parser.parse_args(argv)
+
+    temp_directory = None
+    if args.directory is None:
+        temp_directory = tempfile.mkdtemp(prefix="bmp_roi_")
+        paths = create_images(temp_directory, args.images, args.width, args.height)
+    else:
+        paths = sorted(glob.glob(os.path.join(args.directory, "*.bmp")))
+    try:
+        # warm the page cache, both paths read from memory
+        for path in paths:
+            with open(path, "rb") as f:
+                f.read()
+        full_crops, full_s = timed(full_decode, paths)
+        roi_crops, roi_s = timed(lambda path: read_image_rois(path, ROIS), paths)
+        equal = all(np.array_equal(full[name], roi[name]) for full, roi in zip(full_crops, roi_crops) for name in ROIS)
+        file_bytes = sum(os.path.getsize(path) for path in paths) / len(paths)
+        read_bytes = sum(roi_bytes(path) for path in paths) / len(paths)
+    finally:
+        if temp_directory is not None:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+    results = {"images": len(paths), "full_decode_images_per_s": len(paths) / full_s,
+               "roi_images_per_s": len(paths) / roi_s, "file_kb": file_bytes / 1024, "roi_kb": read_bytes / 1024,
+               "equal": equal}
+    print("full decode %8.0f images/s  %8.1f kB per image" % (results["full_decode_images_per_s"], results["file_kb"]))
+    print("roi reader  %8.0f images/s  %8.1f kB per image" % (results["roi_images_per_s"], results["roi_kb"]))
+    print("crops equal: %s" % equal)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    return 0 if equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Benchmark of the stack to block matching: the linear min(..., key=math.hypot) per stack and block of
+mark_block_images_according_to_stack_coordinates before coord_matching against coord_matching.match_stacks_to_blocks
+(one cKDTree query per block for all stacks) on random stage positions and on block images of a regular grid with
+stacks between them (ties of the distance), and one os.walk per block against coord_matching.DirectoryIndex on a
+synthetic folder tree. Fails if the matched images differ.
+
+usage:
+    python benchmark_coord_matching.py --stacks 10000 --block-images 1000
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from coord_matching import collect_subject_coordinates, match_stacks_to_blocks, DirectoryIndex  # noqa: E402
+
+
+def create_subject(stacks: int, block_images: int, images_per_block: int, seed: int = 0) -> list:
+    """
+    Random stage positions in the structure of create_pickled_dict_containing_stacks_and_blocks_per_subject.
+
+    Args:
+        stacks (int): The number of stacks.
+        block_images (int): The number of block images, split into blocks of images_per_block.
+        images_per_block (int): The images per block.
+        seed (int): The random seed.
+
+    Returns:
+        list: [Stack_dict, Block_dict] of one subject.
+    """
+    rng = np.random.default_rng(seed)
+    stack_dict = {"VivaStack_%d" % idx: ("%.2f" % x, "%.2f" % y, "v0000000.bmp")
+                  for idx, (x, y) in enumerate(rng.uniform(-9999, 9999, (stacks, 2)))}
+    block_dict = {}
+    for idx, (x, y) in enumerate(rng.uniform(-9999, 9999, (block_images, 2))):
+        block_dict.setdefault("VivaBlock_%d" % (idx // images_per_block + 1), []).append(
+            ("%.2f" % x, "%.2f" % y, "v%07d.bmp" % (idx % images_per_block)))
+    return [stack_dict, block_dict]
+
+
+def create_grid_subject(stacks: int, blocks: int, side: int = 12, step: float = 0.8, seed: int = 0) -> list:
+    """
+    Block images on a regular side x side grid with stage positions of 3 decimals like the OCR, the stacks lie on
+    the middle between two images or four images of a block, so several images are nearest.
+
+    Args:
+        stacks (int): The number of stacks.
+        blocks (int): The number of blocks.
+        side (int): The images per row and column of a block.
+        step (float): The distance of neighbouring images.
+        seed (int): The random seed.
+
+    Returns:
+        list: [Stack_dict, Block_dict] of one subject.
+    """
+    rng = np.random.default_rng(seed)
+    origins = np.round(rng.uniform(-9999, 9999, (blocks, 2)), 3)
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side)), axis=-1).reshape(-1, 2) * step
+    block_dict = {"VivaBlock_%d" % (block + 1): [("%.3f" % x, "%.3f" % y, "v%07d.bmp" % idx)
+                                                 for idx, (x, y) in enumerate(origin + grid)]
+                  for block, origin in enumerate(origins)}
+    # cell of the grid and offset of half a step in x, y or both
+    cells = rng.integers(0, side - 1, (stacks, 2)) * step
+    offsets = np.array([(0.5, 0), (0, 0.5), (0.5, 0.5)])[rng.integers(0, 3, stacks)] * step
+    positions = origins[rng.integers(0, blocks, stacks)] + cells + offsets
+    stack_dict = {"VivaStack_%d" % idx: ("%.3f" % x, "%.3f" % y, "v0000000.bmp") for idx, (x, y) in enumerate(positions)}
+    return [stack_dict, block_dict]
+
+
+def linear_matches(subject_entry: list) -> Dict[str, list]:
+    """
+    The matching of mark_block_images_according_to_stack_coordinates before coord_matching.
+
+    Args:
+        subject_entry (list): [Stack_dict, Block_dict] of a subject.
+
+    Returns:
+        Dict[str, list]: (stack name, image index) per block.
+    """
+    matches = {}
+    for block_name, images in subject_entry[1].items():
+        block_coordinates = [(float(x[0]), float(x[1])) for x in images]
+        matches[block_name] = []
+        for stack_name, v in subject_entry[0].items():
+            target = (float(v[0]), float(v[1]))
+            best_image_data = min(enumerate(block_coordinates), key=lambda point: math.hypot(target[1]-point[1][1], target[0]-point[1][0]))
+            matches[block_name].append((stack_name, best_image_data[0]))
+    return matches
+
+
+def create_folders(directory: str, subjects: int, blocks: int) -> list:
+    """
+    Writes an empty study folder tree.
+
+    Args:
+        directory (str): The output directory.
+        subjects (int): The number of subjects.
+        blocks (int): The number of VivaBlock folders per subject.
+
+    Returns:
+        list: (subject, block name) of every block folder.
+    """
+    keys = []
+    for subj in range(1, subjects + 1):
+        for block in range(1, blocks + 1):
+            os.makedirs(os.path.join(directory, "S%02d" % subj, "F1_T1", "VivaBlock_%d" % block))
+            keys.append(("S%02d" % subj, "VivaBlock_%d" % block))
+    return keys
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Runs both matchings and directory lookups and writes the json.
+
+    Args:
+        argv (Optional[list]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if the matches or folders differ.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stacks", type=int, default=10000)
+    parser.add_argument("--block-images", type=int, default=1000)
+    parser.add_argument("--images-per-block", type=int, default=144, help="12 x 12 like create_mosaic_from_marked_stacks")
+    parser.add_argument("--grid-stacks", type=int, default=1000, help="stacks between the images of the grid blocks")
+    parser.add_argument("--grid-blocks", type=int, default=10, help="blocks of 12 x 12 images on a regular grid")
+    parser.add_argument("--subjects", type=int, default=20, help="subjects of the folder tree")
+    parser.add_argument("--blocks", type=int, default=10, help="block folders per subject of the folder tree")
+    parser.add_argument("--output", default="coord_matching_results.json")
+    args = parser.parse_args(argv)
+
+    subject_entry = create_subject(args.stacks, args.block_images, args.images_per_block)
+    start = time.perf_counter()
+    linear = linear_matches(subject_entry)
+    linear_s = time.perf_counter() - start
+    start = time.perf_counter()
+    subject = collect_subject_coordinates(subject_entry)
+    tree = {block_name: [(stack_name, idx) for stack_name, idx, _ in matches]
+            for block_name, matches in match_stacks_to_blocks(subject).items()}
+    tree_s = time.perf_counter() - start
+    equal = linear == tree
+
+    # ties: stacks between the images of a regular grid
+    grid_entry = create_grid_subject(args.grid_stacks, args.grid_blocks)
+    grid_tree = {block_name: [(stack_name, idx) for stack_name, idx, _ in matches]
+                 for block_name, matches in match_stacks_to_blocks(collect_subject_coordinates(grid_entry)).items()}
+    grid_linear = linear_matches(grid_entry)
+    grid_differences = sum(a != b for block_name in grid_linear for a, b in zip(grid_linear[block_name], grid_tree[block_name]))
+    grid_equal = grid_linear == grid_tree
+    equal = equal and grid_equal
+
+    directory = tempfile.mkdtemp(prefix="coord_matching_")
+    try:
+        keys = create_folders(directory, args.subjects, args.blocks)
+        start = time.perf_counter()
+        walked = [[r for r, _, _ in os.walk(directory) if subj in r and block_name in r][0] for subj, block_name in keys]
+        walk_s = time.perf_counter() - start
+        start = time.perf_counter()
+        directories = DirectoryIndex(directory)
+        indexed = [directories.find(subj, block_name) for subj, block_name in keys]
+        index_s = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    equal = equal and walked == indexed
+
+    results = {"stacks": args.stacks, "block_images": args.block_images, "linear_s": linear_s, "tree_s": tree_s,
+               "grid_stacks": args.grid_stacks, "grid_blocks": args.grid_blocks, "grid_differences": grid_differences,
+               "block_folders": len(keys), "walk_per_block_s": walk_s, "directory_index_s": index_s, "equal": equal}
+    print("%d stacks x %d block images" % (args.stacks, args.block_images))
+    print("linear min   %8.3f s" % linear_s)
+    print("cKDTree      %8.3f s  (%.0fx)" % (tree_s, linear_s / tree_s))
+    print("grid with ties: %d stacks x %d blocks, %d matches differ" % (args.grid_stacks, args.grid_blocks,
+                                                                       grid_differences))
+    print("%d block folders: os.walk per block %.3f s, DirectoryIndex %.3f s" % (len(keys), walk_s, index_s))
+    print("results equal: %s" % equal)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    return 0 if equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark of the glyph template OCR against tesseract: writes synthetic VivaBlock images with a rendered text overlay
+(signed coordinates), learns the templates from the labelled crops of the first --train images and reads the other
+images with the glyph engine and with tesseract. Reports images per second, the share of images read correctly
+(tesseract without sign, its sign comes from the pixel check at the positions of the real overlay font) and the crops
+passed to the fallback. Fails if the glyph engine reads less than --min-correct of the images correctly.
+
+usage:
+    python benchmark_glyph_ocr.py --images 300 --train 50
+    python benchmark_glyph_ocr.py --tessdata path_to_tessdata
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bmp_roi import read_image_rois, VIVASCOPE_TEXT_ROIS  # noqa: E402
+from glyph_ocr import learn_glyph_templates  # noqa: E402
+from ocr_service import create_ocr_engine, read_overlay  # noqa: E402
+
+
+def create_images(directory: str, images: int, seed: int = 0) -> Dict[str, Tuple[str, str, str]]:
+    """
+    Writes 8 bit BMPs with random content and the overlay text (dark on light) below.
+
+    Args:
+        directory (str): The output directory.
+        images (int): The number of images.
+        seed (int): The random seed.
+
+    Returns:
+        Dict[str, Tuple[str, str, str]]: The expected (filename, x, y) per image path.
+    """
+    rng = np.random.default_rng(seed)
+    expected = {}
+    for idx in range(images):
+        name = "v%07d.bmp" % idx
+        x, y = "%.2f" % rng.uniform(-9999, 9999), "%.2f" % rng.uniform(-9999, 9999)
+        image = np.full((1050, 1000), 255, dtype=np.uint8)
+        image[:1000] = rng.integers(0, 256, (1000, 1000), dtype=np.uint8)
+        cv2.putText(image, name, (2, 1016), cv2.FONT_HERSHEY_DUPLEX, 0.5, 0, 1, cv2.LINE_AA)
+        cv2.putText(image, "X: %s um  Y: %s um" % (x, y), (2, 1038), cv2.FONT_HERSHEY_DUPLEX, 0.5, 0, 1, cv2.LINE_AA)
+        path = os.path.join(directory, name)
+        cv2.imwrite(path, image)
+        expected[path] = (name, x, y)
+    return expected
+
+
+def labelled_crops(expected: Dict[str, Tuple[str, str, str]]) -> List[Tuple[np.ndarray, str]]:
+    """
+    The overlay crops of the images with their text.
+
+    Args:
+        expected (Dict[str, Tuple[str, str, str]]): The expected (filename, x, y) per image path.
+
+    Returns:
+        List[Tuple[np.ndarray, str]]: The crops and labels.
+    """
+    samples = []
+    for path, (name, x, y) in expected.items():
+        crops = read_image_rois(path, VIVASCOPE_TEXT_ROIS)
+        samples.append((crops["filename"], name))
+        samples.append((crops["x"], "X: %s um Y: %s um" % (x, y)))
+    return samples
+
+
+def run(engine: object, expected: Dict[str, Tuple[str, str, str]], signed: bool) -> Dict[str, float]:
+    """
+    Reads the images and compares the result.
+
+    Args:
+        engine (object): The OCR engine.
+        expected (Dict[str, Tuple[str, str, str]]): The expected (filename, x, y) per image path.
+        signed (bool): Compare the coordinates with sign.
+
+    Returns:
+        Dict[str, float]: images per second and the share read correctly.
+    """
+    correct = 0
+    start = time.perf_counter()
+    for path, (name, x, y) in expected.items():
+        try:
+            result = read_overlay(path, engine)
+        except ValueError:
+            continue
+        if not signed:
+            result, x, y = (result[0], result[1].lstrip("-"), result[2].lstrip("-")), x.lstrip("-"), y.lstrip("-")
+        correct += result == (name, x, y)
+    duration = time.perf_counter() - start
+    return {"images_per_s": len(expected) / duration, "correct": correct / len(expected)}
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Learns the templates, runs both engines and writes the json.
+
+    Args:
+        argv (Optional[list]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if the glyph engine reads too few images correctly.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=300)
+    parser.add_argument("--train", type=int, default=50, help="images to learn the templates from")
+    parser.add_argument("--engine", choices=["auto", "tesserocr", "pytesseract"], default="auto")
+    parser.add_argument("--tesseract-cmd", default=None)
+    parser.add_argument("--tessdata", default=None)
+    parser.add_argument("--min-correct", type=float, default=0.99)
+    parser.add_argument("--output", default="glyph_ocr_results.json")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="glyph_ocr_")
+    try:
+        expected = create_images(directory, args.images)
+        paths = list(expected)
+        train = {path: expected[path] for path in paths[:args.train]}
+        test = {path: expected[path] for path in paths[args.train:]}
+        templates_file = os.path.join(directory, "glyph_templates.npz")
+        templates = learn_glyph_templates(labelled_crops(train))
+        templates.save(templates_file)
+
+        glyph = create_ocr_engine("glyph", args.tesseract_cmd, args.tessdata, templates=templates_file)
+        glyph_result = run(glyph, test, signed=True)
+        glyph_result["fallbacks"] = glyph.engine.fallbacks
+        glyph.close()
+        tesseract = create_ocr_engine(args.engine, args.tesseract_cmd, args.tessdata)
+        tesseract_result = run(tesseract, test, signed=False)
+        tesseract_result["engine"] = tesseract.name
+        tesseract.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print("templates '%s', space gap %.1f px" % ("".join(templates.chars), templates.space_gap))
+    print("glyph       %8.1f images/s  correct %5.1f %% (with sign)  %d crops to the fallback" % (
+        glyph_result["images_per_s"], 100 * glyph_result["correct"], glyph_result["fallbacks"]))
+    print("%-11s %8.1f images/s  correct %5.1f %% (without sign)" % (
+        tesseract_result["engine"], tesseract_result["images_per_s"], 100 * tesseract_result["correct"]))
+    print("speedup %.0fx" % (glyph_result["images_per_s"] / tesseract_result["images_per_s"]))
+    with open(args.output, "w") as f:
+        json.dump({"images": len(test), "glyph": glyph_result, "tesseract": tesseract_result}, f, indent=4)
+    return 0 if glyph_result["correct"] >= args.min_correct else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
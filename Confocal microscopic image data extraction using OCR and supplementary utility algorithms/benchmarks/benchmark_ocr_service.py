@@ -0,0 +1,103 @@
+"""
+Benchmark of the OCR worker pool: writes a synthetic study (VivaBlock images with a rendered text overlay),
+runs ocr_service.collect_stacks_and_blocks with 1, 4 and 8 workers and reports images per second and the share of
+images whose file name and coordinates (without sign) were read correctly. Fails if the results differ between worker counts.
+
+usage:
+    python benchmark_ocr_service.py --images 400 --workers 1 4 8
+    python benchmark_ocr_service.py --engine pytesseract --tesseract-cmd "C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ocr_service import OcrService, collect_stacks_and_blocks  # noqa: E402
+
+
+def create_study(directory: str, images: int, seed: int = 0) -> Dict[str, Tuple[str, str]]:
+    """
+    Writes 8 bit BMPs with random content and the overlay text below, 100 images per VivaBlock folder.
+
+    Args:
+        directory (str): The output directory.
+        images (int): The number of images.
+        seed (int): The random seed.
+
+    Returns:
+        Dict[str, Tuple[str, str]]: The expected (x, y) per image path.
+    """
+    rng = np.random.default_rng(seed)
+    expected = {}
+    for idx in range(images):
+        folder = os.path.join(directory, "S01", "F1_T1", "VivaBlock_%d" % (idx // 100 + 1))
+        os.makedirs(folder, exist_ok=True)
+        name = "v%07d.bmp" % (idx % 100)
+        x, y = "%.2f" % rng.uniform(100, 9999), "%.2f" % rng.uniform(100, 9999)
+        image = np.zeros((1050, 1000), dtype=np.uint8)
+        image[:1000] = rng.integers(0, 256, (1000, 1000), dtype=np.uint8)
+        cv2.putText(image, name, (2, 1016), cv2.FONT_HERSHEY_DUPLEX, 0.5, 255, 1, cv2.LINE_AA)
+        cv2.putText(image, "X: %s um  Y: %s um" % (x, y), (2, 1038), cv2.FONT_HERSHEY_DUPLEX, 0.5, 255, 1, cv2.LINE_AA)
+        cv2.imwrite(os.path.join(folder, name), image)
+        expected[os.path.join(folder, name)] = (x, y)
+    return expected
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Runs the service per worker count and writes the json.
+
+    Args:
+        argv (Optional[list]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if the results differ between worker counts.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--engine", choices=["auto", "tesserocr", "pytesseract"], default="auto")
+    parser.add_argument("--tesseract-cmd", default=None)
+    parser.add_argument("--tessdata", default=None)
+    parser.add_argument("--output", default="ocr_service_results.json")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="ocr_service_")
+    results = []
+    outputs = []
+    try:
+        expected = create_study(directory, args.images)
+        for workers in args.workers:
+            start = time.perf_counter()
+            with OcrService(workers, args.engine, args.tesseract_cmd, args.tessdata) as service:
+                subj_dict = collect_stacks_and_blocks(directory, service)
+                engine = service.engine.name if service.engine is not None else args.engine
+            duration = time.perf_counter() - start
+            # the minus sign check looks at fixed pixels of the real overlay font, compare without sign
+            found = {path: (x.lstrip("-"), y.lstrip("-"))
+                     for block in subj_dict.get("S01", [{}, {}])[1].values() for x, y, path in block}
+            correct = sum(found.get(path) == coords for path, coords in expected.items())
+            record = {"workers": workers, "engine": engine, "images": len(expected), "wall_s": duration,
+                      "images_per_s": len(expected) / duration, "correct": correct / len(expected)}
+            print("workers %2d  %-11s %8.1f images/s  correct %5.1f %%" % (
+                workers, engine, record["images_per_s"], 100 * record["correct"]))
+            results.append(record)
+            outputs.append(json.dumps(subj_dict, sort_keys=True))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    identical = len(set(outputs)) <= 1
+    print("results identical: %s (cpus: %d)" % (identical, os.cpu_count()))
+    with open(args.output, "w") as f:
+        json.dump({"cpus": os.cpu_count(), "results": results, "identical": identical}, f, indent=4)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
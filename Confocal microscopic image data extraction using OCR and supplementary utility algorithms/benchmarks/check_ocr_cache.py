@@ -0,0 +1,71 @@
+"""
+Check of the OCR cache: writes a synthetic study (see benchmark_ocr_service.create_study), runs
+ocr_service.collect_stacks_and_blocks twice with the same SQLite cache and reports crops read, cache hits and misses per
+run. Fails unless the second run reads no crop and returns the same result as the first run.
+
+usage:
+    python check_ocr_cache.py --images 200
+    python check_ocr_cache.py --engine pytesseract --tesseract-cmd "C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ocr_service import OcrService, collect_stacks_and_blocks  # noqa: E402
+from benchmark_ocr_service import create_study  # noqa: E402
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Runs the study twice and writes the json.
+
+    Args:
+        argv (Optional[list]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if the second run read crops or the results differ.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--engine", choices=["auto", "tesserocr", "pytesseract"], default="auto")
+    parser.add_argument("--tesseract-cmd", default=None)
+    parser.add_argument("--tessdata", default=None)
+    parser.add_argument("--output", default="ocr_cache_results.json")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="ocr_cache_")
+    cache = os.path.join(directory, "ocr_cache.sqlite")
+    results = []
+    outputs = []
+    try:
+        create_study(os.path.join(directory, "study"), args.images)
+        for run in (1, 2):
+            start = time.perf_counter()
+            with OcrService(args.workers, args.engine, args.tesseract_cmd, args.tessdata, cache=cache) as service:
+                subj_dict = collect_stacks_and_blocks(os.path.join(directory, "study"), service)
+            record = dict(service.stats, run=run, wall_s=time.perf_counter() - start, hit_rate=service.hit_rate)
+            print("run %d  %5d images  %5d crops read  %5d hits  %5d misses  hit rate %5.1f %%  %6.1f s" % (
+                run, record["images"], record["crops_read"], record["cache_hits"], record["cache_misses"],
+                100 * record["hit_rate"], record["wall_s"]))
+            results.append(record)
+            outputs.append(json.dumps(subj_dict, sort_keys=True))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    identical = len(set(outputs)) == 1
+    passed = identical and results[1]["crops_read"] == 0
+    print("results identical: %s, second run without OCR: %s" % (identical, results[1]["crops_read"] == 0))
+    with open(args.output, "w") as f:
+        json.dump({"results": results, "identical": identical, "passed": passed}, f, indent=4)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
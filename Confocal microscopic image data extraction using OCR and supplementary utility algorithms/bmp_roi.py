@@ -0,0 +1,144 @@
+"""
+Reads small regions (ROIs) of images without decoding the whole image.
+
+Of uncompressed BMPs (8 bit palette, 24 and 32 bit) only the scanlines spanned by the requested regions are read
+(one seek and read, the row offsets follow from the BMP header). Other formats are decoded completely with cv2.imread.
+The returned crops are equal to cv2.imread(path)[rows, cols] (BGR, uint8).
+
+usage:
+    rois = read_image_rois("v0000000.bmp", {"x": (slice(1019, 1044), slice(0, 600))})
+    rois["x"]   # 25 x 600 x 3 array
+"""
+import struct
+from typing import Dict, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+
+# (rows, columns) of a region
+Roi = Tuple[slice, slice]
+
+_FILE_HEADER = struct.Struct("<2sIHHI")
+_INFO_HEADER = struct.Struct("<IiiHHI")
+BI_RGB = 0
+
+# text overlay below the 1000 x 1000 VivaScope image: file name and the x/y stage position
+VIVASCOPE_TEXT_ROIS = {
+    "filename": (slice(1000, 1000 + 22), slice(0, 0 + 180)),
+    "x": (slice(1019, 1019 + 25), slice(0, 600)),
+    "y": (slice(1019, 1019 + 25), slice(0, 600)),
+}
+# pixel columns at the minus sign of the x and y value
+VIVASCOPE_SIGN_ROIS = {
+    "x": (slice(1029, 1029 + 3), slice(21, 21 + 1)),
+    "y": (slice(1029, 1029 + 3), slice(105, 105 + 1)),
+}
+
+
+class BmpLayout(NamedTuple):
+    """pixel array layout of an uncompressed BMP"""
+    offset: int
+    width: int
+    height: int
+    bit_count: int
+    row_stride: int
+    top_down: bool
+    palette: Optional[np.ndarray]
+
+
+def read_bmp_layout(path: str) -> Optional[BmpLayout]:
+    """
+    Reads the headers of a BMP file.
+
+    Args:
+        path (str): The file path to the image.
+
+    Returns:
+        Optional[BmpLayout]: The pixel array layout, None if the file is no BMP that can be read row by row
+        (compressed, less than 8 bit per pixel or not a BMP at all).
+    """
+    with open(path, "rb") as f:
+        file_header = f.read(_FILE_HEADER.size)
+        if len(file_header) < _FILE_HEADER.size:
+            return None
+        magic, _, _, _, offset = _FILE_HEADER.unpack(file_header)
+        if magic != b"BM":
+            return None
+        info_header = f.read(_INFO_HEADER.size)
+        if len(info_header) < _INFO_HEADER.size:
+            return None
+        header_size, width, height, _, bit_count, compression = _INFO_HEADER.unpack(info_header)
+        # the core header of OS/2 BMPs has 16 bit sizes, cv2 reads those
+        if header_size < 40 or width <= 0 or height == 0 or bit_count not in (8, 24, 32):
+            return None
+        if compression != BI_RGB:
+            return None
+        palette = None
+        if bit_count == 8:
+            f.seek(_FILE_HEADER.size + header_size)
+            entries = f.read(offset - _FILE_HEADER.size - header_size)
+            # BGRA entries, unused entries map to black
+            palette = np.zeros((256, 3), dtype=np.uint8)
+            colors = np.frombuffer(entries[:len(entries) // 4 * 4], dtype=np.uint8).reshape(-1, 4)[:256, :3]
+            palette[:len(colors)] = colors
+    row_stride = (width * bit_count // 8 + 3) // 4 * 4
+    return BmpLayout(offset, width, abs(height), bit_count, row_stride, height < 0, palette)
+
+
+def __read_bmp_rois(path: str, layout: BmpLayout, rois: Dict[str, Roi]) -> Dict[str, np.ndarray]:
+    """
+    Reads the scanlines spanned by the regions with one seek and read and crops the regions from them.
+
+    Args:
+        path (str): The file path to the image.
+        layout (BmpLayout): The layout returned by read_bmp_layout.
+        rois (Dict[str, Roi]): The regions by name.
+
+    Returns:
+        Dict[str, np.ndarray]: BGR crops by name.
+    """
+    channels = layout.bit_count // 8
+    row_indices = {}
+    for name, (rows, _) in rois.items():
+        indices = np.arange(*rows.indices(layout.height))
+        # bottom-up BMPs store the last image row first
+        row_indices[name] = indices if layout.top_down else layout.height - 1 - indices
+    used = [indices for indices in row_indices.values() if len(indices)]
+    first = min((int(indices.min()) for indices in used), default=0)
+    last = max((int(indices.max()) for indices in used), default=-1)
+    band = np.empty((last - first + 1, layout.row_stride), dtype=np.uint8)
+    with open(path, "rb") as f:
+        f.seek(layout.offset + first * layout.row_stride)
+        if f.readinto(band) != band.nbytes:
+            raise IOError("Truncated BMP '%s'" % path)
+    image_rows = band[:, :layout.width * channels].reshape(len(band), layout.width, channels)
+    crops = {}
+    for name, (_, cols) in rois.items():
+        pixels = image_rows[row_indices[name] - first][:, cols]
+        if layout.palette is not None:
+            crops[name] = layout.palette.take(pixels[:, :, 0], axis=0)
+        else:
+            crops[name] = np.ascontiguousarray(pixels[:, :, :3])
+    return crops
+
+
+def read_image_rois(path: str, rois: Dict[str, Roi]) -> Dict[str, np.ndarray]:
+    """
+    Reads regions of an image, uncompressed BMPs row by row, other images by a full decode.
+
+    Args:
+        path (str): The file path to the image.
+        rois (Dict[str, Roi]): The regions by name, (row slice, column slice) in image coordinates.
+
+    Returns:
+        Dict[str, np.ndarray]: BGR crops by name, like cv2.imread(path)[rows, cols].
+
+    Raises:
+        IOError: The image can not be read.
+    """
+    layout = read_bmp_layout(path)
+    if layout is not None:
+        return __read_bmp_rois(path, layout, rois)
+    image = cv2.imread(path)
+    if image is None:
+        raise IOError("Can not read image '%s'" % path)
+    return {name: image[rows, cols] for name, (rows, cols) in rois.items()}
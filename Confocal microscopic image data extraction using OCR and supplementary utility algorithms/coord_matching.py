@@ -0,0 +1,181 @@
+"""
+Matching of VivaStack positions to the VivaBlock images taken around them.
+
+The stage coordinates of a subject are collected once from the dictionary of
+create_pickled_dict_containing_stacks_and_blocks_per_subject (subject -> [Stack_dict, Block_dict]) into arrays,
+nearest neighbour and radius queries are answered by a scipy cKDTree for all points in one call. Of block images at the
+same distance the first one is matched, like the former min(enumerate(...), key=math.hypot).
+The block folders are found in one directory walk per run (DirectoryIndex) instead of one walk per block.
+
+usage:
+    subject = collect_subject_coordinates(main_dict["S01"])
+    for block_name, matches in match_stacks_to_blocks(subject).items():
+        for stack_name, image_idx, distance in matches:
+            ...
+"""
+import math
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+# relative difference of two distances treated as a tie, covers the rounding of the tree distances against math.hypot
+TIE_TOLERANCE = 1e-9
+
+
+class SubjectCoordinates(NamedTuple):
+    """stage positions of the stacks and of the block images of a subject"""
+    stack_names: List[str]
+    stack_xy: np.ndarray
+    block_xy: Dict[str, np.ndarray]
+
+
+def collect_subject_coordinates(subject_entry: list) -> SubjectCoordinates:
+    """
+    Collects the coordinates of a subject into arrays.
+
+    Args:
+        subject_entry (list): [Stack_dict, Block_dict] of a subject, Stack_dict: folder -> (x, y, path),
+            Block_dict: folder -> [(x, y, path), ...].
+
+    Returns:
+        SubjectCoordinates: The stack names, the stack positions (stacks x 2) and the image positions (images x 2) per block,
+        in the order of the dictionaries.
+    """
+    stack_dict, block_dict = subject_entry
+    stack_names = list(stack_dict)
+    stack_xy = np.array([(float(v[0]), float(v[1])) for v in stack_dict.values()], dtype=np.float64).reshape(-1, 2)
+    block_xy = {name: np.array([(float(x[0]), float(x[1])) for x in images], dtype=np.float64).reshape(-1, 2)
+                for name, images in block_dict.items()}
+    return SubjectCoordinates(stack_names, stack_xy, block_xy)
+
+
+class CoordinateIndex:
+    """
+    cKDTree over 2D positions, queries take all points at once.
+    """
+
+    def __init__(self, coordinates: np.ndarray):
+        """
+        Args:
+            coordinates (np.ndarray): The indexed positions, points x 2.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.tree = cKDTree(self.coordinates)
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    def nearest(self, points: np.ndarray, max_distance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the nearest indexed position of every point. Of positions at the same distance (e.g. a point between the
+        images of a regular grid) the lowest index is taken.
+
+        Args:
+            points (np.ndarray): The query positions, points x 2.
+            max_distance (Optional[float]): Positions farther away are not matched, defaults to None (always matched).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The distance (inf if not matched) and the index (-1 if not matched) per point.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self.coordinates) == 0:
+            return np.full(len(points), np.inf), np.full(len(points), -1, dtype=np.intp)
+        upper_bound = np.inf if max_distance is None else max_distance
+        if len(self.coordinates) == 1:
+            distances, indices = self.tree.query(points, distance_upper_bound=upper_bound)
+        else:
+            # the second nearest position shows the ties, they are rare and resolved per point
+            distances, indices = self.tree.query(points, k=2, distance_upper_bound=upper_bound)
+            ties = np.flatnonzero(np.isfinite(distances[:, 1]) & (distances[:, 1] <= distances[:, 0] * (1 + TIE_TOLERANCE)))
+            distances, indices = distances[:, 0].copy(), indices[:, 0].copy()
+            for row in ties:
+                indices[row], distances[row] = self.__lowest_nearest(points[row], distances[row])
+        indices = np.where(np.isinf(distances), -1, indices)
+        return distances, indices
+
+    def __lowest_nearest(self, point: np.ndarray, distance: float) -> Tuple[int, float]:
+        """
+        The lowest index of the positions nearest to a point with a tie, by math.hypot like the former linear search.
+
+        Args:
+            point (np.ndarray): The query position.
+            distance (float): The distance of the nearest position from the tree.
+
+        Returns:
+            Tuple[int, float]: The index and the distance.
+        """
+        x, y = float(point[0]), float(point[1])
+        candidates = sorted(self.tree.query_ball_point(point, distance * (1 + TIE_TOLERANCE)))
+        hypot = [math.hypot(y - self.coordinates[idx, 1], x - self.coordinates[idx, 0]) for idx in candidates]
+        best = min(range(len(candidates)), key=hypot.__getitem__)
+        return candidates[best], hypot[best]
+
+    def within(self, points: np.ndarray, radius: float) -> List[np.ndarray]:
+        """
+        Finds the indexed positions within a radius of every point.
+
+        Args:
+            points (np.ndarray): The query positions, points x 2.
+            radius (float): The radius.
+
+        Returns:
+            List[np.ndarray]: The sorted indices per point.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self.coordinates) == 0:
+            return [np.empty(0, dtype=np.intp) for _ in points]
+        return [np.array(indices, dtype=np.intp) for indices in self.tree.query_ball_point(points, radius, return_sorted=True)]
+
+
+def match_stacks_to_blocks(subject: SubjectCoordinates,
+                           max_distance: Optional[float] = None) -> Dict[str, List[Tuple[str, int, float]]]:
+    """
+    Finds for every block and stack the block image closest to the stack.
+
+    Args:
+        subject (SubjectCoordinates): The coordinates of the subject.
+        max_distance (Optional[float]): Stacks farther away from every image of a block are not matched in that block,
+            defaults to None (every stack is matched in every block).
+
+    Returns:
+        Dict[str, List[Tuple[str, int, float]]]: (stack name, image index in the block list, distance) per block,
+        in the order of the stacks.
+    """
+    matches = {}
+    for block_name, block_xy in subject.block_xy.items():
+        distances, indices = CoordinateIndex(block_xy).nearest(subject.stack_xy, max_distance)
+        matches[block_name] = [(stack_name, int(idx), float(distance))
+                               for stack_name, idx, distance in zip(subject.stack_names, indices, distances) if idx >= 0]
+    return matches
+
+
+class DirectoryIndex:
+    """
+    The directories below a path, listed by one os.walk per run.
+    """
+
+    def __init__(self, inpath: str):
+        """
+        Args:
+            inpath (str): The input directory path.
+        """
+        self.roots = [root for root, _, _ in os.walk(inpath)]
+        self.found = {}
+
+    def find(self, *parts: str) -> str:
+        """
+        The first directory (in walk order) whose path contains all parts, e.g. subject and block folder name.
+
+        Args:
+            parts (str): The path parts.
+
+        Returns:
+            str: The directory.
+
+        Raises:
+            IndexError: No directory contains the parts.
+        """
+        if parts not in self.found:
+            self.found[parts] = [root for root in self.roots if all(part in root for part in parts)][0]
+        return self.found[parts]
@@ -0,0 +1,452 @@
+"""
+Glyph template OCR of the VivaScope text overlay.
+
+The overlay is rendered in one fixed font at fixed positions, so its characters are read by template matching instead of
+tesseract: a crop is segmented into glyphs (connected components, components overlapping in x like the dots of ":" form
+one glyph) and every glyph is classified by normalized cross-correlation against templates learned once from labelled
+crops, allowing a shift of up to GLYPH_PAD pixels. Crops with a glyph below the minimum score (unknown character,
+touching characters, noise) are passed to the fallback engine (tesseract). The minus sign is a template like the digits,
+so the pixel check of parse_overlay_text is only applied to the crops read by the fallback engine.
+
+usage:
+    python glyph_ocr.py path_to_images --images 200 --output glyph_templates.npz    (labels by tesseract)
+    python ocr_service.py path_to_images --engine glyph --templates glyph_templates.npz --output data_dict.pkl
+
+    engine = create_ocr_engine("glyph", templates="glyph_templates.npz")
+    filename, x, y = extract_text_from_img_coords(img_path, engine)
+"""
+import argparse
+import hashlib
+import logging
+import re
+import sys
+from collections import Counter
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from ocr_cache import recognize_with_readers
+
+GLYPH_LOGGER = logging.getLogger("glyph_ocr")
+
+# difference to the background (most frequent value) above which a pixel belongs to a glyph
+FOREGROUND_THRESHOLD = 128
+# pixels a glyph may be shifted against its template
+GLYPH_PAD = 1
+# normalized cross-correlation below which a crop is passed to the fallback engine
+GLYPH_MIN_SCORE = 0.8
+
+
+class Glyph(NamedTuple):
+    """bounding box (x1, y1 exclusive) and component labels of a glyph"""
+    x0: int
+    x1: int
+    y0: int
+    y1: int
+    labels: Tuple[int, ...]
+
+
+class GlyphTemplates:
+    """
+    Mean glyph image per character, all of the same size (line height x glyph width), and the gap between words.
+    """
+
+    def __init__(self, chars: List[str], images: np.ndarray, ascent: int, space_gap: float):
+        """
+        Args:
+            chars (List[str]): The character of every template.
+            images (np.ndarray): The templates, characters x height x width.
+            ascent (int): The template rows above the line top (see line_top).
+            space_gap (float): Gaps between glyphs (pixels) above this are spaces.
+        """
+        self.chars = list(chars)
+        self.images = np.asarray(images, dtype=np.float32)
+        self.ascent = int(ascent)
+        self.space_gap = float(space_gap)
+        self.height, self.width = self.images.shape[1:]
+        flat = self.images.reshape(len(self.chars), -1)
+        flat = flat - flat.mean(axis=1, keepdims=True)
+        # zero mean, unit norm: the dot product with a normalized window is the correlation coefficient
+        self.normalized = flat / np.linalg.norm(flat, axis=1, keepdims=True)
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(("%s|%d|%r|" % ("".join(self.chars), self.ascent, self.space_gap)).encode("utf-8"))
+        hasher.update(self.images.tobytes())
+        self.digest = hasher.hexdigest()
+
+    def save(self, filename: str) -> None:
+        """
+        Writes the templates as .npz.
+
+        Args:
+            filename (str): The output file.
+        """
+        np.savez(filename, chars=np.array(self.chars), images=self.images, ascent=self.ascent, space_gap=self.space_gap)
+
+    @classmethod
+    def load(cls, filename: str) -> "GlyphTemplates":
+        """
+        Reads templates written by save.
+
+        Args:
+            filename (str): The .npz file.
+
+        Returns:
+            GlyphTemplates: The templates.
+        """
+        with np.load(filename) as data:
+            return cls([str(char) for char in data["chars"]], data["images"], int(data["ascent"]), float(data["space_gap"]))
+
+
+def segment_glyphs(crop: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[Glyph]]:
+    """
+    Segments a one line crop into glyphs, independent of the text polarity.
+
+    Args:
+        crop (np.ndarray): BGR or grayscale crop.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[Glyph]]: The foreground intensity (difference to the background),
+        the component labels and the glyphs from left to right.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    background = np.bincount(gray.ravel(), minlength=256).argmax()
+    intensity = np.abs(gray.astype(np.int16) - int(background)).astype(np.float32)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats((intensity > FOREGROUND_THRESHOLD).astype(np.uint8),
+                                                               connectivity=8)
+    boxes = sorted((stats[label, cv2.CC_STAT_LEFT], stats[label, cv2.CC_STAT_LEFT] + stats[label, cv2.CC_STAT_WIDTH],
+                    stats[label, cv2.CC_STAT_TOP], stats[label, cv2.CC_STAT_TOP] + stats[label, cv2.CC_STAT_HEIGHT], label)
+                   for label in range(1, count))
+    # components cut by the upper or lower crop border belong to the neighbouring text lines
+    boxes = [box for box in boxes if box[2] > 0 and box[3] < gray.shape[0]]
+    glyphs = []
+    for x0, x1, y0, y1, label in boxes:
+        if glyphs:
+            last = glyphs[-1]
+            # components of one character are stacked (":", "i"), neighbouring characters overlap by a pixel at most
+            if min(x1, last.x1) - x0 > min(x1 - x0, last.x1 - last.x0) // 2:
+                glyphs[-1] = Glyph(last.x0, max(x1, last.x1), min(y0, last.y0), max(y1, last.y1), last.labels + (label,))
+                continue
+        glyphs.append(Glyph(x0, x1, y0, y1, (label,)))
+    return intensity, labels, glyphs
+
+
+def line_top(glyphs: List[Glyph]) -> int:
+    """
+    The top row of the digits and capitals of a line, the most frequent glyph top (ascenders and cut off components
+    do not move it).
+
+    Args:
+        glyphs (List[Glyph]): The glyphs of the line.
+
+    Returns:
+        int: The row.
+    """
+    counts = Counter(glyph.y0 for glyph in glyphs)
+    return min(counts, key=lambda y0: (-counts[y0], y0))
+
+
+def glyph_windows(intensity: np.ndarray, labels: np.ndarray, glyphs: List[Glyph], ascent: int, height: int,
+                  width: int, pad: int = 0) -> np.ndarray:
+    """
+    Cuts a window per glyph: the rows from ascent above to height - ascent below the line top, the columns width
+    centered on the glyph, only the pixels of the glyph itself, with pad pixels on every side.
+
+    Args:
+        intensity (np.ndarray): The foreground intensity of segment_glyphs.
+        labels (np.ndarray): The component labels of segment_glyphs.
+        glyphs (List[Glyph]): The glyphs of the line.
+        ascent (int): The window rows above the line top.
+        height (int): The window height.
+        width (int): The window width.
+        pad (int): Additional pixels on every side.
+
+    Returns:
+        np.ndarray: The windows, glyphs x (height + 2 pad) x (width + 2 pad).
+    """
+    # glyph number (from 1) of every pixel, 0 for the background and dropped components
+    lookup = np.zeros(labels.max() + 1, dtype=np.int32)
+    for idx, glyph in enumerate(glyphs):
+        lookup[list(glyph.labels)] = idx + 1
+    margin = max(height, width) + pad
+    intensity = np.pad(intensity, margin)
+    glyph_ids = np.pad(lookup[labels], margin)
+    row0 = margin + line_top(glyphs) - ascent - pad
+    rows = slice(row0, row0 + height + 2 * pad)
+    centers = np.array([(glyph.x0 + glyph.x1) // 2 for glyph in glyphs])
+    # columns glyphs x window width, the window rows of all glyphs are cut at once (rows x glyphs x columns)
+    cols = margin + centers[:, None] - width // 2 - pad + np.arange(width + 2 * pad)
+    own = glyph_ids[rows][:, cols] == np.arange(1, len(glyphs) + 1)[None, :, None]
+    return np.where(own, intensity[rows][:, cols], 0).transpose(1, 0, 2)
+
+
+def classify_glyphs(windows: np.ndarray, templates: GlyphTemplates) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Classifies padded glyph windows by the normalized cross-correlation with the templates at every shift.
+
+    Args:
+        windows (np.ndarray): The windows of glyph_windows with pad GLYPH_PAD.
+        templates (GlyphTemplates): The templates.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The template index and the correlation per glyph.
+    """
+    shifted = sliding_window_view(windows, (templates.height, templates.width), axis=(1, 2))
+    shifted = shifted.reshape(len(windows), -1, templates.height * templates.width)
+    # the templates have zero mean, so the window mean only enters the norm
+    norms = np.sqrt(np.maximum(np.einsum("ijk,ijk->ij", shifted, shifted) - shifted.sum(axis=2) ** 2 / shifted.shape[2], 0))
+    dots = shifted @ templates.normalized.T
+    scores = np.divide(dots, norms[:, :, None], out=np.zeros_like(dots), where=norms[:, :, None] > 0).max(axis=1)
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(windows)), best]
+
+
+def read_glyph_line(crop: np.ndarray, templates: GlyphTemplates) -> Tuple[str, float]:
+    """
+    Reads the text of a one line crop.
+
+    Args:
+        crop (np.ndarray): BGR or grayscale crop.
+        templates (GlyphTemplates): The templates.
+
+    Returns:
+        Tuple[str, float]: The text and the confidence (lowest glyph correlation, 0 if a glyph does not fit the
+        template size or the crop is empty).
+    """
+    intensity, labels, glyphs = segment_glyphs(crop)
+    if not glyphs:
+        return "", 0.0
+    windows = glyph_windows(intensity, labels, glyphs, templates.ascent, templates.height, templates.width, GLYPH_PAD)
+    best, scores = classify_glyphs(windows, templates)
+    top = line_top(glyphs) - templates.ascent
+    fits = all(glyph.x1 - glyph.x0 <= templates.width and glyph.y0 >= top and glyph.y1 - top <= templates.height
+               for glyph in glyphs)
+    text = templates.chars[best[0]]
+    for previous, glyph, idx in zip(glyphs, glyphs[1:], best[1:]):
+        if glyph.x0 - previous.x1 > templates.space_gap:
+            text += " "
+        text += templates.chars[idx]
+    return text, float(scores.min()) if fits else 0.0
+
+
+def learn_glyph_templates(samples: Iterable[Tuple[np.ndarray, str]]) -> GlyphTemplates:
+    """
+    Learns the templates from labelled crops. Crops whose number of glyphs differs from the number of characters of
+    the label (without whitespace) are skipped.
+
+    Args:
+        samples (Iterable[Tuple[np.ndarray, str]]): One line crops and their text.
+
+    Returns:
+        GlyphTemplates: The templates, the mean glyph per character.
+
+    Raises:
+        ValueError: No crop matches its label.
+    """
+    segmented = []
+    skipped = 0
+    for crop, label in samples:
+        intensity, labels, glyphs = segment_glyphs(crop)
+        words = label.split()
+        if not glyphs or len(glyphs) != sum(len(word) for word in words):
+            skipped += 1
+            continue
+        segmented.append((intensity, labels, glyphs, words))
+    if not segmented:
+        raise ValueError("No labelled crop matches its segmentation (%d skipped)" % skipped)
+    GLYPH_LOGGER.info("learning from %d crops, %d skipped" % (len(segmented), skipped))
+
+    ascent = max(line_top(glyphs) - glyph.y0 for _, _, glyphs, _ in segmented for glyph in glyphs)
+    height = max(glyph.y1 - line_top(glyphs) for _, _, glyphs, _ in segmented for glyph in glyphs) + ascent
+    width = max(glyph.x1 - glyph.x0 for _, _, glyphs, _ in segmented for glyph in glyphs) + 2
+    sums, counts = {}, {}
+    inner_gaps, space_gaps = [], []
+    for intensity, labels, glyphs, words in segmented:
+        chars = "".join(words)
+        for char, window in zip(chars, glyph_windows(intensity, labels, glyphs, ascent, height, width)):
+            sums[char] = sums.get(char, 0) + window
+            counts[char] = counts.get(char, 0) + 1
+        word_ends = set(np.cumsum([len(word) for word in words])[:-1] - 1)
+        for idx, (previous, glyph) in enumerate(zip(glyphs, glyphs[1:])):
+            (space_gaps if idx in word_ends else inner_gaps).append(glyph.x0 - previous.x1)
+    if inner_gaps and space_gaps:
+        if max(inner_gaps) >= min(space_gaps):
+            GLYPH_LOGGER.warning("gaps within and between words overlap (%d >= %d)" % (max(inner_gaps), min(space_gaps)))
+        space_gap = (max(inner_gaps) + min(space_gaps)) / 2
+    else:
+        space_gap = width / 2
+    chars = sorted(sums)
+    return GlyphTemplates(chars, np.stack([sums[char] / counts[char] for char in chars]), ascent, space_gap)
+
+
+class GlyphEngine:
+    """
+    OCR engine reading the overlay by glyph templates, crops read with low confidence are passed to the fallback engine.
+    """
+    name = "glyph"
+
+    def __init__(self, templates: GlyphTemplates, fallback: Optional[object] = None, min_score: float = GLYPH_MIN_SCORE):
+        """
+        Args:
+            templates (GlyphTemplates): The templates.
+            fallback (Optional[object]): The engine for crops read with low confidence (see ocr_service.create_ocr_engine),
+                defaults to None (those crops are returned as "" and the image is left out).
+            min_score (float): The lowest glyph correlation accepted.
+        """
+        self.templates = templates
+        self.fallback = fallback
+        self.min_score = min_score
+        fallback_settings = "" if fallback is None else "%s|%s" % (fallback.name, fallback.settings)
+        self.settings = "%s|%s|%s" % (templates.digest, min_score, fallback_settings)
+        self.crops_read = 0
+        self.fallbacks = 0
+
+    def recognize(self, crops: List[np.ndarray]) -> List[str]:
+        """
+        Retrieves the text of every crop.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops, one text line each.
+
+        Returns:
+            List[str]: The text per crop.
+        """
+        return self.recognize_with_readers(crops)[0]
+
+    def recognize_with_readers(self, crops: List[np.ndarray]) -> Tuple[List[str], List[str]]:
+        """
+        Retrieves the text of every crop and the engine that read it.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops, one text line each.
+
+        Returns:
+            Tuple[List[str], List[str]]: The text per crop and the name of the engine per crop, "glyph" or the name of
+            the fallback engine (its text may lack a minus sign, see parse_overlay_text).
+        """
+        self.crops_read += len(crops)
+        texts = []
+        readers = []
+        uncertain = []
+        for idx, crop in enumerate(crops):
+            text, confidence = read_glyph_line(crop, self.templates)
+            if confidence < self.min_score:
+                uncertain.append(idx)
+                text = ""
+            texts.append(text)
+            readers.append(self.name)
+        if uncertain:
+            self.fallbacks += len(uncertain)
+            GLYPH_LOGGER.debug("%d crops passed to the fallback engine" % len(uncertain))
+            if self.fallback is not None:
+                fallback_texts, fallback_readers = recognize_with_readers(self.fallback, [crops[idx] for idx in uncertain])
+                for idx, text, reader in zip(uncertain, fallback_texts, fallback_readers):
+                    texts[idx] = text
+                    readers[idx] = reader
+        return texts, readers
+
+    def close(self) -> None:
+        """
+        Releases the fallback engine.
+        """
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def get_text_from_crp_img(crp_img: np.ndarray, engine: object) -> str:
+    """
+    Retrieves text, symbols, and digits from a cropped image slice with an OCR engine (e.g. GlyphEngine).
+
+    Args:
+        crp_img (np.ndarray): The cropped image slice.
+        engine (object): The OCR engine.
+
+    Returns:
+        str: The extracted text, symbols, and numbers in string format.
+    """
+    return engine.recognize([crp_img])[0]
+
+
+def extract_text_from_img_coords(img_path: str, engine: object) -> Tuple[str, str, str]:
+    """
+    Extracts file name and coordinates from the overlay of an image with an OCR engine (e.g. GlyphEngine).
+
+    Args:
+        img_path (str): The file path to the image.
+        engine (object): The OCR engine.
+
+    Returns:
+        Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
+
+    Raises:
+        ValueError: The text contains no file name or too few coordinates.
+    """
+    from ocr_service import read_overlay
+    return read_overlay(img_path, engine)
+
+
+def iter_tesseract_labels(paths: Iterable[str], engine: object) -> Iterator[Tuple[np.ndarray, str]]:
+    """
+    Labels the overlay crops of images by tesseract. Only images whose text can be parsed are used, a minus sign
+    restored by the pixel check is added to the label.
+
+    Args:
+        paths (Iterable[str]): The images.
+        engine (object): The tesseract engine (ocr_service.create_ocr_engine).
+
+    Yields:
+        Tuple[np.ndarray, str]: The crop and its text.
+    """
+    from bmp_roi import read_image_rois, VIVASCOPE_TEXT_ROIS, VIVASCOPE_SIGN_ROIS
+    from ocr_service import parse_overlay_text
+    rois = dict(VIVASCOPE_TEXT_ROIS, **{"sign_" + k: v for k, v in VIVASCOPE_SIGN_ROIS.items()})
+    for path in paths:
+        crops = read_image_rois(path, rois)
+        names = list(VIVASCOPE_TEXT_ROIS)
+        texts = dict(zip(names, engine.recognize([crops[name] for name in names])))
+        try:
+            filename, x, y = parse_overlay_text(texts, {k: crops["sign_" + k] for k in VIVASCOPE_SIGN_ROIS})
+        except ValueError:
+            continue
+        yield crops["filename"], filename
+        for name in ("x", "y"):
+            line = texts[name].strip()
+            for coord in (x, y):
+                if coord.startswith("-") and coord not in line:
+                    line = re.sub(r"(?<![-\d.])" + re.escape(coord[1:]), coord, line, count=1)
+            yield crops[name], line
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Learns the templates from the VivaBlock images of a study, labelled by tesseract.
+
+    Args:
+        argv (Optional[List[str]]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code.
+    """
+    from ocr_service import create_ocr_engine, iter_overlay_jobs
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inpath", help="study directory")
+    parser.add_argument("--output", required=True, help=".npz file for the templates")
+    parser.add_argument("--images", type=int, default=200, help="number of images to learn from")
+    parser.add_argument("--engine", choices=["auto", "tesserocr", "pytesseract"], default="auto")
+    parser.add_argument("--tesseract-cmd", default=None, help="tesseract executable for pytesseract")
+    parser.add_argument("--tessdata", default=None, help="tessdata directory for tesserocr")
+    args = parser.parse_args(argv)
+
+    paths = (path for _, path in iter_overlay_jobs(args.inpath))
+    engine = create_ocr_engine(args.engine, args.tesseract_cmd, args.tessdata)
+    try:
+        templates = learn_glyph_templates(iter_tesseract_labels((path for _, path in zip(range(args.images), paths)), engine))
+    finally:
+        engine.close()
+    templates.save(args.output)
+    GLYPH_LOGGER.info("%d templates '%s' written to %s" % (len(templates.chars), "".join(templates.chars), args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+OCR result cache keyed by the content of the crop.
+
+The key is a hash of the crop pixels (shape, dtype and bytes) and the engine settings (engine name, language, config),
+the text and the name of the engine that read it are stored in a SQLite file. Identical crops (the x and y crop of an image) are read once per run and every
+crop read in an earlier run is not read again.
+
+usage:
+    engine = CachedOcrEngine(create_ocr_engine(), OcrCache("ocr_cache.sqlite"))
+    texts = engine.recognize(crops)
+    texts, readers = engine.recognize_with_readers(crops)   # and the engine that read every crop
+    engine.cache.hits, engine.cache.misses, engine.crops_read
+"""
+import hashlib
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+OCR_CACHE_VERSION = 2
+
+# version 1 stored no reader in the table "ocr", its keys are not looked up any more
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_text (key TEXT PRIMARY KEY, text TEXT, reader TEXT);
+"""
+
+
+def crop_key(crop: np.ndarray, settings: str = "") -> str:
+    """
+    Hash of the crop content and the engine settings, xxh3_128 when xxhash is installed, else blake2b.
+
+    Args:
+        crop (np.ndarray): The crop.
+        settings (str): The engine settings, crops read with other settings get other keys.
+
+    Returns:
+        str: The key as hex.
+    """
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(("%d|%s|%s|%s|" % (OCR_CACHE_VERSION, crop.dtype.str, crop.shape, settings)).encode("utf-8"))
+    hasher.update(np.ascontiguousarray(crop).data)
+    return hasher.hexdigest()
+
+
+def recognize_with_readers(engine: object, crops: List[np.ndarray]) -> Tuple[List[str], List[str]]:
+    """
+    Retrieves the text of every crop and the name of the engine that read it, for engines reading every crop themselves
+    (tesseract) the name of the engine.
+
+    Args:
+        engine (object): The engine with recognize(crops) and name, optionally recognize_with_readers(crops).
+        crops (List[np.ndarray]): BGR crops.
+
+    Returns:
+        Tuple[List[str], List[str]]: The text and the engine name per crop.
+    """
+    if hasattr(engine, "recognize_with_readers"):
+        return engine.recognize_with_readers(crops)
+    return engine.recognize(crops), [engine.name] * len(crops)
+
+
+class OcrCache:
+    """
+    OCR texts and the engine that read them by crop key in a SQLite file (or in memory), with hit and miss counters.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        """
+        Args:
+            filename (Optional[str]): The SQLite file, defaults to None (in memory, valid for this run only).
+        """
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        # several worker processes write the same file
+        self.connection = sqlite3.connect(":memory:" if filename is None else filename, timeout=60)
+        if filename is not None:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "OcrCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Looks up keys and counts hits and misses.
+
+        Args:
+            keys (List[str]): The crop keys.
+
+        Returns:
+            Dict[str, Tuple[str, str]]: The text and the engine name of the keys found.
+        """
+        unique = list(dict.fromkeys(keys))
+        rows = self.connection.execute(
+            "SELECT key, text, reader FROM ocr_text WHERE key IN (%s)" % ",".join("?" * len(unique)), unique).fetchall() if unique else []
+        found = {key: (text, reader) for key, text, reader in rows}
+        hits = sum(key in found for key in keys)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, texts: Dict[str, Tuple[str, str]]) -> None:
+        """
+        Stores texts by key.
+
+        Args:
+            texts (Dict[str, Tuple[str, str]]): The text and the engine name by crop key.
+        """
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO ocr_text (key, text, reader) VALUES (?, ?, ?)",
+                                        ((key, text, reader) for key, (text, reader) in texts.items()))
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of the lookups answered from the cache.
+
+        Returns:
+            float: hits / (hits + misses), 0 without lookups.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM ocr_text").fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Closes the database.
+        """
+        self.connection.close()
+
+
+class CachedOcrEngine:
+    """
+    Wraps an OCR engine (see ocr_service.create_ocr_engine), only crops missing in the cache are passed to the engine.
+    Identical crops of one call are read once.
+    """
+
+    def __init__(self, engine: object, cache: OcrCache, settings: Optional[str] = None):
+        """
+        Args:
+            engine (object): The engine with recognize(crops) and close().
+            cache (OcrCache): The cache.
+            settings (Optional[str]): The engine settings in the key, defaults to the name and settings of the engine.
+        """
+        self.engine = engine
+        self.cache = cache
+        self.name = engine.name
+        self.settings = settings if settings is not None else "%s|%s" % (engine.name, engine.settings)
+
+    @property
+    def crops_read(self) -> int:
+        """
+        Number of crops read by the engine (cache misses without the duplicates of a call).
+
+        Returns:
+            int: The number of crops.
+        """
+        return self.engine.crops_read
+
+    def recognize(self, crops: List[np.ndarray]) -> List[str]:
+        """
+        Retrieves the text of every crop, from the cache or the engine.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops.
+
+        Returns:
+            List[str]: The text per crop.
+        """
+        return self.recognize_with_readers(crops)[0]
+
+    def recognize_with_readers(self, crops: List[np.ndarray]) -> Tuple[List[str], List[str]]:
+        """
+        Retrieves the text of every crop and the engine that read it, from the cache or the engine.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops.
+
+        Returns:
+            Tuple[List[str], List[str]]: The text and the engine name per crop.
+        """
+        keys = [crop_key(crop, self.settings) for crop in crops]
+        texts = self.cache.get_many(keys)
+        missing = {}
+        for key, crop in zip(keys, crops):
+            if key not in texts:
+                missing.setdefault(key, crop)
+        if missing:
+            read = dict(zip(missing, zip(*recognize_with_readers(self.engine, list(missing.values())))))
+            self.cache.put_many(read)
+            texts.update(read)
+        return [texts[key][0] for key in keys], [texts[key][1] for key in keys]
+
+    def close(self) -> None:
+        """
+        Closes the engine and the cache.
+        """
+        self.engine.close()
+        self.cache.close()
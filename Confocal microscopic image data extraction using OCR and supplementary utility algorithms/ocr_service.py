@@ -0,0 +1,532 @@
+"""
+OCR of the VivaScope text overlay (file name and x/y stage position) with a pool of long-lived worker processes.
+
+Every worker creates its OCR engine once: a tesserocr API handle when tesserocr is installed, else pytesseract with the
+crops of an image tiled into one composite image (one tesseract process per image instead of one per crop).
+The images are fed to the pool from the directory walk, the results come back in walk order.
+Nothing is displayed, matplotlib is not imported.
+
+usage:
+    python ocr_service.py path_to_images --workers 4 --cache ocr_cache.sqlite --output path_to_images\\data\\data_dict.pkl
+
+    with OcrService(workers=4) as service:
+        for path, (filename, x, y) in service.map((path, path) for path in paths):
+            ...
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+from bmp_roi import read_image_rois, VIVASCOPE_TEXT_ROIS, VIVASCOPE_SIGN_ROIS
+from ocr_cache import CachedOcrEngine, OcrCache, recognize_with_readers
+
+OCR_LOGGER = logging.getLogger("ocr_service")
+
+FILENAME_REGX = r"v[0-9]*.bmp"
+COORD_REGX = r'[-+]?\d*\.\d+'
+# background rows between the tiled crops of the pytesseract composite
+TILE_GAP = 20
+# engines reading the minus sign as a glyph, the sign pixels are not checked for crops they read
+SIGN_READING_ENGINES = {"glyph"}
+
+
+class TesserocrEngine:
+    """
+    OCR with a tesserocr API handle, created once per process.
+    """
+    name = "tesserocr"
+
+    def __init__(self, tessdata: Optional[str] = None, lang: str = "eng"):
+        """
+        Args:
+            tessdata (Optional[str]): The tessdata directory, defaults to the tesseract default.
+            lang (str): The language.
+        """
+        import tesserocr
+        self.api = tesserocr.PyTessBaseAPI(lang=lang) if tessdata is None else tesserocr.PyTessBaseAPI(path=tessdata, lang=lang)
+        self.settings = lang
+        self.crops_read = 0
+
+    def recognize(self, crops: List[np.ndarray]) -> List[str]:
+        """
+        Retrieves the text of every crop.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops.
+
+        Returns:
+            List[str]: The text per crop.
+        """
+        from PIL import Image
+        self.crops_read += len(crops)
+        texts = []
+        for crop in crops:
+            self.api.SetImage(Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)))
+            texts.append(self.api.GetUTF8Text())
+        return texts
+
+    def close(self) -> None:
+        """
+        Releases the API handle.
+        """
+        self.api.End()
+
+
+class PytesseractEngine:
+    """
+    OCR with pytesseract. The crops of an image are stacked into one composite image and read by one tesseract call,
+    the output lines are assigned to the crops. If the number of lines does not match, every crop is read separately.
+    """
+    name = "pytesseract"
+
+    def __init__(self, tesseract_cmd: Optional[str] = None, config: str = ""):
+        """
+        Args:
+            tesseract_cmd (Optional[str]): The tesseract executable, defaults to the pytesseract setting.
+            config (str): Additional tesseract options.
+
+        Raises:
+            pytesseract.TesseractNotFoundError: The tesseract executable can not be run.
+        """
+        import pytesseract
+        self.pytesseract = pytesseract
+        if tesseract_cmd is not None:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        # a wrong executable fails here, not once per image
+        pytesseract.get_tesseract_version()
+        self.config = config
+        self.settings = config
+        self.crops_read = 0
+
+    def recognize(self, crops: List[np.ndarray]) -> List[str]:
+        """
+        Retrieves the text of every crop.
+
+        Args:
+            crops (List[np.ndarray]): BGR crops, one text line each.
+
+        Returns:
+            List[str]: The text per crop.
+        """
+        grays = [cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) for crop in crops]
+        self.crops_read += len(grays)
+        if len(grays) > 1:
+            # psm 6: one block of text, so the lines stay in the order of the tiles
+            text = self.pytesseract.image_to_string(tile_crops(grays), config=(self.config + " --psm 6").strip())
+            lines = [line for line in text.splitlines() if line.strip()]
+            if len(lines) == len(grays):
+                return lines
+        return [self.pytesseract.image_to_string(gray, config=self.config) for gray in grays]
+
+    def close(self) -> None:
+        """
+        Nothing to release, tesseract runs as a subprocess per call.
+        """
+
+
+def tile_crops(grays: List[np.ndarray]) -> np.ndarray:
+    """
+    Stacks grayscale crops vertically, padded to the same width with their background (most frequent value)
+    and separated by TILE_GAP rows of background.
+
+    Args:
+        grays (List[np.ndarray]): The grayscale crops.
+
+    Returns:
+        np.ndarray: The composite image.
+    """
+    width = max(gray.shape[1] for gray in grays)
+    tiles = []
+    for gray in grays:
+        background = np.bincount(gray.ravel(), minlength=256).argmax()
+        tile = np.full((gray.shape[0] + TILE_GAP, width), background, dtype=np.uint8)
+        tile[TILE_GAP // 2:TILE_GAP // 2 + gray.shape[0], :gray.shape[1]] = gray
+        tiles.append(tile)
+    return np.vstack(tiles)
+
+
+def create_ocr_engine(engine: str = "auto", tesseract_cmd: Optional[str] = None, tessdata: Optional[str] = None,
+                      config: str = "", cache: Optional[str] = None, templates: Optional[str] = None) -> object:
+    """
+    Creates an OCR engine.
+
+    Args:
+        engine (str): "tesserocr", "pytesseract", "auto" (tesserocr when installed) or "glyph" (glyph_ocr, tesserocr or
+            pytesseract for the crops read with low confidence).
+        tesseract_cmd (Optional[str]): The tesseract executable for pytesseract.
+        tessdata (Optional[str]): The tessdata directory for tesserocr.
+        config (str): Additional tesseract options for pytesseract.
+        cache (Optional[str]): SQLite file of the OCR cache (ocr_cache), defaults to None (identical crops of an image
+            are still read once).
+        templates (Optional[str]): The .npz file of the glyph templates (glyph_ocr), required by the glyph engine.
+
+    Returns:
+        object: The engine with recognize(crops), close() and the counter crops_read.
+
+    Raises:
+        ValueError: Unknown engine or glyph engine without templates.
+    """
+    if engine == "glyph":
+        from glyph_ocr import GlyphEngine, GlyphTemplates
+        if templates is None:
+            raise ValueError("The glyph engine needs a templates file, see glyph_ocr.py")
+        fallback = _create_tesseract_engine("auto", tesseract_cmd, tessdata, config)
+        return CachedOcrEngine(GlyphEngine(GlyphTemplates.load(templates), fallback), OcrCache(cache))
+    return CachedOcrEngine(_create_tesseract_engine(engine, tesseract_cmd, tessdata, config), OcrCache(cache))
+
+
+def _create_tesseract_engine(engine: str, tesseract_cmd: Optional[str], tessdata: Optional[str], config: str) -> object:
+    """
+    Creates a tesseract engine without cache, see create_ocr_engine.
+    """
+    if engine == "auto":
+        try:
+            import tesserocr  # noqa: F401
+            engine = "tesserocr"
+        except ImportError:
+            engine = "pytesseract"
+    if engine == "tesserocr":
+        return TesserocrEngine(tessdata)
+    if engine == "pytesseract":
+        return PytesseractEngine(tesseract_cmd, config)
+    raise ValueError("Unknown OCR engine '%s'" % engine)
+
+
+def parse_overlay_text(text_dict: Dict[str, str], sign_dict: Optional[Dict[str, np.ndarray]]) -> Tuple[str, str, str]:
+    """
+    Retrieves file name and coordinates from the OCR text of the overlay. A minus sign missed by the OCR is restored
+    from the pixels at the sign position.
+
+    Args:
+        text_dict (Dict[str, str]): The text of the "filename", "x" and "y" crops.
+        sign_dict (Optional[Dict[str, np.ndarray]]): The pixels at the minus sign of the x and y value. Values without
+            an entry (or None for both) take the sign from the text only (crops read by the glyph engine, see glyph_ocr).
+
+    Returns:
+        Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
+
+    Raises:
+        ValueError: The text contains no file name or too few coordinates.
+    """
+    match = re.search(FILENAME_REGX, text_dict["filename"])
+    if match is None:
+        raise ValueError("No file name in OCR text %r" % text_dict["filename"])
+    filename = match.group(0)
+    coords = []
+    for key, idx in (("x", 0), ("y", 1)):
+        values = re.findall(COORD_REGX, text_dict[key])
+        if len(values) <= idx:
+            raise ValueError("No %s coordinate in OCR text %r" % (key, text_dict[key]))
+        coord = values[idx]
+
+        if sign_dict is not None and key in sign_dict:
+            # Count the number of black pixels in the image
+            num_black_pixels = np.count_nonzero(sign_dict[key] == 0)
+
+            if coord[0] != "-" and num_black_pixels == 3:
+                coord = "-" + coord
+        coords.append(coord)
+    return filename, coords[0], coords[1]
+
+
+def read_overlay(img_path: str, engine: object) -> Tuple[str, str, str]:
+    """
+    Reads the overlay crops of an image (see bmp_roi) and runs the OCR.
+
+    Args:
+        img_path (str): The file path to the image.
+        engine (object): The OCR engine.
+
+    Returns:
+        Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
+    """
+    return recognize_overlay(read_overlay_rois(img_path), engine)
+
+
+def read_overlay_rois(img_path: str) -> Dict[str, np.ndarray]:
+    """
+    Reads the text and minus sign crops of the overlay (see bmp_roi).
+
+    Args:
+        img_path (str): The file path to the image.
+
+    Returns:
+        Dict[str, np.ndarray]: The crops of VIVASCOPE_TEXT_ROIS and of VIVASCOPE_SIGN_ROIS (prefixed "sign_").
+
+    Raises:
+        OSError: The image can not be read or is truncated.
+    """
+    return read_image_rois(img_path, dict(VIVASCOPE_TEXT_ROIS, **{"sign_" + k: v for k, v in VIVASCOPE_SIGN_ROIS.items()}))
+
+
+def recognize_overlay(rois: Dict[str, np.ndarray], engine: object) -> Tuple[str, str, str]:
+    """
+    Runs the OCR on the overlay crops of read_overlay_rois.
+
+    Args:
+        rois (Dict[str, np.ndarray]): The crops.
+        engine (object): The OCR engine.
+
+    Returns:
+        Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
+    """
+    names = list(VIVASCOPE_TEXT_ROIS)
+    texts, readers = recognize_with_readers(engine, [rois[name] for name in names])
+    readers = dict(zip(names, readers))
+    # the sign pixels are checked for every value not read by a sign reading engine (e.g. the tesseract fallback)
+    sign_dict = {k: rois["sign_" + k] for k in VIVASCOPE_SIGN_ROIS if readers[k] not in SIGN_READING_ENGINES}
+    return parse_overlay_text(dict(zip(names, texts)), sign_dict)
+
+
+def _tesseract_errors() -> Tuple[type, ...]:
+    """
+    Errors of tesseract about one image (pytesseract.TesseractError), empty without pytesseract.
+    """
+    try:
+        from pytesseract import TesseractError
+    except ImportError:
+        return ()
+    return (TesseractError,)
+
+
+# engine of a worker process and the error of its creation, set by _init_worker
+_ENGINE = None
+_ENGINE_ERROR = None
+
+
+def _init_worker(engine: str, tesseract_cmd: Optional[str], tessdata: Optional[str], config: str,
+                 cache: Optional[str], templates: Optional[str]) -> None:
+    """
+    Creates the engine of a worker process. An error is kept and raised by _ocr_job, raising it here would make the
+    pool start new workers forever.
+    """
+    global _ENGINE, _ENGINE_ERROR
+    try:
+        _ENGINE = create_ocr_engine(engine, tesseract_cmd, tessdata, config, cache, templates)
+    except Exception as inst:
+        _ENGINE_ERROR = inst
+
+
+def _ocr_job(job: Tuple[object, str], engine: object = None) -> Tuple[object, Optional[Tuple[str, str, str]], Tuple[int, int, int]]:
+    """
+    Runs one image, in a worker process with the engine of the process.
+
+    Args:
+        job (Tuple[object, str]): The key and the image path.
+        engine (object): The engine, defaults to the engine of the worker process.
+
+    Returns:
+        Tuple[object, Optional[Tuple[str, str, str]], Tuple[int, int, int]]: The key, the result of read_overlay
+        (None if the image could not be read or its text could not be parsed) and the crops read by the engine,
+        cache hits and cache misses of the image.
+
+    Raises:
+        Exception: The engine of the worker process could not be created, or an engine error that is not about the
+            image (e.g. pytesseract.TesseractNotFoundError).
+    """
+    key, img_path = job
+    if engine is None and _ENGINE_ERROR is not None:
+        raise _ENGINE_ERROR
+    engine = engine or _ENGINE
+    before = (engine.crops_read, engine.cache.hits, engine.cache.misses)
+    result = None
+    # unreadable or truncated images, text that can not be parsed and tesseract errors about the image skip the image,
+    # not the run
+    try:
+        rois = read_overlay_rois(img_path)
+    except (ValueError, OSError) as inst:
+        OCR_LOGGER.warning("%s: %s: %s" % (img_path, type(inst).__name__, inst))
+    else:
+        try:
+            result = recognize_overlay(rois, engine)
+        except (ValueError,) + _tesseract_errors() as inst:
+            OCR_LOGGER.warning("%s: %s: %s" % (img_path, type(inst).__name__, inst))
+    after = (engine.crops_read, engine.cache.hits, engine.cache.misses)
+    return key, result, tuple(b - a for a, b in zip(before, after))
+
+
+class OcrService:
+    """
+    Pool of OCR worker processes, each holding one engine for its lifetime.
+    """
+
+    def __init__(self, workers: int = 4, engine: str = "auto", tesseract_cmd: Optional[str] = None,
+                 tessdata: Optional[str] = None, config: str = "", chunksize: int = 8, cache: Optional[str] = None,
+                 templates: Optional[str] = None):
+        """
+        Args:
+            workers (int): The number of processes, 1 runs in this process.
+            engine (str): "tesserocr", "pytesseract", "auto" or "glyph".
+            tesseract_cmd (Optional[str]): The tesseract executable for pytesseract.
+            tessdata (Optional[str]): The tessdata directory for tesserocr.
+            config (str): Additional tesseract options for pytesseract.
+            chunksize (int): The number of images sent to a worker at once.
+            cache (Optional[str]): SQLite file of the OCR cache shared by the workers and runs, defaults to None.
+            templates (Optional[str]): The .npz file of the glyph templates for the glyph engine.
+
+        Raises:
+            Exception: The engine can not be created (e.g. tessdata, language or tesseract_cmd).
+        """
+        self.workers = workers
+        self.chunksize = chunksize
+        self.engine = None
+        self.pool = None
+        # images, crops read by tesseract, cache hits and misses of all workers
+        self.stats = {"images": 0, "crops_read": 0, "cache_hits": 0, "cache_misses": 0}
+        if workers <= 1:
+            self.engine = create_ocr_engine(engine, tesseract_cmd, tessdata, config, cache, templates)
+        else:
+            # one engine in this process, so that a configuration error is raised here and not in every worker
+            create_ocr_engine(engine, tesseract_cmd, tessdata, config, cache, templates).close()
+            self.pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                             initargs=(engine, tesseract_cmd, tessdata, config, cache, templates))
+
+    def __enter__(self) -> "OcrService":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def map(self, jobs: Iterable[Tuple[object, str]]) -> Iterator[Tuple[object, Optional[Tuple[str, str, str]]]]:
+        """
+        Runs the OCR of the images, jobs may be a generator (e.g. fed from a directory walk).
+
+        Args:
+            jobs (Iterable[Tuple[object, str]]): (key, image path) pairs.
+
+        Yields:
+            Tuple[object, Optional[Tuple[str, str, str]]]: The key and (filename, x, y), None if the image could not be
+            read or its text could not be parsed (logged), in the order of the jobs.
+        """
+        if self.pool is None:
+            results = (_ocr_job(job, self.engine) for job in jobs)
+        else:
+            results = self.pool.imap(_ocr_job, jobs, self.chunksize)
+        for key, result, (crops_read, hits, misses) in results:
+            self.stats["images"] += 1
+            self.stats["crops_read"] += crops_read
+            self.stats["cache_hits"] += hits
+            self.stats["cache_misses"] += misses
+            yield key, result
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of the crops answered from the cache.
+
+        Returns:
+            float: The hit rate, 0 without crops.
+        """
+        lookups = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return self.stats["cache_hits"] / lookups if lookups else 0.0
+
+    def close(self) -> None:
+        """
+        Stops the workers or releases the engine.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+
+def iter_overlay_jobs(inpath: str) -> Iterator[Tuple[Tuple[str, str, str, str], str]]:
+    """
+    Walks the study and yields the images to OCR: every "v*" image of the VivaBlock folders (without "#") and the
+    first image v0000000.bmp of the VivaStack folders.
+
+    Args:
+        inpath (str): The input directory path.
+
+    Yields:
+        Tuple[Tuple[str, str, str, str], str]: (subject, parent folder, "block" or "stack", folder name) and the image path.
+    """
+    for root, dirs, _ in os.walk(inpath):
+        for dirname in dirs:
+            if "VivaBlock" in dirname:
+                subj_no = re.search(r"S[0-9]{2}", root).group(0)
+                folderpath = os.path.join(root, dirname)
+                for imgname in os.listdir(folderpath):
+                    if imgname[0] == "v" and "#" not in imgname:
+                        yield (subj_no, root, "block", dirname), os.path.join(folderpath, imgname)
+            elif "VivaStack" in dirname:
+                subj_no = re.search(r"S[0-9]{2}", root).group(0)
+                folderpath = os.path.join(root, dirname)
+                if os.path.exists(os.path.join(folderpath, "v0000000.bmp")):
+                    yield (subj_no, root, "stack", dirname), os.path.join(folderpath, "v0000000.bmp")
+
+
+def collect_stacks_and_blocks(inpath: str, service: OcrService) -> Dict[str, list]:
+    """
+    OCRs the study and collects the coordinates per subject.
+
+    Args:
+        inpath (str): The input directory path.
+        service (OcrService): The OCR service.
+
+    Returns:
+        Dict[str, list]: subject -> [Stack_dict, Block_dict], Stack_dict: folder -> (x, y, path),
+        Block_dict: folder -> [(x, y, path), ...] (structure of create_pickled_dict_containing_stacks_and_blocks_per_subject).
+        Images that could not be read or whose text could not be parsed are left out.
+    """
+    subj_dict = {}
+    subj_roots = {}
+    for (subj_no, root, kind, dirname), result in service.map(iter_overlay_jobs(inpath)):
+        if result is None:
+            continue
+        fn, x, y = result
+        if subj_roots.get(subj_no) != root:
+            # like the serial walk, the last parent folder of a subject wins
+            subj_roots[subj_no] = root
+            subj_dict[subj_no] = [{}, {}]
+        Stack_dict, Block_dict = subj_dict[subj_no]
+        folderpath = os.path.join(root, dirname)
+        if kind == "block":
+            Block_dict.setdefault(dirname, []).append((x, y, os.path.join(folderpath, fn)))
+        else:
+            Stack_dict[dirname] = (x, y, os.path.join(folderpath, fn))
+    return subj_dict
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    OCRs a study with the worker pool and pickles the coordinates per subject.
+
+    Args:
+        argv (Optional[List[str]]): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inpath", help="study directory")
+    parser.add_argument("--output", required=True, help="pickle file for the coordinates")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--engine", choices=["auto", "tesserocr", "pytesseract", "glyph"], default="auto")
+    parser.add_argument("--tesseract-cmd", default=None, help="tesseract executable for pytesseract")
+    parser.add_argument("--tessdata", default=None, help="tessdata directory for tesserocr")
+    parser.add_argument("--cache", default=None, help="SQLite file of the OCR cache, crops read before are not read again")
+    parser.add_argument("--templates", default=None, help=".npz file of the glyph templates (glyph_ocr.py)")
+    args = parser.parse_args(argv)
+
+    with OcrService(args.workers, args.engine, args.tesseract_cmd, args.tessdata, cache=args.cache,
+                    templates=args.templates) as service:
+        subj_dict = collect_stacks_and_blocks(args.inpath, service)
+    OCR_LOGGER.info("%d images, %d crops read, cache hit rate %.1f %%" % (
+        service.stats["images"], service.stats["crops_read"], 100 * service.hit_rate))
+    with open(args.output, "wb") as f:
+        pickle.dump(subj_dict, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,15 @@
 import cv2
 import pytesseract
 import re
-from matplotlib import pyplot as plt
 import os
 import sys
+import argparse
 import numpy as np
 from Util import readData, writeData
 from vivascope_files_cleaning_util import remove_hashes_and_spaces_in_pathdirnames
 from typing import Dict, Tuple
+from bmp_roi import read_image_rois, VIVASCOPE_TEXT_ROIS, VIVASCOPE_SIGN_ROIS
+from ocr_service import parse_overlay_text, OcrService, collect_stacks_and_blocks
 
 
 pytesseract.pytesseract.tesseract_cmd = r"local_path_to_tessaract_install\Tesseract-OCR\tesseract.exe"
@@ -26,7 +28,7 @@ pytesseract.pytesseract.tesseract_cmd = r"local_path_to_tessaract_install\Tesser
 
 
 
-def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
     """
     Specifies the image slice that corresponds to the text of interest.
 
@@ -34,34 +36,37 @@ def create_img_coord_dict(imagepath: str) -> Tuple[Dict[str, np.ndarray], np.nda
         imagepath (str): The file path to the image.
 
     Returns:
-        Tuple[Dict[str, np.ndarray], np.ndarray]: A dictionary mapping text labels to their corresponding image slices and the original image.
+        Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]: A dictionary mapping text labels to their corresponding image slices
+        and a dictionary with the pixels at the minus sign of the x and y value.
+        Uncompressed BMPs are read only at these rows (see bmp_roi), other formats are decoded completely.
     """
-    image = cv2.imread(imagepath)
+    rois = read_image_rois(imagepath, dict(VIVASCOPE_TEXT_ROIS, **{"sign_" + k: v for k, v in VIVASCOPE_SIGN_ROIS.items()}))
 
-    text_dict = {
-        "filename": image[1000:1000+22, 0:0+180],
-        "x": image[1019:1019+25, 0:600],
-        "y": image[1019:1019+25, 0:600]
-    }
+    text_dict = {k: rois[k] for k in VIVASCOPE_TEXT_ROIS}
+    sign_dict = {k: rois["sign_" + k] for k in VIVASCOPE_SIGN_ROIS}
 
-    return text_dict, image
+    return text_dict, sign_dict
 
-def get_text_from_crp_img(crp_img: np.ndarray) -> str:
+def get_text_from_crp_img(crp_img: np.ndarray, display: bool = True) -> str:
     """
     Retrieves text, symbols, and digits from a cropped image slice using Tesseract OCR.
 
     Args:
         crp_img (np.ndarray): The cropped image slice.
+        display (bool): Show the thresholded crop with matplotlib, False does not import matplotlib.
 
     Returns:
         str: The extracted text, symbols, and numbers in string format.
     """
     gray_image = cv2.cvtColor(crp_img, cv2.COLOR_BGR2GRAY)
 
-    # Apply thresholding
-    threshold_image = cv2.threshold(gray_image, 1, 255, cv2.THRESH_BINARY_INV)[1]
+    if display:
+        from matplotlib import pyplot as plt
 
-    plt.imshow(threshold_image)
+        # Apply thresholding
+        threshold_image = cv2.threshold(gray_image, 1, 255, cv2.THRESH_BINARY_INV)[1]
+
+        plt.imshow(threshold_image)
 
     # Apply OCR
     text = pytesseract.image_to_string(gray_image)
@@ -69,47 +74,27 @@ def get_text_from_crp_img(crp_img: np.ndarray) -> str:
     return text
 
 
-def extract_text_from_img_coords(img_path: str) -> Tuple[str, str, str]:
+def extract_text_from_img_coords(img_path: str, display: bool = True) -> Tuple[str, str, str]:
     """
     Extracts text from an image using OCR and processes the output to retrieve specific information.
 
     Args:
         img_path (str): The file path to the image.
+        display (bool): Show the crops with matplotlib.
 
     Returns:
         Tuple[str, str, str]: The extracted filename, x-coordinate, and y-coordinate.
     """
-    filename_regx = r"v[0-9]*.bmp"
-
-    img_coords_dict, img = create_img_coord_dict(img_path)
+    img_coords_dict, sign_dict = create_img_coord_dict(img_path)
 
     extracted_text_dict = {}
     for k, v in img_coords_dict.items():
-        text = get_text_from_crp_img(v)
+        text = get_text_from_crp_img(v, display)
         extracted_text_dict[k] = str(text)
 
     print(extracted_text_dict)
 
-    filename = re.search(filename_regx, extracted_text_dict["filename"]).group(0)
-    x_coord = re.findall(r'[-+]?\d*\.\d+', extracted_text_dict["x"])[0]
-    imgx = np.array(img[1029:1029+3, 21:21+1])
-
-    # Count the number of black pixels in the image
-    num_black_pixels_x = np.count_nonzero(imgx == 0)
-
-    if x_coord[0] != "-" and num_black_pixels_x == 3:
-        x_coord = "-" + x_coord
-
-    y_coord = re.findall(r'[-+]?\d*\.\d+', extracted_text_dict["y"])[1]
-    imgy = np.array(img[1029:1029+3, 105:105+1])
-
-    # Count the number of black pixels in the image
-    num_black_pixels_y = np.count_nonzero(imgy == 0)
-
-    if y_coord[0] != "-" and num_black_pixels_y == 3:
-        y_coord = "-" + y_coord
-
-    print(num_black_pixels_x, num_black_pixels_y)
+    filename, x_coord, y_coord = parse_overlay_text(extracted_text_dict, sign_dict)
     print(filename, x_coord, y_coord)
 
     return filename, x_coord, y_coord
@@ -118,9 +103,25 @@ def main() -> None:
     Main function to process images in the specified directory, extract coordinates,
     and save the results to a dictionary.
     """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="OCR worker processes, 1 runs the OCR serially")
+    parser.add_argument("--no-display", action="store_true", help="do not show the crops with matplotlib")
+    parser.add_argument("--ocr-cache", default=None, help="SQLite file of the OCR cache, crops read before are not read again")
+    parser.add_argument("--glyph-templates", default=None, help="templates of glyph_ocr.py, tesseract only reads uncertain crops")
+    args = parser.parse_args()
+
     PATH = r"path_to_images"
     # remove_hashes_and_spaces_in_pathdirnames(PATH)
 
+    if args.workers > 1 or args.ocr_cache is not None or args.glyph_templates is not None:
+        engine = "auto" if args.glyph_templates is None else "glyph"
+        with OcrService(args.workers, engine, pytesseract.pytesseract.tesseract_cmd, cache=args.ocr_cache,
+                        templates=args.glyph_templates) as service:
+            subj_dict = collect_stacks_and_blocks(PATH, service)
+        print(subj_dict)
+        writeData(subj_dict, r"path\data\data_dict")
+        return
+
     subj_dict = {}
     for root, dirs, _ in os.walk(PATH):
         if len(dirs) != 0:
@@ -134,7 +135,7 @@ def main() -> None:
                     img_tup_list_temp = []
                     for imgname in os.listdir(folderpath):
                         if imgname[0] == "v" and "#" not in imgname:
-                            fn, x, y = extract_text_from_img_coords(os.path.join(folderpath, imgname))
+                            fn, x, y = extract_text_from_img_coords(os.path.join(folderpath, imgname), not args.no_display)
                             img_tup_list_temp.append((x, y, os.path.join(folderpath, fn)))
                     Block_dict[dirname] = img_tup_list_temp
 
@@ -143,7 +144,7 @@ def main() -> None:
                     folderpath = os.path.join(root, dirname)
                     for imgname in os.listdir(folderpath):
                         if imgname == "v0000000.bmp":
-                            fn, x, y = extract_text_from_img_coords(os.path.join(os.path.join(root, dirname), imgname))
+                            fn, x, y = extract_text_from_img_coords(os.path.join(os.path.join(root, dirname), imgname), not args.no_display)
                             Stack_dict[dirname] = (x, y, os.path.join(folderpath, fn))
 
             if subj_no is not None and "S" in subj_no:
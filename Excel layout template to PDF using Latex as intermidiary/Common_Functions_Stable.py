@@ -10,7 +10,7 @@ from string import digits
 import shutil
 import datetime
 import glob
-from ImageAnalysis import Util
+from ImageAnalysis import Barcode, Util
 import cv2
 import sys
 from typing import List, Dict, Any, Optional, Union, Tuple, Callable, Iterable
@@ -60,18 +60,54 @@ def check_for_next_page_request(rownames: List[str], *args: List[Any]) -> List[A
     return args[0]
 
 
-def get_specefic_subj_value(fs: str, fa: str, ft: str, listx: List[str]) -> str:
+# barcode fields of the group keys, from the shared parser of filenames like S001F01T01...
+BARCODE_KEY_FIELDS = ("subject", "area", "time")
+
+
+def barcode_key_function(fields: Iterable[str] = BARCODE_KEY_FIELDS) -> Callable[[str], Optional[Tuple[str, ...]]]:
+    """
+    Creates a function extracting barcode fields from the filename of a path with Barcode.DEFAULT_PARSER.
+
+    :param fields: Fields of the key, from Barcode.BARCODE_FIELDS.
+    :return: Function returning the tuple of fields or None if the filename has no barcode.
+    """
+    positions = [Barcode.DEFAULT_PARSER.fields.index(field) for field in fields]
+
+    def barcode_key(filepath: str) -> Optional[Tuple[str, ...]]:
+        values = Barcode.DEFAULT_PARSER.parse(filepath)
+        if values is None:
+            return None
+        return tuple(values[position] for position in positions)
+    return barcode_key
+
+
+def group_files_by_barcode(filelist: Iterable[str], fields: Iterable[str] = BARCODE_KEY_FIELDS) -> Util.FileGroupIndex:
+    """
+    Parses every filename once and groups the paths by their barcode fields.
+
+    :param filelist: List of file paths.
+    :param fields: Fields of the key, defaults to subject, area and time.
+    :return: Index with O(1) lookup of the paths per key tuple, e.g. index.get(("S001", "F01", "T01")).
+    """
+    return Util.FileGroupIndex(filelist, barcode_key_function(fields))
+
+
+def get_specefic_subj_value(fs: str, fa: str, ft: str, listx: Union[List[str], Util.FileGroupIndex]) -> str:
     """
     Filters a list based on specific criteria.
 
     :param fs: First substring to filter.
     :param fa: Second substring to filter.
     :param ft: Third substring to filter.
-    :param listx: List of strings to filter from.
+    :param listx: List of strings to filter from, or an index from group_files_by_barcode keyed by (fs, fa, ft)
+                  for a lookup instead of a scan.
     :return: The first matching string or 'N.A.' if not found.
     """
-    try:
+    if isinstance(listx, Util.FileGroupIndex):
+        l = listx.get((fs, fa, ft))
+    else:
         l = list(filter(lambda x: fs in x and fa in x and ft in x, listx))
+    try:
         return l[0]
     except IndexError:
         print(f"{fs}{fa}{ft} image not available")
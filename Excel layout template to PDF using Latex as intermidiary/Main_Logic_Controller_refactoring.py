@@ -72,7 +72,8 @@ def main() -> None:
             sys.exit(1)
 
     # Handle missing files and log dummy files
-    filenamelist = Util.getAllFiles(Imp.validated_path, "*.jpg", depth=-1)
+    if Visia_flag:
+        filenamelist = Util.getAllFiles(Imp.validated_path, "*.jpg", depth=-1)  # re-read after renaming
     dummy_list = CFS.replace_missing_barcodes_with_dummy(filenamelist, Visia_flag) 
     
     if dummy_list is not None: 
@@ -1,5 +1,5 @@
 import Common_Functions_Stable as CFS
-import re
+from ImageAnalysis import Barcode, Util
 from typing import List, Tuple, Iterator
 
 def randomize_custom_rand_alllightingcode(
@@ -26,21 +26,16 @@ def randomize_custom_rand_alllightingcode(
     tuple_list_with_path_and_ids = []
 
     # e.g. clone random sequence for each light code in visia 
-    light_id_list = []
-    for filepath in filelist:
-        filenm = filepath.split("\\")[-1]
-        light_code = re.search(r"S[0-9]{3}F[0-9]{2}T[0-9]{2}([0-9A-Za-z]{4})", filenm).group(1)
-        light_id_list.append(light_code)
-        
-    light_id_list = list(set(light_id_list))
+    # barcode with light code parsed once per file, lookups per (subj, ar, time, li) instead of scanning filelist
+    light_parser = Barcode.BarcodeParser(Barcode.BARCODE_LIGHT_MASK)
+    light_id_list = list(set(light_parser.parse_many(filelist)["light"].tolist()) - {""})
+    file_index = Util.FileGroupIndex(filelist, light_parser.parse)
     for subj in sorted_subject_id_list:
         for time in time_id_list:
             for ar in area_id_list:
                 for li in light_id_list:
-                    for filepath in filelist:
-                        filenm = filepath.split("\\")[-1]
-                        if subj in filenm and ar in filenm and time in filenm and li in filenm:
-                            tuple_list_with_path_and_ids.append((filepath, (subj, ar, time, li)))
+                    for filepath in file_index.get((subj, ar, time, li)):
+                        tuple_list_with_path_and_ids.append((filepath, (subj, ar, time, li)))
 
     print(tuple_list_with_path_and_ids)
 
@@ -98,20 +93,21 @@ def randomize_std(
     """
     tuple_list_with_path_and_ids = []
 
+    # parse every filename once, lookups per (subj, ar, tim) instead of scanning filelist
+    file_index = CFS.group_files_by_barcode(filelist)
     for subj in sorted_subject_id_list:
         for ar in area_id_list:
             for tim in time_id_list:
-                for filepath in filelist:
+                for filepath in file_index.get((subj, ar, tim)):
                     filenm = filepath.split("\\")[-1]
-                    if subj in filenm and ar in filenm and tim in filenm:
-                        # validation
-                        val_code = CFS.extract_elements_from_regex_mask(filenm, r"S[0-9]{3}F[0-9]{2}")
-                        comparison = str(subj + ar)
-                        if val_code == comparison:
-                            tuple_list_with_path_and_ids.append((filepath, (subj, ar)))
-                        else:
-                            print(f"val id in path({val_code}) does not match with comparison iterator ({comparison})")
-                            raise BaseException
+                    # validation
+                    val_code = CFS.extract_elements_from_regex_mask(filenm, r"S[0-9]{3}F[0-9]{2}")
+                    comparison = str(subj + ar)
+                    if val_code == comparison:
+                        tuple_list_with_path_and_ids.append((filepath, (subj, ar)))
+                    else:
+                        print(f"val id in path({val_code}) does not match with comparison iterator ({comparison})")
+                        raise BaseException
 
     print(tuple_list_with_path_and_ids)
 
@@ -26,20 +26,21 @@ def randomize_transp(
     # create tuple (filepath, (subid, *areaid/timeid)) # *needs to be changed depending on template requirement
     tuple_list_with_path_and_ids = []
 
+    # parse every filename once, lookups per (subj, ar, tim) instead of scanning filelist
+    file_index = CFS.group_files_by_barcode(filelist)
     for subj in sorted_subject_id_list:
         for ar in area_id_list:
             for tim in time_id_list:
-                for filepath in filelist:
+                for filepath in file_index.get((subj, ar, tim)):
                     filenm = filepath.split("\\")[-1]
-                    if subj in filenm and ar in filenm and tim in filenm:
-                        # validation
-                        val_code = CFS.extract_elements_from_regex_mask(filenm, r"S[0-9]{3}F[0-9]{2}")
-                        comparison = str(subj + ar)
-                        if val_code == comparison:
-                            tuple_list_with_path_and_ids.append((filepath, (subj, ar)))
-                        else:
-                            print(f"val id in path({val_code}) does not match with comparison in iterator ({comparison})")
-                            raise BaseException
+                    # validation
+                    val_code = CFS.extract_elements_from_regex_mask(filenm, r"S[0-9]{3}F[0-9]{2}")
+                    comparison = str(subj + ar)
+                    if val_code == comparison:
+                        tuple_list_with_path_and_ids.append((filepath, (subj, ar)))
+                    else:
+                        print(f"val id in path({val_code}) does not match with comparison in iterator ({comparison})")
+                        raise BaseException
 
     print(tuple_list_with_path_and_ids)
 
@@ -71,9 +72,11 @@ def randomize_transp(
 
     # in case of transpose switch = True
     transposed_derandomized_list = []
+    subj_time_key = CFS.barcode_key_function(("subject", "time"))
+    grouped_by_subj_time = CFS.Util.FileGroupIndex(final_derandomized_list, lambda x: subj_time_key(x[0]))
     for sub in sorted_subject_id_list:
         for time in time_id_list:
-            get_current_sub_list = list(filter(lambda x: sub in x[0].split("\\")[-1] and time in x[0].split("\\")[-1], final_derandomized_list))
+            get_current_sub_list = grouped_by_subj_time.get((sub, time))
             derandomized_paths_grouped_per_subj = sorted(get_current_sub_list, key=lambda x: x[1])
             for sub_tuple in derandomized_paths_grouped_per_subj:
                 transposed_derandomized_list.append(sub_tuple)
@@ -0,0 +1,131 @@
+"""
+Parser for study barcodes in filenames (S###F##T## plus optional Visia light code)
+
+The grammar is compiled once per parser and results are kept in an LRU cache, so repeated lookups of the same file
+(e.g. in the grouping loops of the templates) cost a dict lookup. parse_many returns a structured array with one
+column per field.
+
+usage:
+    import Barcode
+    Barcode.parse_barcode(r"C:\\study\\S001F02T03ABCD_0001.jpg")
+    # ('S001', 'F02', 'T03', '')
+    data = Barcode.parse_many(filenames)
+    data["subject"], data["area"], data["time"], data["matched"]
+
+    visia = Barcode.BarcodeParser(Barcode.BARCODE_LIGHT_MASK)
+    visia.parse("S001F02T03XP01.jpg")
+    # ('S001', 'F02', 'T03', 'XP01')
+"""
+import functools
+import re
+from typing import Iterable, Optional
+import numpy as np
+
+BARCODE_FIELDS = ("subject", "area", "time", "light")
+BARCODE_MASK = r"(?P<subject>S[0-9]{3})(?P<area>F[0-9]{2})(?P<time>T[0-9]{2})"
+BARCODE_LIGHT_MASK = BARCODE_MASK + r"(?P<light>[0-9A-Za-z]{4})"
+DEFAULT_CACHE_SIZE = 2 ** 16
+
+
+def basename(filename: str) -> str:
+    """file name without directory, windows and posix separators on every platform (unlike os.path.basename)
+
+    :param filename: path
+    :type filename: str
+    :return: file name
+    :rtype: str
+    """
+    return filename.rsplit("\\", 1)[-1].rsplit("/", 1)[-1]
+
+
+class BarcodeParser:
+    """parses the named groups of a regular expression from file names, the pattern is compiled once and the results
+    of the last cacheSize names are cached"""
+
+    def __init__(self, parseMask: str = BARCODE_MASK, fields: Iterable[str] = BARCODE_FIELDS,
+                 cacheSize: int = DEFAULT_CACHE_SIZE):
+        """
+        :param parseMask: regular expression with named groups, searched in the file name, defaults to BARCODE_MASK
+        :type parseMask: str, optional
+        :param fields: fields returned in this order, fields missing in parseMask are '', defaults to BARCODE_FIELDS
+        :type fields: Iterable[str], optional
+        :param cacheSize: number of cached results, defaults to DEFAULT_CACHE_SIZE
+        :type cacheSize: int, optional
+        """
+        self.fields = tuple(fields)
+        # fields missing in parseMask are appended as empty groups, so match.group returns all fields at once
+        self.pattern = re.compile(parseMask + "".join("(?P<%s>)" % field for field in self.fields
+                                                      if field not in re.compile(parseMask).groupindex))
+        self.parse = functools.lru_cache(maxsize=cacheSize)(self.__parse)
+
+    def __parse(self, filename: str) -> Optional[tuple[str, ...]]:
+        """parses the file name
+
+        :param filename: path or file name
+        :type filename: str
+        :return: value per field or None if the name does not match
+        :rtype: tuple[str, ...]
+        """
+        match = self.pattern.search(basename(filename))
+        if match is None:
+            return None
+        values = match.group(*self.fields) if len(self.fields) > 1 else (match.group(self.fields[0]),)
+        # optional groups that did not participate
+        return values if None not in values else tuple("" if value is None else value for value in values)
+
+    def parse_many(self, filenames: Iterable[str]) -> np.ndarray:
+        """parses many file names
+
+        :param filenames: paths or file names
+        :type filenames: Iterable[str]
+        :return: structured array with a unicode column per field and the bool column matched
+        :rtype: ndarray
+        """
+        # uncached, names in bulk are usually unique
+        rows = list(map(self.__parse, filenames))
+        empty = ("",) * len(self.fields)
+        columns = list(zip(*[empty if row is None else row for row in rows])) or [()] * len(self.fields)
+        dtype = [(field, "U%d" % max(max(map(len, column), default=0), 1)) for field, column in zip(self.fields, columns)]
+        data = np.empty(len(rows), dtype=dtype + [("matched", bool)])
+        for field, column in zip(self.fields, columns):
+            data[field] = column
+        data["matched"] = [row is not None for row in rows]
+        return data
+
+    def cache_info(self) -> object:
+        """hits, misses and size of the result cache
+
+        :return: functools cache info
+        :rtype: object
+        """
+        return self.parse.cache_info()
+
+    def clear_cache(self) -> None:
+        """empties the result cache"""
+        self.parse.cache_clear()
+
+
+# shared by all scripts parsing the standard barcode
+DEFAULT_PARSER = BarcodeParser()
+
+
+def parse_barcode(filename: str) -> Optional[tuple[str, ...]]:
+    """subject, area, time and light ('' without light code grammar) of a file name with the default parser
+
+    :param filename: path or file name
+    :type filename: str
+    :return: (subject, area, time, light) or None if the name has no barcode
+    :rtype: tuple[str, ...]
+    """
+    return DEFAULT_PARSER.parse(filename)
+
+
+def parse_many(filenames: Iterable[str]) -> np.ndarray:
+    """parses many file names with the default parser
+
+    :param filenames: paths or file names
+    :type filenames: Iterable[str]
+    :return: structured array with the columns subject, area, time, light and matched
+    :rtype: ndarray
+    """
+    return DEFAULT_PARSER.parse_many(filenames)
@@ -0,0 +1,306 @@
+"""
+Persistent file manifest of a study directory (SQLite)
+
+Stores path, size, mtime, the fields parsed by Util.getDataFromFile and optionally the md5 of every file below a root.
+An update only lists the directories whose mtime changed since the last run, all queries are index lookups.
+
+usage:
+    with FileManifest(study_root, parseMask=INPUT_FILE_PARSE_MASK, parseParameters=INPUT_FILE_PARSE_PARAMETERS) as manifest:
+        manifest.update()
+        filenames = manifest.getAllFiles("*.jpg")
+        study_data = manifest.getParsedData("*.jpg")
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Iterable, Optional
+try:
+    from . import Util
+except ImportError:
+    import Util
+
+# manifests are kept outside the study tree: inside, the sqlite file and its journal would be listed by
+# Util.getAllFiles and would change the mtime of their directory (re-listed on every update)
+MANIFEST_DIR_ENV = "FILE_MANIFEST_DIR"
+MANIFEST_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, depth INTEGER, mtime_ns INTEGER);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dir TEXT, name TEXT, depth INTEGER, size INTEGER,
+                                  mtime_ns INTEGER, parsed TEXT, md5 TEXT);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+def default_manifest_file(root: str) -> str:
+    """sqlite file of a root in the manifest directory: $FILE_MANIFEST_DIR, else %LOCALAPPDATA%/file_manifest on
+    Windows or $XDG_CACHE_HOME/file_manifest (~/.cache/file_manifest)
+
+    :param root: study root directory
+    :type root: str
+    :return: <root name>_<hash of the root path>.sqlite in the manifest directory (created if missing)
+    :rtype: str
+    """
+    root = os.path.normpath(os.path.abspath(root))
+    directory = os.environ.get(MANIFEST_DIR_ENV)
+    if not directory:
+        if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+            cache = os.environ["LOCALAPPDATA"]
+        else:
+            cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(cache, "file_manifest")
+    os.makedirs(directory, exist_ok=True)
+    key = hashlib.sha1(os.path.normcase(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory, "%s_%s.sqlite" % (os.path.basename(root) or "root", key))
+
+
+class FileManifest:
+    """manifest of all files below a root directory, paths are stored relative to the root"""
+
+    def __init__(self, root: str, manifestFile: str = None, parseMask: str = None, parseParameters: list[str] = None,
+                 hashFiles: bool = False, excludeDirs: list[str] = ()):
+        """
+        :param root: study root directory
+        :type root: str
+        :param manifestFile: sqlite file, defaults to None (see default_manifest_file). A file inside the root is not
+            listed, but its journal changes the mtime of its directory, which is then listed on every update
+        :type manifestFile: str, optional
+        :param parseMask: regular expression passed to Util.getDataFromFile, defaults to None (no parsing)
+        :type parseMask: str, optional
+        :param parseParameters: parameters passed to Util.getDataFromFile, defaults to None
+        :type parseParameters: list[str], optional
+        :param hashFiles: store the md5 of new and changed files, defaults to False
+        :type hashFiles: bool, optional
+        :param excludeDirs: directory names or masks not to index, defaults to ()
+        :type excludeDirs: list[str], optional
+        """
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.manifestFile = default_manifest_file(self.root) if manifestFile is None else manifestFile
+        self.parseMask = parseMask
+        self.parseParameters = parseParameters
+        self.hashFiles = hashFiles
+        self.excludeDirs = list(excludeDirs)
+        self.__exclude = Util.compile_masks(self.excludeDirs)[0] if self.excludeDirs else None
+        self.__manifest_path = os.path.normpath(os.path.abspath(self.manifestFile))
+        self.connection = sqlite3.connect(self.manifestFile)
+        self.connection.executescript(_SCHEMA)
+        self.__check_settings()
+
+    def __enter__(self) -> "FileManifest":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """closes the database"""
+        self.connection.close()
+
+    def __check_settings(self) -> None:
+        """drops the stored entries if they were created with other settings"""
+        settings = json.dumps({"version": MANIFEST_VERSION, "parseMask": self.parseMask,
+                               "parseParameters": self.parseParameters, "hashFiles": self.hashFiles,
+                               "excludeDirs": self.excludeDirs})
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'settings'").fetchone()
+        if row is not None and row[0] == settings:
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM dirs")
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (settings,))
+
+    def __relative(self, path: str) -> str:
+        """path relative to the root, the root itself is ''
+
+        :param path: absolute path
+        :type path: str
+        :return: relative path
+        :rtype: str
+        """
+        relative = os.path.relpath(path, self.root)
+        return "" if relative == os.curdir else relative
+
+    def __absolute(self, relative: str) -> str:
+        """absolute, normalized path of a stored path
+
+        :param relative: stored path
+        :type relative: str
+        :return: path
+        :rtype: str
+        """
+        return os.path.normpath(os.path.join(self.root, relative))
+
+    def __parse(self, filename: str) -> Optional[str]:
+        """parses the file name
+
+        :param filename: absolute file path
+        :type filename: str
+        :return: parsed values as json or None if the name does not match
+        :rtype: str
+        """
+        if self.parseMask is None:
+            return None
+        try:
+            values = Util.getDataFromFile(filename, self.parseMask, self.parseParameters)
+        except Exception as inst:
+            Util.UTIL_LOGGER.warning("Could not parse %s: %s" % (filename, inst))
+            return None
+        return None if values is None else json.dumps(values[:-1])
+
+    def update(self, full: bool = False) -> dict[str, int]:
+        """brings the manifest up to date. Directories are only listed if their mtime changed, files in an unchanged
+        directory are assumed unchanged (modifying a file in place does not change the directory mtime, use full=True)
+
+        :param full: list every directory and stat every file, defaults to False
+        :type full: bool, optional
+        :return: counts of listed directories, added, changed and removed files
+        :rtype: dict[str, int]
+        """
+        stats = {"dirs_listed": 0, "added": 0, "changed": 0, "removed": 0}
+        stored_dirs = {path: mtime for path, mtime in self.connection.execute("SELECT path, mtime_ns FROM dirs")}
+        with self.connection:
+            stack = [("", 0)]
+            visited = set()
+            while stack:
+                relative, depth = stack.pop()
+                try:
+                    mtime_ns = os.stat(self.__absolute(relative)).st_mtime_ns
+                except OSError:
+                    continue
+                visited.add(relative)
+                if not full and stored_dirs.get(relative) == mtime_ns:
+                    subdirs = [row[0] for row in self.connection.execute("SELECT path FROM dirs WHERE parent = ?",
+                                                                         (relative,))]
+                else:
+                    subdirs = self.__update_directory(relative, depth, mtime_ns, stats)
+                stack.extend((subdir, depth + 1) for subdir in subdirs)
+            for relative in set(stored_dirs) - visited:
+                self.connection.execute("DELETE FROM dirs WHERE path = ?", (relative,))
+                stats["removed"] += self.connection.execute("DELETE FROM files WHERE dir = ?", (relative,)).rowcount
+        return stats
+
+    def __update_directory(self, relative: str, depth: int, mtime_ns: int, stats: dict[str, int]) -> list[str]:
+        """lists one directory and updates its file entries
+
+        :param relative: directory relative to root
+        :type relative: str
+        :param depth: depth below root
+        :type depth: int
+        :param mtime_ns: current mtime of the directory
+        :type mtime_ns: int
+        :param stats: counters to update
+        :type stats: dict[str, int]
+        :return: subdirectories relative to root
+        :rtype: list[str]
+        """
+        stats["dirs_listed"] += 1
+        stored = {row[0]: (row[1], row[2]) for row in
+                  self.connection.execute("SELECT name, size, mtime_ns FROM files WHERE dir = ?", (relative,))}
+        subdirs = []
+        present = set()
+        try:
+            entries = list(os.scandir(self.__absolute(relative)))
+        except OSError:
+            entries = []
+        for entry in entries:
+            # database and its journal
+            if entry.path.startswith(self.__manifest_path):
+                continue
+            try:
+                if entry.is_dir():
+                    # symlinked directories are not followed, like os.walk
+                    if not entry.is_symlink() and (self.__exclude is None or not self.__exclude.match(entry.name)):
+                        subdirs.append(os.path.join(relative, entry.name))
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            present.add(entry.name)
+            if stored.get(entry.name) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            stats["changed" if entry.name in stored else "added"] += 1
+            md5 = Util.md5_for_file(entry.path) if self.hashFiles else None
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (os.path.join(relative, entry.name), relative, entry.name, depth, stat.st_size,
+                                     stat.st_mtime_ns, self.__parse(entry.path), md5))
+        for name in set(stored) - present:
+            self.connection.execute("DELETE FROM files WHERE path = ?", (os.path.join(relative, name),))
+            stats["removed"] += 1
+        self.connection.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                                (relative, os.path.dirname(relative) if relative else None, depth, mtime_ns))
+        return subdirs
+
+    def __select(self, fileMask: list[str] = None, depth: int = -1, casesensitiv: bool = False,
+                 columns: str = "path") -> Iterable[tuple]:
+        """rows of all files matching the masks, sorted by path
+
+        :param fileMask: standard file mask or list of masks, defaults to None (all files)
+        :type fileMask: list[str], optional
+        :param depth: max depth (inclusiv), defaults to -1
+        :type depth: int, optional
+        :param casesensitiv: casesensitiv, defaults to False
+        :type casesensitiv: bool, optional
+        :param columns: columns to select, the name is appended, defaults to "path"
+        :type columns: str, optional
+        :yield: rows (columns..., name)
+        :rtype: Generator[tuple]
+        """
+        query = "SELECT %s, name FROM files" % columns
+        if depth >= 0:
+            rows = self.connection.execute(query + " WHERE depth <= ? ORDER BY path", (depth,))
+        else:
+            rows = self.connection.execute(query + " ORDER BY path")
+        if fileMask is None:
+            yield from rows
+            return
+        if not(isinstance(fileMask, (list, tuple))):
+            fileMask = [fileMask]
+        pattern = Util.compile_masks(fileMask, casesensitiv)[0]
+        for row in rows:
+            if pattern.match(row[-1]):
+                yield row
+
+    def getAllFiles(self, fileMask: list[str] = None, depth: int = -1, casesensitiv: bool = False) -> list[str]:
+        """files matching the masks (like Util.getAllFiles, but sorted by path)
+
+        :param fileMask: standard file mask or list of masks, defaults to None (all files)
+        :type fileMask: list[str], optional
+        :param depth: max depth to search (inclusiv), defaults to -1
+        :type depth: int, optional
+        :param casesensitiv: casesensitiv, defaults to False
+        :type casesensitiv: bool, optional
+        :return: list of all file paths
+        :rtype: list[str]
+        """
+        return [self.__absolute(row[0]) for row in self.__select(fileMask, depth, casesensitiv)]
+
+    def getParsedData(self, fileMask: list[str] = None, depth: int = -1) -> list[list[object]]:
+        """stored results of Util.getDataFromFile, files not matching the parse mask are left out
+
+        :param fileMask: standard file mask or list of masks, defaults to None (all files)
+        :type fileMask: list[str], optional
+        :param depth: max depth (inclusiv), defaults to -1
+        :type depth: int, optional
+        :return: list of [parameter values..., file path]
+        :rtype: list[list[object]]
+        """
+        return [json.loads(row[1]) + [self.__absolute(row[0])]
+                for row in self.__select(fileMask, depth, columns="path, parsed") if row[1] is not None]
+
+    def getFileInfo(self, filename: str) -> Optional[dict]:
+        """stored entry of one file
+
+        :param filename: file path
+        :type filename: str
+        :return: dict with path, size, mtime_ns, parsed and md5 or None if not in the manifest
+        :rtype: dict
+        """
+        row = self.connection.execute("SELECT path, size, mtime_ns, parsed, md5 FROM files WHERE path = ?",
+                                      (self.__relative(os.path.abspath(filename)),)).fetchone()
+        if row is None:
+            return None
+        return {"path": self.__absolute(row[0]), "size": row[1], "mtime_ns": row[2],
+                "parsed": None if row[3] is None else json.loads(row[3]), "md5": row[4]}
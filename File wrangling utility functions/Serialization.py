@@ -0,0 +1,298 @@
+"""
+Binary serialization of point files (PTX/PTP) and intermediate results
+
+The JSON PTX file stays the interchange format. write_ptx_file additionally writes a binary sidecar (<file>.bin):
+a versioned header with the JSON structure and the dense number lists (contours) stored as raw arrays,
+which can be loaded without parsing or memory mapped. read_ptx_file uses the sidecar if it is not older than the PTX.
+
+save_binary/load_binary store any structure of dicts, lists, tuples, scalars and numpy arrays in the same container,
+e.g. as replacement of Util.writeData/readData for dicts of arrays.
+
+file layout:
+    magic (8 bytes) | version (uint32) | reserved (uint32) | header length (uint64) | header (json, utf-8)
+    | arrays, each aligned to 64 bytes, offsets and dtypes in the header
+
+usage:
+    write_ptx_file("S001F01T01.ptx", points)           # S001F01T01.ptx and S001F01T01.ptx.bin
+    points = read_ptx_file("S001F01T01.ptx")            # contours as lists, like json
+    points = read_ptx_file("S001F01T01.ptx", arrays=True, mmap=True)   # contours as read only memory mapped arrays
+"""
+import json
+import logging
+import os
+import struct
+from typing import Optional
+import numpy as np
+
+SERIALIZATION_LOGGER = logging.getLogger("Util_logger")
+
+SIDECAR_SUFFIX = ".bin"
+FORMAT_MAGIC = b"PTXBIN\x00\x00"
+# 2: number lists of tuples (points) stored as arrays of kind "tuples", version 1 files are still read
+FORMAT_VERSION = 2
+# number lists with fewer values stay in the json header
+DEFAULT_MIN_ARRAY_SIZE = 16
+_PREAMBLE = struct.Struct("<8sIIQ")
+_ALIGNMENT = 64
+
+
+class BinaryFormatError(ValueError):
+    """file is not a binary sidecar or has an unsupported version"""
+
+
+def __dense_number_list(value: list) -> Optional[tuple]:
+    """array of a list of ints/floats or of equally long lists or tuples of ints/floats (e.g. points), None for anything
+    else. Only lists whose values all have the same type are converted, so tolist() restores them exactly
+
+    :param value: list
+    :type value: list
+    :return: (array, kind) or None, kind "list" for lists of numbers or of lists, "tuples" for lists of tuples
+    :rtype: tuple
+    """
+    if not value:
+        return None
+    first = value[0]
+    if isinstance(first, (list, tuple)):
+        if not first:
+            return None
+        row_type = type(first)
+        leaf_type = type(first[0])
+        row_length = len(first)
+        if row_type not in (list, tuple) or leaf_type not in (int, float):
+            return None
+        for row in value:
+            if type(row) is not row_type or len(row) != row_length:
+                return None
+            for item in row:
+                if type(item) is not leaf_type:
+                    return None
+        kind = "tuples" if row_type is tuple else "list"
+    else:
+        leaf_type = type(first)
+        if leaf_type not in (int, float):
+            return None
+        for item in value:
+            if type(item) is not leaf_type:
+                return None
+        kind = "list"
+    try:
+        array = np.array(value, dtype=np.int64 if leaf_type is int else np.float64)
+    except OverflowError:
+        return None
+    if leaf_type is int:
+        # smallest integer type holding all values, e.g. int16 for pixel coordinates
+        low, high = int(array.min()), int(array.max())
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return array.astype(dtype), kind
+    return array, kind
+
+
+def __encode(value: object, arrays: list, min_size: int) -> object:
+    """json compatible structure, arrays are replaced by their index in arrays
+
+    :param value: value to encode
+    :type value: object
+    :param arrays: collected (array, kind) tuples
+    :type arrays: list
+    :param min_size: min number of values to store a number list as array
+    :type min_size: int
+    :raises TypeError: unsupported type
+    :return: encoded value
+    :rtype: object
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError("object arrays are not supported")
+        arrays.append((value, "ndarray"))
+        return {"__array__": len(arrays) - 1}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, list):
+        if len(value) * (len(value[0]) if value and isinstance(value[0], (list, tuple)) else 1) >= min_size:
+            dense = __dense_number_list(value)
+            if dense is not None:
+                arrays.append(dense)
+                return {"__array__": len(arrays) - 1}
+        return [__encode(item, arrays, min_size) for item in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [__encode(item, arrays, min_size) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith("__") for key in value):
+            return {key: __encode(item, arrays, min_size) for key, item in value.items()}
+        return {"__items__": [[__encode(key, arrays, min_size), __encode(item, arrays, min_size)]
+                              for key, item in value.items()]}
+    raise TypeError("Type %s can not be stored in a binary sidecar" % type(value).__name__)
+
+
+def __decode(value: object, arrays: list, kinds: list, as_arrays: bool) -> object:
+    """inverse of __encode
+
+    :param value: encoded value
+    :type value: object
+    :param arrays: loaded arrays
+    :type arrays: list
+    :param kinds: "ndarray", "list" or "tuples" per array
+    :type kinds: list
+    :param as_arrays: return number lists as arrays
+    :type as_arrays: bool
+    :return: decoded value
+    :rtype: object
+    """
+    if isinstance(value, list):
+        return [__decode(item, arrays, kinds, as_arrays) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__array__" in value:
+        index = value["__array__"]
+        if kinds[index] == "list" and not as_arrays:
+            return arrays[index].tolist()
+        if kinds[index] == "tuples" and not as_arrays:
+            return list(map(tuple, arrays[index].tolist()))
+        return arrays[index]
+    if "__tuple__" in value:
+        return tuple(__decode(item, arrays, kinds, as_arrays) for item in value["__tuple__"])
+    if "__items__" in value:
+        return {__decode(key, arrays, kinds, as_arrays): __decode(item, arrays, kinds, as_arrays)
+                for key, item in value["__items__"]}
+    return {key: __decode(item, arrays, kinds, as_arrays) for key, item in value.items()}
+
+
+def save_binary(filename: str, data: object, min_size: int = DEFAULT_MIN_ARRAY_SIZE) -> None:
+    """writes data into the binary container, the file is replaced atomically
+
+    :param filename: file to write
+    :type filename: str
+    :param data: dicts, lists, tuples, scalars and numeric numpy arrays
+    :type data: object
+    :param min_size: min number of values to store a number list as array, defaults to DEFAULT_MIN_ARRAY_SIZE
+    :type min_size: int, optional
+    :raises TypeError: data contains unsupported types
+    """
+    arrays = []
+    structure = __encode(data, arrays, min_size)
+    table = []
+    offset = 0
+    for array, kind in arrays:
+        offset += -offset % _ALIGNMENT
+        table.append({"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset, "kind": kind})
+        offset += array.nbytes
+    header = json.dumps({"data": structure, "arrays": table}, separators=(",", ":")).encode("utf-8")
+    data_start = _PREAMBLE.size + len(header)
+    data_start += -data_start % _ALIGNMENT
+    temp_name = filename + ".tmp"
+    with open(temp_name, "wb") as f:
+        f.write(_PREAMBLE.pack(FORMAT_MAGIC, FORMAT_VERSION, 0, len(header)))
+        f.write(header)
+        for (array, kind), entry in zip(arrays, table):
+            f.seek(data_start + entry["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(temp_name, filename)
+
+
+def load_binary(filename: str, mmap: bool = False, arrays: bool = True) -> object:
+    """reads a file written by save_binary
+
+    :param filename: file to read
+    :type filename: str
+    :param mmap: memory map the arrays read only instead of reading them, defaults to False
+    :type mmap: bool, optional
+    :param arrays: return stored number lists as arrays, defaults to True (False restores lists)
+    :type arrays: bool, optional
+    :raises BinaryFormatError: not a binary sidecar or unsupported version
+    :return: stored data
+    :rtype: object
+    """
+    with open(filename, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise BinaryFormatError("Truncated binary file '%s'" % filename)
+        magic, version, _, header_length = _PREAMBLE.unpack(preamble)
+        if magic != FORMAT_MAGIC:
+            raise BinaryFormatError("Not a binary sidecar '%s'" % filename)
+        if not 1 <= version <= FORMAT_VERSION:
+            raise BinaryFormatError("Unsupported version %d of '%s'" % (version, filename))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+        data_start = _PREAMBLE.size + header_length
+        data_start += -data_start % _ALIGNMENT
+        loaded = []
+        for entry in header["arrays"]:
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            count = int(np.prod(shape))
+            if count == 0:
+                loaded.append(np.empty(shape, dtype=dtype))
+            elif mmap:
+                loaded.append(np.memmap(filename, dtype=dtype, mode="r", offset=data_start + entry["offset"], shape=shape))
+            else:
+                f.seek(data_start + entry["offset"])
+                loaded.append(np.fromfile(f, dtype=dtype, count=count).reshape(shape))
+    return __decode(header["data"], loaded, [entry["kind"] for entry in header["arrays"]], arrays)
+
+
+def sidecar_filename(filename: str) -> str:
+    """name of the binary sidecar of a PTX/PTP file
+
+    :param filename: PTX file
+    :type filename: str
+    :return: sidecar file
+    :rtype: str
+    """
+    return filename + SIDECAR_SUFFIX
+
+
+def write_ptx_file(filename: str, points: object, sidecar: bool = True) -> object:
+    """writes the PTX (json) and its binary sidecar
+
+    :param filename: PTX file
+    :type filename: str
+    :param points: PTX content (json compatible)
+    :type points: object
+    :param sidecar: also write the binary sidecar, defaults to True
+    :type sidecar: bool, optional
+    :return: points
+    :rtype: object
+    """
+    with open(filename, "w") as f:
+        json.dump(points, f)
+    if sidecar:
+        save_binary(sidecar_filename(filename), points)
+    return points
+
+
+def sidecar_is_current(filename: str) -> bool:
+    """True if the binary sidecar of a PTX/PTP file exists and is not older than the file
+
+    :param filename: PTX file
+    :type filename: str
+    :return: sidecar can be read instead of the file
+    :rtype: bool
+    """
+    try:
+        return os.stat(sidecar_filename(filename)).st_mtime_ns >= os.stat(filename).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def read_ptx_file(filename: str, mmap: bool = False, arrays: bool = False) -> object:
+    """reads a PTX, from the sidecar if it exists and is not older than the PTX, else from the json
+
+    :param filename: PTX file
+    :type filename: str
+    :param mmap: memory map the contours (sidecar only), defaults to False
+    :type mmap: bool, optional
+    :param arrays: return contours as arrays (sidecar only), defaults to False (lists like json)
+    :type arrays: bool, optional
+    :return: PTX content
+    :rtype: object
+    """
+    if sidecar_is_current(filename):
+        try:
+            return load_binary(sidecar_filename(filename), mmap=mmap, arrays=arrays)
+        except BinaryFormatError as inst:
+            SERIALIZATION_LOGGER.warning("Ignoring sidecar of '%s': %s" % (filename, inst))
+    with open(filename, "r") as f:
+        return json.load(f)
@@ -1,15 +1,11 @@
-﻿
-
+﻿from __future__ import annotations
 import pickle
-from threading import Thread
+from threading import Thread, Timer
 from typing import Callable, Iterable, Optional
-from dask.distributed import get_client
-from dask import delayed
-import psutil
-import imp
+import importlib
 import time
-import jsonpickle
 import json
+import functools
 import itertools
 import re
 import subprocess
@@ -18,12 +14,9 @@ import sys
 import shutil
 import fnmatch
 import os
-try:
-	import git
-except ImportError:
-	pass
 import logging
-import numpy as np
+import logging.handlers
+import numbers
 import filecmp
 import datetime
 from pathlib import Path
@@ -34,9 +27,42 @@ from builtins import zip
 from builtins import map
 from builtins import input
 from future import standard_library
-from past.utils import old_div
 standard_library.install_aliases()
 
+# heavy or optional dependencies are imported on first use (inside the functions or via module __getattr__),
+# so scripts that only need the file helpers do not pay for dask, numpy, psutil, git and jsonpickle at startup
+_LAZY_IMPORTS = {
+    "np": ("numpy", None),
+    "get_client": ("dask.distributed", "get_client"),
+    "delayed": ("dask", "delayed"),
+    "psutil": ("psutil", None),
+    "jsonpickle": ("jsonpickle", None),
+    "git": ("git", None),
+    "imp": ("imp", None),
+    "old_div": ("past.utils", "old_div"),
+    "ThreadPoolExecutor": ("concurrent.futures", "ThreadPoolExecutor"),
+}
+
+
+def __getattr__(name: str) -> object:
+    """imports the lazy module attributes (Util.np, Util.get_client, ...) on first access
+
+    :param name: attribute name
+    :type name: str
+    :raises AttributeError: unknown attribute
+    :return: module or object
+    :rtype: object
+    """
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    moduleName, attribute = _LAZY_IMPORTS[name]
+    value = importlib.import_module(moduleName)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
 UTIL_LOGGER = logging.getLogger("Util_logger")
 if not UTIL_LOGGER.handlers:
     UTIL_LOGGER.setLevel(logging.DEBUG)
@@ -100,6 +126,105 @@ def get_basefilename(filename: str) -> str:
     return os.path.splitext(os.path.split(filename)[-1])[0]
 
 
+def compile_masks(fileMask: list[str], casesensitiv: bool = False) -> tuple[re.Pattern, list[re.Pattern]]:
+    """compiles file masks into one combined regex and one regex per mask
+
+    :param fileMask: list of standard file masks
+    :type fileMask: list[str]
+    :param casesensitiv: casesensitiv, if False masks compare like fnmatch (case insensitive on Windows), defaults to False
+    :type casesensitiv: bool, optional
+    :return: (combined regex, list of regex per mask)
+    :rtype: tuple[re.Pattern, list[re.Pattern]]
+    """
+    flags = 0
+    if not casesensitiv and os.path.normcase("A") == "a":
+        flags = re.IGNORECASE
+    translated = [fnmatch.translate(fMask) for fMask in fileMask]
+    combined = re.compile("|".join("(?:%s)" % t for t in translated), flags)
+    return combined, [re.compile(t, flags) for t in translated]
+
+
+def walkTree(inpath: str, depth: int = -1, excludeDirs: list[str] = ()) -> Iterable[tuple[str, list[str], list[str]]]:
+    """walks a directory tree top down with os.scandir, like os.walk but without descending below depth
+    or into excluded directories. Unreadable directories are skipped, symlinked directories are listed but not followed
+
+    :param inpath: starting path
+    :type inpath: str
+    :param depth: max depth to search (inclusiv), defaults to -1
+    :type depth: int, optional
+    :param excludeDirs: directory names or masks not to descend into, defaults to ()
+    :type excludeDirs: list[str], optional
+    :yield: (directory, names of subdirectories, names of files) for every visited directory
+    :rtype: Generator[tuple[str, list[str], list[str]]]
+    """
+    exclude = compile_masks(list(excludeDirs))[0] if excludeDirs else None
+    stack = [(inpath, 0)]
+    while stack:
+        root, level = stack.pop()
+        dirnames = []
+        filenames = []
+        subdirs = []
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        filenames.append(entry.name)
+                        continue
+                    dirnames.append(entry.name)
+                    if (depth < 0 or level < depth) and not entry.is_symlink() and \
+                            (exclude is None or not exclude.match(entry.name)):
+                        subdirs.append(entry.path)
+        except OSError:
+            continue
+        yield root, dirnames, filenames
+        # reversed so the stack visits subdirectories in scandir order like os.walk
+        stack.extend((subdir, level + 1) for subdir in reversed(subdirs))
+
+
+def getAllFilesByMask(inpath: list[str], fileMask: list[str], depth: int = -1, casesensitiv: bool = False,
+                      excludeDirs: list[str] = (), dirs: bool = False) -> dict[str, list[str]]:
+    """finds files (or directories) for several masks in path and subdirectories (until depth) in a single traversal
+
+    :param inpath: starting path or list of paths
+    :type inpath: list[str]
+    :param fileMask: standard file mask or list of masks
+    :type fileMask: list[str]
+    :param depth: max depth to search (inclusiv), defaults to -1
+    :type depth: int, optional
+    :param casesensitiv: casesensitiv, defaults to False
+    :type casesensitiv: bool, optional
+    :param excludeDirs: directory names or masks not to descend into, defaults to ()
+    :type excludeDirs: list[str], optional
+    :param dirs: match directory names instead of file names, defaults to False
+    :type dirs: bool, optional
+    :return: mask -> list of paths, in the order getAllFiles returns them per mask
+    :rtype: dict[str, list[str]]
+    """
+    if not(isinstance(inpath, (list, tuple))):
+        inpath = [inpath]
+    if not(isinstance(fileMask, (list, tuple))):
+        fileMask = [fileMask]
+    combined, patterns = compile_masks(fileMask, casesensitiv)
+    matches = {fMask: [] for fMask in fileMask}
+    for cpath in inpath:
+        for root, dirnames, filenames in walkTree(cpath, depth, excludeDirs):
+            for name in (dirnames if dirs else filenames):
+                if combined.match(name) is None:
+                    continue
+                path = os.path.normpath(os.path.join(root, name))
+                if len(patterns) == 1:
+                    matches[fileMask[0]].append(path)
+                    continue
+                for fMask, pattern in zip(fileMask, patterns):
+                    if pattern.match(name):
+                        matches[fMask].append(path)
+    return matches
+
+
 def getAllFiles(inpath: str, fileMask: str, depth: int = -1, casesensitiv: bool = False) -> list[str]:
     """ finds files by mask in path and subdirectories (until depth)
 
@@ -114,30 +239,12 @@ def getAllFiles(inpath: str, fileMask: str, depth: int = -1, casesensitiv: bool
     :return: list of all file paths
     :rtype: list[str]
     """
-    matches = []
     if not(isinstance(inpath, (list, tuple))):
         inpath = [inpath]
-    if not(isinstance(fileMask, (list, tuple))):
-        fileMask = [fileMask]
+    matches = []
     for cpath in inpath:
-        if depth >= 0:
-            baseDepth = getPathDepth(cpath)
-        else:
-            baseDepth = 0
-        for fMask in fileMask:
-            for root, dirnames, filenames in os.walk(cpath):
-                if depth >= 0:
-                    cDepth = getPathDepth(root)
-                else:
-                    cDepth = 0
-                if (depth < 0) or (cDepth - baseDepth <= depth):
-                    if not casesensitiv:
-                        for filename in fnmatch.filter(filenames, fMask):
-                            matches.append(os.path.normpath(
-                                os.path.join(root, filename)))
-                    else:
-                        matches.extend([os.path.normpath(os.path.join(root, n))
-                                       for n in filenames if fnmatch.fnmatch(n, fMask)])
+        for mask_matches in getAllFilesByMask(cpath, fileMask, depth, casesensitiv).values():
+            matches.extend(mask_matches)
     return matches
 
 
@@ -155,29 +262,20 @@ def getAllFilesIter(inpath: list[str], fileMask: str, depth: int = -1, casesensi
     :yield: returns a generator with all found files
     :rtype: Generator[str]
     """
-    matches = []
     if not(isinstance(inpath, (list, tuple))):
         inpath = [inpath]
     if not(isinstance(fileMask, (list, tuple))):
         fileMask = [fileMask]
+    if len(fileMask) > 1:
+        # results are ordered by mask, collect them in one traversal
+        yield from getAllFiles(inpath, fileMask, depth, casesensitiv)
+        return
+    pattern = compile_masks(fileMask, casesensitiv)[0]
     for cpath in inpath:
-        if depth >= 0:
-            baseDepth = getPathDepth(cpath)
-        else:
-            baseDepth = 0
-        for fMask in fileMask:
-            for root, dirnames, filenames in os.walk(cpath):
-                if depth >= 0:
-                    cDepth = getPathDepth(root)
-                else:
-                    cDepth = 0
-                if (depth < 0) or (cDepth - baseDepth <= depth):
-                    if not casesensitiv:
-                        for filename in fnmatch.filter(filenames, fMask):
-                            yield os.path.normpath(os.path.join(root, filename))
-                    else:
-                        for ff in [os.path.normpath(os.path.join(root, n)) for n in filenames if fnmatch.fnmatch(n, fMask)]:
-                            yield ff
+        for root, dirnames, filenames in walkTree(cpath, depth):
+            for filename in filenames:
+                if pattern.match(filename):
+                    yield os.path.normpath(os.path.join(root, filename))
 
 
 def getAllDirs(inpath: list[str], fileMask: str, depth: int = -1, casesensitiv: bool = False) -> list[str]:
@@ -194,30 +292,12 @@ def getAllDirs(inpath: list[str], fileMask: str, depth: int = -1, casesensitiv:
     :return: list of filepaths
     :rtype: list[str]
     """
-    matches = []
     if not(isinstance(inpath, (list, tuple))):
         inpath = [inpath]
-    if not(isinstance(fileMask, (list, tuple))):
-        fileMask = [fileMask]
+    matches = []
     for cpath in inpath:
-        if depth >= 0:
-            baseDepth = getPathDepth(cpath)
-        else:
-            baseDepth = 0
-        for fMask in fileMask:
-            for root, dirnames, filenames in os.walk(cpath):
-                if depth >= 0:
-                    cDepth = getPathDepth(root)
-                else:
-                    cDepth = 0
-                if (depth < 0) or (cDepth - baseDepth <= depth):
-                    if not casesensitiv:
-                        for filename in fnmatch.filter(dirnames, fMask):
-                            matches.append(os.path.normpath(
-                                os.path.join(root, filename)))
-                    else:
-                        matches.extend([os.path.normpath(os.path.join(root, n))
-                                       for n in dirnames if fnmatch.fnmatch(n, fMask)])
+        for mask_matches in getAllFilesByMask(cpath, fileMask, depth, casesensitiv, dirs=True).values():
+            matches.extend(mask_matches)
     return matches
 
 
@@ -328,8 +408,9 @@ def backupFile(inFile: str, backupExtension: str = ".bck", maxBackup: int = -1,
     return backupFileName
 
 
-def secureMoveFile(inFile: str, outFile: str, backupDir: str = None) -> None:
-    """copies and moves a file to a new location deleting the old file, verifying equality by using md5 hashes
+def secureMoveFile(inFile: str, outFile: str, backupDir: str = None, block_size: int = 2 ** 20, hashName: str = "md5") -> None:
+    """copies and moves a file to a new location deleting the old file, verifying equality by hashing
+    the source while copying and reading the destination once
 
     :param inFile: file to move
     :type inFile: str
@@ -337,6 +418,10 @@ def secureMoveFile(inFile: str, outFile: str, backupDir: str = None) -> None:
     :type outFile: str
     :param backupDir: backup directory to move outfile to if outfile path does' t exist , defaults to None
     :type backupDir: str, optional
+    :param block_size: copy and hash blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :param hashName: hash to verify with, see get_hasher, defaults to "md5"
+    :type hashName: str, optional
     """
     if backupDir is None:
         backupDir = os.path.join(os.path.split(outFile)[0])
@@ -350,26 +435,24 @@ def secureMoveFile(inFile: str, outFile: str, backupDir: str = None) -> None:
             UTIL_LOGGER.error("Could not remove existing destination File '%s', Exception: %s" % (
                 outFile, inst))  # log error
             sys.exit(1)
-        UTIL_LOGGER.debug("Copy %s -> %s" % (inFile, outFile))
-        shutil.copy(inFile, outFile)
     else:
         createDirectory(backupDir)
-        UTIL_LOGGER.debug("Copy %s -> %s" % (inFile, outFile))
-        shutil.copy(inFile, outFile)
-    md5_1 = md5_for_file(inFile)
-    md5_2 = md5_for_file(outFile)
-    UTIL_LOGGER.debug("Copied %s -> %s, MD5: %s -> %s" %
-                      (inFile, outFile, md5_1, md5_2))
-    if md5_1 != md5_2:
-        UTIL_LOGGER.error("MD5Error in copying '%s' -> '%s', Exception: %s, %s" %
-                          (inFile, outFile, md5_1, md5_2))  # log error
+    UTIL_LOGGER.debug("Copy %s -> %s" % (inFile, outFile))
+    hash_1 = copy_and_hash_file(inFile, outFile, block_size, hashName)
+    hash_2 = hash_for_file(outFile, block_size, hashName)
+    UTIL_LOGGER.debug("Copied %s -> %s, %s: %s -> %s" %
+                      (inFile, outFile, hashName, hash_1, hash_2))
+    if hash_1 != hash_2:
+        UTIL_LOGGER.error("%s Error in copying '%s' -> '%s', Exception: %s, %s" %
+                          (hashName, inFile, outFile, hash_1, hash_2))  # log error
         sys.exit(1)
     else:
         os.remove(inFile)
 
 
-def secureCopyFile(inFile: str, outFile: str, backupDir: str = None) -> str:
-    """creates a copy of a infile to outfile, if outfile exists backups outfile first else creates backup directory
+def secureCopyFile(inFile: str, outFile: str, backupDir: str = None, block_size: int = 2 ** 20, hashName: str = "md5") -> str:
+    """creates a copy of a infile to outfile, if outfile exists backups outfile first else creates backup directory.
+    The source is hashed while copying, the destination is read once to verify
 
     :param inFile: infile to copy
     :type inFile: str
@@ -377,6 +460,10 @@ def secureCopyFile(inFile: str, outFile: str, backupDir: str = None) -> str:
     :type outFile: str
     :param backupDir: backup directory, defaults to None
     :type backupDir: str, optional
+    :param block_size: copy and hash blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :param hashName: hash to verify with, see get_hasher, defaults to "md5"
+    :type hashName: str, optional
     :return: infile
     :rtype: str
     """
@@ -390,21 +477,122 @@ def secureCopyFile(inFile: str, outFile: str, backupDir: str = None) -> str:
             UTIL_LOGGER.error("Could not remove existing destination File '%s', Exception: %s" % (
                 outFile, inst))  # log error
             sys.exit(1)
-        UTIL_LOGGER.debug("Move %s -> %s" % (inFile, outFile))
-        shutil.copy(inFile, outFile)
     else:
         createDirectory(backupDir)
-        UTIL_LOGGER.debug("Copy %s -> %s" % (inFile, outFile))
-        shutil.copy(inFile, outFile)
-    md5_1 = md5_for_file(inFile)
-    md5_2 = md5_for_file(outFile)
-    if md5_1 != md5_2:
-        UTIL_LOGGER.error("MD5Error in copying '%s' -> '%s', Exception: %s, %s" %
-                          (inFile, outFile, md5_1, md5_2))  # log error
+    UTIL_LOGGER.debug("Copy %s -> %s" % (inFile, outFile))
+    hash_1 = copy_and_hash_file(inFile, outFile, block_size, hashName)
+    hash_2 = hash_for_file(outFile, block_size, hashName)
+    if hash_1 != hash_2:
+        UTIL_LOGGER.error("%s Error in copying '%s' -> '%s', Exception: %s, %s" %
+                          (hashName, inFile, outFile, hash_1, hash_2))  # log error
         sys.exit(1)
     return inFile
 
 
+def secureCopyFiles(filePairs: Iterable[tuple[str, str]], move: bool = False, workers: int = 4,
+                    block_size: int = 2 ** 20, hashName: str = "md5") -> list[str]:
+    """copies (or moves) many files in parallel with secureCopyFile/secureMoveFile
+
+    :param filePairs: (infile, outfile) pairs
+    :type filePairs: Iterable[tuple[str, str]]
+    :param move: move instead of copy, defaults to False
+    :type move: bool, optional
+    :param workers: number of threads, 1 copies sequentially, defaults to 4
+    :type workers: int, optional
+    :param block_size: copy and hash blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :param hashName: hash to verify with, see get_hasher, defaults to "md5"
+    :type hashName: str, optional
+    :return: list of infiles
+    :rtype: list[str]
+    """
+    function = secureMoveFile if move else secureCopyFile
+    filePairs = list(filePairs)
+    if workers <= 1:
+        for inFile, outFile in filePairs:
+            function(inFile, outFile, block_size=block_size, hashName=hashName)
+        return [inFile for inFile, _ in filePairs]
+    from concurrent.futures import ThreadPoolExecutor
+    # hashlib and file io release the GIL
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, inFile, outFile, block_size=block_size, hashName=hashName)
+                   for inFile, outFile in filePairs]
+        for future in futures:
+            future.result()
+    return [inFile for inFile, _ in filePairs]
+
+
+def get_hasher(hashName: str = "md5") -> object:
+    """creates a hash object, hashName is a hashlib algorithm (md5, sha512, blake2b, ...)
+    or xxhash (xxh3_128, xxh64, needs the xxhash package)
+
+    :param hashName: name of the hash, defaults to "md5"
+    :type hashName: str, optional
+    :raises ImportError: xxhash requested but not installed
+    :return: object with update() and hexdigest()
+    :rtype: object
+    """
+    if hashName.startswith("xxh"):
+        try:
+            import xxhash
+        except ImportError as exc:
+            raise ImportError("pip install xxhash to use %s" % hashName) from exc
+        return getattr(xxhash, hashName)()
+    return hashlib.new(hashName)
+
+
+def copy_and_hash_file(inFile: str, outFile: str, block_size: int = 2 ** 20, hashName: str = "md5") -> str:
+    """copies a file block by block and hashes every block on the way, the permission bits are copied like shutil.copy
+
+    :param inFile: file to copy
+    :type inFile: str
+    :param outFile: destination file
+    :type outFile: str
+    :param block_size: blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :param hashName: name of the hash, see get_hasher, defaults to "md5"
+    :type hashName: str, optional
+    :return: hash of infile
+    :rtype: str
+    """
+    hasher = get_hasher(hashName)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(inFile, "rb") as source, open(outFile, "wb") as target:
+        while True:
+            size = source.readinto(buffer)
+            if not size:
+                break
+            hasher.update(view[:size])
+            target.write(view[:size])
+    shutil.copymode(inFile, outFile)
+    return hasher.hexdigest()
+
+
+def hash_for_file(filename: str, block_size: int = 2 ** 20, hashName: str = "md5") -> str:
+    """creates a hash of file
+
+    :param filename: file to hash
+    :type filename: str
+    :param block_size: blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :param hashName: name of the hash, see get_hasher, defaults to "md5"
+    :type hashName: str, optional
+    :return: hash as hex
+    :rtype: str
+    """
+    hasher = get_hasher(hashName)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(filename, "rb") as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            hasher.update(view[:size])
+    return hasher.hexdigest()
+
+
 def md5_for_file(filename: str, block_size: int = 2 ** 20, accessType: str = 'b') -> str:
     """creates a md5 hash of file
 
@@ -551,39 +739,237 @@ def get_immediate_subdirectoriesLists(dirList: str, mask: str = None) -> list[st
 class QueueHandler(logging.Handler):
     """
     This is a logging handler which sends events to a multiprocessing queue.
-    The plan is to add it to Python 3.2, but this can be copy pasted into
-    user code for use with earlier Python versions.
+    Records are sent in batches (lists) of up to batchSize records, a batch is sent when it is full,
+    flushInterval seconds after its first record (timer thread, also if the process stops logging) or on flush/close.
+    Pending records are sent at process exit, also in multiprocessing children, which skip logging.shutdown.
+    With a bounded queue (create_logging_queue) a full queue either blocks the producer (backpressure, block=True)
+    or drops the batch, dropped records are counted in self.dropped and reported to the listener with the next batch.
     """
 
-    def __init__(self, queue: list[object]):
+    def __init__(self, queue: list[object], block: bool = False, timeout: float = None, batchSize: int = 1,
+                 flushInterval: float = 1.0):
         """Initialise an instance, using the passed queue.
 
         :param queue: queue
         :type queue: list
+        :param block: wait until the queue has room, defaults to False (drop if full)
+        :type block: bool, optional
+        :param timeout: max seconds to wait if block is set, the batch is dropped afterwards, defaults to None (forever)
+        :type timeout: float, optional
+        :param batchSize: records per queue item, defaults to 1
+        :type batchSize: int, optional
+        :param flushInterval: max seconds a record waits in the batch, defaults to 1.0
+        :type flushInterval: float, optional
         """
         logging.Handler.__init__(self)
         self.queue = queue
+        self.block = block
+        self.timeout = timeout
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.dropped = 0
+        self.__batch = []
+        self.__reportedDropped = 0
+        self.__lastSend = time.monotonic()
+        self.__timer = None
+        # multiprocessing runs the finalizers at the exit of child processes (before the queue is closed, priority 10)
+        # and with atexit in the main process
+        from multiprocessing import util
+        self.__finalizer = util.Finalize(None, self.flush, exitpriority=20)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """merges args and traceback into the message, so the record can be pickled
+
+        :param record: record to send
+        :type record: logging.LogRecord
+        :return: record without args and exc_info
+        :rtype: logging.LogRecord
+        """
+        if record.exc_info:
+            # just to get traceback text into record.exc_text
+            self.format(record)
+            record.exc_info = None  # not needed any more
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
     def emit(self, record: logging.LogRecord):
-        """Emit a record. Writes the LogRecord to the queue.
+        """Emit a record. Adds the LogRecord to the batch and sends the batch if due.
 
         :param record: record to emit
         :type record: logging.LogRecord
         """
         try:
-            ei = record.exc_info
-            if ei:
-                # just to get traceback text into record.exc_text
-                dummy = self.format(record)
-                record.exc_info = None  # not needed any more
-            self.queue.put_nowait(record)
+            self.__batch.append(self.prepare(record))
+            if len(self.__batch) >= self.batchSize or time.monotonic() - self.__lastSend >= self.flushInterval:
+                self.flush()
+            elif self.__timer is None or not self.__timer.is_alive():
+                # the timer of a forked parent does not run in the child
+                self.__timer = Timer(self.flushInterval, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
             self.handleError(record)
 
+    def flush(self) -> None:
+        """sends the pending records, drops them if the queue stays full"""
+        import queue
+        self.acquire()
+        try:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            if not self.__batch:
+                return
+            batch = self.__batch
+            self.__batch = []
+            self.__lastSend = time.monotonic()
+            records = len(batch)
+            if self.dropped > self.__reportedDropped:
+                batch.insert(0, logging.makeLogRecord({
+                    "name": "QueueHandler", "funcName": "flush", "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "%d log records dropped in process %d (queue full)" % (
+                        self.dropped - self.__reportedDropped, os.getpid())}))
+            try:
+                if self.batchSize == 1 and len(batch) == 1:
+                    # single records as before, readable by listeners without batch support
+                    batch = batch[0]
+                if self.block:
+                    self.queue.put(batch, True, self.timeout)
+                else:
+                    self.queue.put_nowait(batch)
+                self.__reportedDropped = self.dropped
+            except queue.Full:
+                self.dropped += records
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """sends the pending records and closes the handler"""
+        self.flush()
+        self.__finalizer.cancel()
+        logging.Handler.close(self)
+
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """file handler flushing to disk after batchSize records or flushInterval seconds instead of after every record,
+    optionally rotating at maxBytes and gzip compressing the rotated files
+    """
+
+    def __init__(self, filename: str, mode: str = "a", maxBytes: int = 0, backupCount: int = 0, compress: bool = False,
+                 batchSize: int = 1, flushInterval: float = 1.0, encoding: str = None):
+        """
+        :param filename: log file
+        :type filename: str
+        :param mode: file mode, always "a" when rotating, defaults to "a"
+        :type mode: str, optional
+        :param maxBytes: rotate when the file would exceed maxBytes, defaults to 0 (never)
+        :type maxBytes: int, optional
+        :param backupCount: number of rotated files to keep, defaults to 0
+        :type backupCount: int, optional
+        :param compress: gzip the rotated files (name.1.gz, ...), defaults to False
+        :type compress: bool, optional
+        :param batchSize: records per flush, defaults to 1
+        :type batchSize: int, optional
+        :param flushInterval: max seconds a written record stays in the buffer, defaults to 1.0
+        :type flushInterval: float, optional
+        :param encoding: file encoding, defaults to None
+        :type encoding: str, optional
+        """
+        logging.handlers.RotatingFileHandler.__init__(self, filename, mode, maxBytes, backupCount, encoding)
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.__pending = 0
+        self.__lastFlush = time.monotonic()
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self.__compress_rotated
+
+    @staticmethod
+    def __compress_rotated(source: str, dest: str) -> None:
+        """gzips the closed log file to dest
+
+        :param source: log file
+        :type source: str
+        :param dest: rotated file name
+        :type dest: str
+        """
+        import gzip
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """writes the record, flushes only if the batch is full or the interval passed
+
+        :param record: record to write
+        :type record: logging.LogRecord
+        """
+        try:
+            if self.maxBytes > 0 and self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self.__pending += 1
+            if self.__pending >= self.batchSize or time.monotonic() - self.__lastFlush >= self.flushInterval:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """writes the buffered records to disk"""
+        logging.handlers.RotatingFileHandler.flush(self)
+        self.__pending = 0
+        self.__lastFlush = time.monotonic()
+
+
+def create_logging_queue(maxsize: int = 10000) -> object:
+    """bounded multiprocessing queue for QueueHandler and listener_process
+
+    :param maxsize: max number of queue items (batches), defaults to 10000
+    :type maxsize: int, optional
+    :return: queue
+    :rtype: multiprocessing.Queue
+    """
+    import multiprocessing
+    return multiprocessing.Queue(maxsize)
+
 
-def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool) -> None:
+def worker_configurer(queue: list[object], level: int = logging.DEBUG, block: bool = False, timeout: float = None,
+                      batchSize: int = 1, flushInterval: float = 1.0) -> QueueHandler:
+    """sends all records of a worker process to the listener
+
+    :param queue: queue read by listener_process
+    :type queue: list
+    :param level: level of the root logger, defaults to logging.DEBUG
+    :type level: int, optional
+    :param block: wait if the queue is full instead of dropping, defaults to False
+    :type block: bool, optional
+    :param timeout: max seconds to wait if block is set, defaults to None (forever)
+    :type timeout: float, optional
+    :param batchSize: records per queue item, defaults to 1
+    :type batchSize: int, optional
+    :param flushInterval: max seconds a record waits in the batch, pending records are also sent at process exit,
+        defaults to 1.0
+    :type flushInterval: float, optional
+    :return: the handler, handler.dropped counts the dropped records
+    :rtype: QueueHandler
+    """
+    handler = QueueHandler(queue, block=block, timeout=timeout, batchSize=batchSize, flushInterval=flushInterval)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool, batchSize: int = 1,
+                        flushInterval: float = 1.0, maxBytes: int = 0, backupCount: int = 0,
+                        compress: bool = False) -> None:
     """Because you'll want to define the logging configurations for listener and 
     workers, the listener and worker process functions take a configurer parameter which is a callablefor configuring logging for that process.
     These functions are also passed the queue, which they use for communication.
@@ -592,7 +978,7 @@ def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool) ->
     records.
     In practice, you would probably want to do ths logic in the worker processes, to avoid
     sending events which would be filtered out between processes.
-    The size of the rotated files is made small so you can see the results easily.
+    Pass the keyword arguments with functools.partial to listener_process.
 
     :param loggerName: name of the logger
     :type loggerName: str
@@ -600,6 +986,17 @@ def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool) ->
     :type loggerFileName: str
     :param newFile: create a new logfile
     :type newFile: bool
+    :param batchSize: records per write to disk, defaults to 1
+    :type batchSize: int, optional
+    :param flushInterval: max seconds a record stays in the buffer, defaults to 1.0
+    :type flushInterval: float, optional
+    :param maxBytes: rotate the log file at maxBytes, defaults to 0 (never). An existing log file is truncated
+        either way, like without rotation
+    :type maxBytes: int, optional
+    :param backupCount: number of rotated files to keep, defaults to 0
+    :type backupCount: int, optional
+    :param compress: gzip the rotated files, defaults to False
+    :type compress: bool, optional
     """
     if newFile and os.path.exists(loggerFileName):
         backupFile(loggerFileName, "_%s.bck" % str(datetime.date.today()))
@@ -611,8 +1008,12 @@ def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool) ->
             sys.exit(1)
     outputDir = os.path.split(loggerFileName)[0]
     createDirectory(outputDir)
+    if maxBytes > 0 and os.path.exists(loggerFileName):
+        # RotatingFileHandler opens in append mode when maxBytes > 0, truncate like mode 'w' does without rotation
+        open(loggerFileName, 'w').close()
     # create file handler which logs even debug messages
-    fh = logging.FileHandler(loggerFileName, 'w')
+    fh = BatchedRotatingFileHandler(loggerFileName, 'w', maxBytes=maxBytes, backupCount=backupCount,
+                                    compress=compress, batchSize=batchSize, flushInterval=flushInterval)
     fh.setLevel(logging.DEBUG)
     # create console handler with a higher log level
     ch = logging.StreamHandler()
@@ -629,9 +1030,11 @@ def listener_configurer(loggerName: str, loggerFileName: str, newFile: bool) ->
     logging.getLogger('').addHandler(fh)
 
 
-def listener_process(queue: list[object], configurer: object, loggerName: str, loggerFileName: str, newFile: bool = False) -> None:
+def listener_process(queue: list[object], configurer: object, loggerName: str, loggerFileName: str, newFile: bool = False,
+                     flushInterval: float = 1.0) -> None:
     """This is the listener process top-level loop: wait for logging events
-    (LogRecords)on the queue and handle them, quit when you get a None for a LogRecord.
+    (LogRecords or lists of LogRecords from a batching QueueHandler) on the queue and handle them,
+    quit when you get a None for a LogRecord. The handlers are flushed when the queue is idle for flushInterval.
 
     :param queue: to wait for logging events
     :type queue: list
@@ -643,21 +1046,31 @@ def listener_process(queue: list[object], configurer: object, loggerName: str, l
     :type loggerFileName: str
     :param newFile: create a new file, defaults to False
     :type newFile: bool, optional
+    :param flushInterval: seconds without records after which the handlers are flushed, defaults to 1.0
+    :type flushInterval: float, optional
     """
+    import queue as queue_module
     configurer(loggerName, loggerFileName, newFile)
     while True:
         try:
-            record = queue.get()
-            if record is None:  # We send this as a sentinel to tell the listener to quit.
+            try:
+                item = queue.get(True, flushInterval)
+            except queue_module.Empty:
+                for handler in logging.getLogger().handlers:
+                    handler.flush()
+                continue
+            if item is None:  # We send this as a sentinel to tell the listener to quit.
                 break
-            logger = logging.getLogger(record.name)
-            # No level or filter logic applied - just do it!
-            logger.handle(record)
+            for record in (item if isinstance(item, list) else (item,)):
+                logger = logging.getLogger(record.name)
+                # No level or filter logic applied - just do it!
+                logger.handle(record)
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
-            import sys
-            UTIL_LOGGER.exception('Whoops! Problem:', file=sys.stderr)
+            UTIL_LOGGER.exception('Whoops! Problem:')
+    for handler in logging.getLogger().handlers:
+        handler.flush()
 
 
 def parseParameterDefinition(value: object, paraName: str) -> object:
@@ -718,6 +1131,18 @@ def parse_parameter_definition_traits(value: object, typ: str) -> object:
         return value
 
 
+@functools.lru_cache(maxsize=256)
+def compile_parse_mask(parseMask: str) -> re.Pattern:
+    """compiled parse mask, each mask is compiled once per process
+
+    :param parseMask: regular expression pattern
+    :type parseMask: str
+    :return: compiled pattern
+    :rtype: re.Pattern
+    """
+    return re.compile(parseMask)
+
+
 def getDataFromFile_traits(filename: str, parseMask: str, parseParameters: list[object]) -> list[object]:
     """gets traits from file
 
@@ -730,7 +1155,7 @@ def getDataFromFile_traits(filename: str, parseMask: str, parseParameters: list[
     :return: list of the parsed parameters
     :rtype: list
     """
-    fileformat = re.compile(parseMask)
+    fileformat = compile_parse_mask(parseMask)
     m = fileformat.search(os.path.split(filename)[-1])
     if m is None:
         return None
@@ -783,7 +1208,7 @@ def getDataFromFile(filename: str, parseMask: str, parseParameters: object) -> l
         outList.append(filename)
         return outList
     else:
-        fileformat = re.compile(parseMask)
+        fileformat = compile_parse_mask(parseMask)
         m = fileformat.search(os.path.split(filename)[-1])
         if m is None:
             return None
@@ -809,7 +1234,8 @@ class NumPyArangeEncoder(json.JSONEncoder):
         :return: list or json str
         :rtype: list, json str
         """
-        if isinstance(obj, np.ndarray):
+        # numpy is only imported if the caller already uses it
+        if "numpy" in sys.modules and isinstance(obj, sys.modules["numpy"].ndarray):
             return obj.tolist()
         return json.JSONEncoder.default(self, obj)
 
@@ -861,16 +1287,32 @@ def write_ptp_file(filename: str, points: object) -> object:
     return points
 
 
-def read_ptx_file(filename: str) -> dict:
+def read_ptx_file(filename: str, sidecar: bool = False, mmap: bool = False) -> dict:
     """reads points from json file with jsonpickle
 
     :param filename: path of file to read
     :type filename: str
+    :param sidecar: read the binary sidecar (see Serialization) if it is up to date, defaults to False
+    :type sidecar: bool, optional
+    :param mmap: return the contours of the sidecar as memory mapped arrays instead of lists, defaults to False
+    :type mmap: bool, optional
     :return: points in dict format or none at failure
     :rtype: dict
     """
+    import jsonpickle
     if os.path.exists(filename):
         try:
+            if sidecar:
+                try:
+                    from . import Serialization
+                except ImportError:
+                    import Serialization
+                # a missing or stale sidecar falls back to jsonpickle below, not to the plain json reader of Serialization
+                if Serialization.sidecar_is_current(filename):
+                    try:
+                        return Serialization.load_binary(Serialization.sidecar_filename(filename), mmap=mmap, arrays=mmap)
+                    except Serialization.BinaryFormatError as inst:
+                        UTIL_LOGGER.warning("Ignoring sidecar of '%s': %s" % (filename, inst))
             with open(filename, 'r') as f:
                 json_str = f.read()
                 points = jsonpickle.decode(json_str)
@@ -908,6 +1350,7 @@ def convert_str2ptx(input: str) -> object:
     :return: dict
     :rtype: object
     """
+    import jsonpickle
     return jsonpickle.decode(input)
 
 
@@ -919,19 +1362,23 @@ def convert_ptx2str(input: object) -> str:
     :return: object in JSON str format
     :rtype: JSON str
     """
+    import jsonpickle
     return jsonpickle.encode(input)
 
 
-def write_ptx_file(filename: str, points: list[tuple[int, int]]) -> Optional[list[tuple[int, int]]]:
+def write_ptx_file(filename: str, points: list[tuple[int, int]], sidecar: bool = False) -> Optional[list[tuple[int, int]]]:
     """creates file storing points in json format with jsonpickle
 
     :param filename: path of file to create
     :type filename: str
     :param points: points to store
     :type points: list[tuple[int,int]
+    :param sidecar: also write the binary sidecar (see Serialization) for fast loading, defaults to False
+    :type sidecar: bool, optional
     :return: points at success, None at failure
     :rtype: Optional[list[tuple[int,int]]]
     """
+    import jsonpickle
     backupFile(filename)
     try:
         f = open(filename, 'w')
@@ -939,6 +1386,12 @@ def write_ptx_file(filename: str, points: list[tuple[int, int]]) -> Optional[lis
             pickled = jsonpickle.encode(points)
             f.write(pickled)
         f.close()
+        if sidecar:
+            try:
+                from . import Serialization
+            except ImportError:
+                import Serialization
+            Serialization.save_binary(Serialization.sidecar_filename(filename), points)
     except Exception as inst:
         UTIL_LOGGER.error("Error writing pointfile '%s', Exception: %s" %
                           (filename, inst))
@@ -1005,8 +1458,15 @@ def dogroupby(k: list[object]) -> list[object]:
     :return: new sorted list with unique elements
     :rtype: list[object]
     """
-    ks = sorted(k)
-    return [i for i, _ in itertools.groupby(ks)]
+    # deduplicate with a dict first (lists are keyed as tuples), then sort only the unique elements
+    unique = {}
+    try:
+        for item in k:
+            unique.setdefault(tuple(item) if isinstance(item, list) else item, item)
+    except TypeError:
+        # unhashable items, e.g. nested lists or dicts: sort everything and drop equal neighbours
+        return [i for i, _ in itertools.groupby(sorted(k))]
+    return sorted(unique.values())
 
 
 def main_is_frozen() -> bool:
@@ -1015,11 +1475,111 @@ def main_is_frozen() -> bool:
     :return: if main is frozen
     :rtype: bool
     """
+    import imp
     return (hasattr(sys, "frozen") or  # new py2exe
             hasattr(sys, "importers")  # old py2exe
             or imp.is_frozen("__main__"))  # tools/freeze
 
 
+class FileGroupIndex(object):
+    """buckets records (e.g. parsed filenames) by a key tuple in one pass,
+    lookup of a group is O(1), iteration is in order of first appearance or sorted by key
+    """
+
+    def __init__(self, records: Iterable[object], keyFunction: Callable[[object], Optional[tuple]]):
+        """
+        :param records: records to group, e.g. the lists returned by getDataFromFile
+        :type records: Iterable[object]
+        :param keyFunction: returns the key tuple of a record, records with key None are skipped
+        :type keyFunction: Callable[[object], Optional[tuple]]
+        """
+        self.groups = {}
+        for record in records:
+            key = keyFunction(record)
+            if key is not None:
+                self.groups.setdefault(key, []).append(record)
+
+    @classmethod
+    def from_fields(cls, records: Iterable[object], keyIndexList: Iterable[int]) -> "FileGroupIndex":
+        """groups indexable records by the fields at keyIndexList
+
+        :param records: records, e.g. the lists returned by getDataFromFile
+        :type records: Iterable[object]
+        :param keyIndexList: indices of the key fields
+        :type keyIndexList: Iterable[int]
+        :return: index
+        :rtype: FileGroupIndex
+        """
+        keyIndexList = list(keyIndexList)
+        return cls(records, lambda record: tuple(record[idx] for idx in keyIndexList))
+
+    @classmethod
+    def from_filenames(cls, filenames: Iterable[str], parseMask: str, parseParameters: list[str],
+                       keyParameters: list[str] = None) -> "FileGroupIndex":
+        """parses every filename once with getDataFromFile and groups the parsed lists, filenames not matching are skipped
+
+        :param filenames: file paths
+        :type filenames: Iterable[str]
+        :param parseMask: regular expression pattern
+        :type parseMask: str
+        :param parseParameters: parameters to parse
+        :type parseParameters: list[str]
+        :param keyParameters: parameters forming the key, defaults to None (all parseParameters)
+        :type keyParameters: list[str], optional
+        :return: index
+        :rtype: FileGroupIndex
+        """
+        if keyParameters is None:
+            keyParameters = parseParameters
+        keyIndexList = [parseParameters.index(param) for param in keyParameters]
+        records = (getDataFromFile(filename, parseMask, parseParameters) for filename in filenames)
+        return cls.from_fields((record for record in records if record is not None), keyIndexList)
+
+    def get(self, key: tuple, default: object = ()) -> list[object]:
+        """records of one group
+
+        :param key: key tuple
+        :type key: tuple
+        :param default: returned if the key does not exist, defaults to ()
+        :type default: object, optional
+        :return: records in input order
+        :rtype: list[object]
+        """
+        return self.groups.get(key, default)
+
+    def __getitem__(self, key: tuple) -> list[object]:
+        return self.groups[key]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.groups
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def __iter__(self) -> Iterable[tuple]:
+        return iter(self.groups)
+
+    def keys(self, sort: bool = False) -> list[tuple]:
+        """key tuples
+
+        :param sort: sort the keys, defaults to False (order of first appearance)
+        :type sort: bool, optional
+        :return: keys
+        :rtype: list[tuple]
+        """
+        return sorted(self.groups) if sort else list(self.groups)
+
+    def items(self, sort: bool = False) -> list[tuple[tuple, list[object]]]:
+        """(key, records) pairs
+
+        :param sort: sort by key, defaults to False (order of first appearance)
+        :type sort: bool, optional
+        :return: groups
+        :rtype: list[tuple[tuple, list[object]]]
+        """
+        return [(key, self.groups[key]) for key in self.keys(sort)]
+
+
 def combine_files_by_keys(study_data: list[dict], keyIndexList: Iterable[int]) -> list[list[dict]]:
     """combine files with keys
 
@@ -1032,14 +1592,73 @@ def combine_files_by_keys(study_data: list[dict], keyIndexList: Iterable[int]) -
     """
     keyIndexList = list(keyIndexList)
     keyIndexList.sort()
+    index = FileGroupIndex.from_fields(study_data, keyIndexList)
+    return [[list(key), group] for key, group in index.items(sort=True)]
+
+
+def __factorize(values: Iterable[object]) -> tuple[list[object], np.ndarray]:
+    """integer code per value, equal values get the same code
+
+    :param values: hashable values
+    :type values: Iterable[object]
+    :return: unique values in order of first appearance, code of each value (index into the unique values)
+    :rtype: tuple[list[object], ndarray]
+    """
+    import numpy as np
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int64)
+    return list(lookup), codes
+
 
-    def keyFunction(key):
-        return [key[idx] for idx in keyIndexList]
-    studyDataCorrList = dogroupby(
-        [[zz[key] for key in list(keyIndexList)] for zz in study_data])  # list of unique
-    combinedDataList = [[key, [z for z in [
-        x for x in study_data if keyFunction(x) == key]]] for key in studyDataCorrList]
-    return combinedDataList
+def find_duplicate_records(records: list[tuple]) -> list[tuple[tuple, int]]:
+    """records occurring more than once, counted by a Counter (hashing the records once is faster than encoding
+    them field by field for np.unique)
+
+    :param records: hashable records of equal length, e.g. study data tuples
+    :type records: list[tuple]
+    :return: (record, count) of every record found more than once, in order of first appearance
+    :rtype: list[tuple[tuple, int]]
+    """
+    import collections
+    counter = collections.Counter(records)
+    if len(counter) == len(records):
+        return []
+    return [(record, count) for record, count in counter.items() if count > 1]
+
+
+def find_missing_combinations(records: list[tuple], keyIndexList: Iterable[int]) -> list[tuple]:
+    """combinations of the values found per key field (e.g. subject x area x time) without a record.
+    Replaces cross_sets and a set difference, the expected cells are a bit mask indexed by mixed radix codes
+    instead of a list of tuples (10^7 cells take ~10 MB)
+
+    :param records: study data tuples
+    :type records: list[tuple]
+    :param keyIndexList: indices of the key fields
+    :type keyIndexList: Iterable[int]
+    :return: missing combinations as tuples of the key fields in order of keyIndexList
+    :rtype: list[tuple]
+    """
+    import numpy as np
+    keyIndexList = list(keyIndexList)
+    if not records or not keyIndexList:
+        return []
+    uniquesPerKey = []
+    codesPerKey = []
+    for key in keyIndexList:
+        uniques, codes = __factorize(record[key] for record in records)
+        uniquesPerKey.append(uniques)
+        codesPerKey.append(codes)
+    radices = tuple(len(uniques) for uniques in uniquesPerKey)
+    found = np.zeros(radices, dtype=bool)
+    found[tuple(codesPerKey)] = True
+    missing = np.nonzero(~found)
+    valuesPerKey = []
+    for uniques, codes in zip(uniquesPerKey, missing):
+        values = np.empty(len(uniques), dtype=object)
+        for idx, value in enumerate(uniques):
+            values[idx] = value
+        valuesPerKey.append(values[codes].tolist())
+    return list(zip(*valuesPerKey))
 
 
 def check_study_input_data(filenames: str, INPUT_FILE_PARSE_MASK: str, INPUT_FILE_PARSE_PARAMETERS: str, NumberOfCorrespondingFiles: int, wait_input: bool = False, do_test: bool = True, key_remove_list: list[int] = [], return_combined: bool = False) -> tuple[list[dict], dict, list[list[dict]]]:
@@ -1078,22 +1697,11 @@ def check_study_input_data(filenames: str, INPUT_FILE_PARSE_MASK: str, INPUT_FIL
         return study_data, None
     if len(study_data) < 1:
         raise Exception('No files with correct name')
-    duplicates = []
-    if len(study_data) != len(set(study_data)):
-        import collections.abc
-        counter = collections.Counter(study_data)
-        duplicates = [x for x in list(counter.items()) if x[1] > 1]
-    keyIndexList = set(range(len(study_data[0]) - 1)) - set(key_remove_list)
+    duplicates = find_duplicate_records(study_data)
+    keyIndexList = sorted(set(range(len(study_data[0]) - 1)) - set(key_remove_list))
     combinedDataList = combine_files_by_keys(
         study_data, keyIndexList)  # list of unique
-    studyDataUniqueList = [list(set([x[index] for x in study_data]))
-                           for index in range(len(study_data[0]) - 1)]
-    studyDataKeyList = [studyDataUniqueList[key] for key in keyIndexList]
-    allDataList = cross_sets(studyDataKeyList)
-    foundDataList = [[zz[key] for key in keyIndexList] for zz in study_data]
-    testList1 = set([tuple(x) for x in allDataList])
-    testList2 = set([tuple(x) for x in foundDataList])
-    missingData = (testList1 - testList2)
+    missingData = find_missing_combinations(study_data, keyIndexList)
     combinedDataList_missing = []
     combinedDataList_duplicates = []
     if NumberOfCorrespondingFiles > 0:
@@ -1197,6 +1805,143 @@ def check_study_data_with_err_data(basepath: str, file_pattern: str, INPUT_FILE_
     return check_study_input_data(filenames, INPUT_FILE_PARSE_MASK, INPUT_FILE_PARSE_PARAMETERS, NumberOfCorrespondingFiles, wait_input=wait_input, do_test=do_test, key_remove_list=key_remove_list)
 
 
+# leading bytes of the image and data formats found in studies, files with other extensions only have to be readable
+FILE_SIGNATURES = {
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".tif": (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"),
+    ".tiff": (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"),
+    ".bmp": (b"BM",),
+    ".gz": (b"\x1f\x8b",),
+    ".zip": (b"PK\x03\x04",),
+}
+
+
+def check_file_integrity(filename: str, hashName: str = None, block_size: int = 2 ** 20) -> dict:
+    """checks that a file is readable, not empty and starts with the signature of its type (FILE_SIGNATURES)
+
+    :param filename: file to check
+    :type filename: str
+    :param hashName: also hash the file, see get_hasher, defaults to None (no hash)
+    :type hashName: str, optional
+    :param block_size: hash blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :return: {"file", "size", "error" (None, "empty", "bad header" or "unreadable: <reason>"), "hash"}
+    :rtype: dict
+    """
+    result = {"file": filename, "size": None, "error": None, "hash": None}
+    try:
+        result["size"] = os.stat(filename).st_size
+        if result["size"] == 0:
+            result["error"] = "empty"
+            return result
+        signatures = FILE_SIGNATURES.get(os.path.splitext(filename)[1].lower(), ())
+        with open(filename, "rb") as f:
+            header = f.read(max((len(signature) for signature in signatures), default=1))
+        if signatures and not header.startswith(signatures):
+            result["error"] = "bad header"
+            return result
+        if hashName is not None:
+            result["hash"] = hash_for_file(filename, block_size, hashName)
+    except OSError as inst:
+        result["error"] = "unreadable: %s" % (inst.strerror or inst)
+    return result
+
+
+def __check_shard_integrity(filenames: list[str], hashName: str, block_size: int) -> list[dict]:
+    """check_file_integrity for the files of one shard, runs in the worker processes of validate_study_data
+
+    :param filenames: files of the shard
+    :type filenames: list[str]
+    :param hashName: hash name or None
+    :type hashName: str
+    :param block_size: hash blocksize
+    :type block_size: int
+    :return: results in order of filenames
+    :rtype: list[dict]
+    """
+    return [check_file_integrity(filename, hashName, block_size) for filename in filenames]
+
+
+def validate_study_data(basepath: str, file_pattern: str, INPUT_FILE_PARSE_MASK: str, INPUT_FILE_PARSE_PARAMETERS: list[str],
+                        NumberOfCorrespondingFiles: int, search_depth: int = 1, key_remove_list: list[int] = [],
+                        subjectIndex: int = 0, hashName: str = None, workers: int = 4, block_size: int = 2 ** 20) -> dict:
+    """validates a study like check_study_data_with_err_data and additionally checks every file (readable, not empty,
+    header, optional hash). The file checks are sharded by subject over a process pool, so the I/O of the subjects overlaps
+    on slow (network) disks. The report is sorted (subjects, files, errors), reports of the same data are equal
+    whatever the number of workers and the order of the directory listing
+
+    :param basepath: base path of data
+    :type basepath: str
+    :param file_pattern: pattern of the files
+    :type file_pattern: str
+    :param INPUT_FILE_PARSE_MASK: parse mask
+    :type INPUT_FILE_PARSE_MASK: str
+    :param INPUT_FILE_PARSE_PARAMETERS: parameters to get
+    :type INPUT_FILE_PARSE_PARAMETERS: list
+    :param NumberOfCorrespondingFiles: number of corresponding files
+    :type NumberOfCorrespondingFiles: int
+    :param search_depth: search depth, defaults to 1
+    :type search_depth: int, optional
+    :param key_remove_list: keys to ignore in key index list, defaults to []
+    :type key_remove_list: list, optional
+    :param subjectIndex: index of the subject in INPUT_FILE_PARSE_PARAMETERS, defaults to 0
+    :type subjectIndex: int, optional
+    :param hashName: hash every file, see get_hasher, defaults to None (no hashes)
+    :type hashName: str, optional
+    :param workers: number of processes, 1 checks sequentially, defaults to 4
+    :type workers: int, optional
+    :param block_size: hash blocksize, defaults to 2**20
+    :type block_size: int, optional
+    :raises Exception: no files with correct name found
+    :return: {"study_data": sorted study data, "errors": naming and completeness errors (see check_study_input_data),
+              "integrity": files failing check_file_integrity, "hashes": file -> hash,
+              "subjects": [{"subject", "files", "bytes", "errors"}] per shard}
+    :rtype: dict
+    """
+    filenames = sorted(getAllFiles(basepath, file_pattern, search_depth))
+    # naming, duplicates and missing combinations need the values of all subjects and are cheap, the shards do the I/O
+    study_data, err_data = check_study_input_data(filenames, INPUT_FILE_PARSE_MASK, INPUT_FILE_PARSE_PARAMETERS,
+                                                  NumberOfCorrespondingFiles, key_remove_list=key_remove_list)
+    shards = FileGroupIndex.from_fields(study_data, [subjectIndex]).items(sort=True)
+    shardFiles = [sorted(record[-1] for record in records) for _, records in shards]
+    if workers <= 1 or len(shards) <= 1:
+        shardResults = [__check_shard_integrity(files, hashName, block_size) for files in shardFiles]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            # map keeps the order of the shards
+            shardResults = list(executor.map(__check_shard_integrity, shardFiles,
+                                             itertools.repeat(hashName), itertools.repeat(block_size)))
+    integrity = []
+    hashes = {}
+    subjects = []
+    for (key, _), results in zip(shards, shardResults):
+        failed = [[result["file"], result["error"]] for result in results if result["error"] is not None]
+        integrity.extend(failed)
+        if hashName is not None:
+            hashes.update((result["file"], result["hash"]) for result in results if result["hash"] is not None)
+        subjects.append({"subject": key[0], "files": len(results), "errors": len(failed),
+                         "bytes": sum(result["size"] or 0 for result in results)})
+    if integrity:
+        UTIL_LOGGER.warning("Damaged files:\n%s" % "\n".join("%s: %s" % (file, error) for file, error in integrity))
+    return {"study_data": study_data, "errors": err_data, "integrity": integrity, "hashes": hashes, "subjects": subjects}
+
+
+def write_validation_report(report: dict, filename: str) -> None:
+    """writes a report of validate_study_data as json with sorted keys, reports of two runs can be compared with diff
+
+    :param report: report
+    :type report: dict
+    :param filename: json file
+    :type filename: str
+    """
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=4, sort_keys=True, default=str)
+        f.write("\n")
+
+
 def writeData(data: object, filename: str, method: Callable = lambda data, f: pickle.dump(data, f, -1)) -> None:
     """write to a already existing file using pickle
 
@@ -1252,6 +1997,7 @@ def writeDataJSON(data: object, filename: str, method: Callable = lambda data, f
     :param method: method , defaults to lambda data
     :type method: Callable, optional
     """
+    import jsonpickle
     writeData(data, filename, method=lambda data,
               f: f.write(jsonpickle.encode(data)))
 
@@ -1264,6 +2010,7 @@ def readDataJSON(filename: str) -> object:
     :return: read data
     :rtype: object
     """
+    import jsonpickle
     return readData(filename, method=lambda x: jsonpickle.decode(x.read()))
 
 
@@ -1275,24 +2022,236 @@ def convert_uint16_to_uint8(image: np.ndarray) -> np.ndarray:
     :return: image in uint8
     :rtype: ndarray
     """
+    import numpy as np
+    from past.utils import old_div
     return (old_div(image, 255)).astype(np.uint8)
 
 
 
 
-def export_for_stat_format(data_dictionary: dict, output_file: str) -> None:
-    """writes data to file
+STAT_EXPORT_FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+
+
+class StatExportWriter:
+    """writes the rows of a statistics export incrementally: tab separated text (format of export_for_stat_format)
+    and optionally a parquet or feather file with typed columns (needs pyarrow). Only batchSize rows are held in memory.
+
+    usage:
+        with StatExportWriter("results.txt", ["subject", "area", "value"], [str, str, float], columnar="parquet") as writer:
+            for row in rows:
+                writer.write_row(row)
+    """
+
+    def __init__(self, output_file: str, header: list[str], dtypes: list[type] = None, columnar: str = None,
+                 batchSize: int = 2 ** 16):
+        """
+        :param output_file: tab separated output file
+        :type output_file: str
+        :param header: column names
+        :type header: list[str]
+        :param dtypes: type per column (int, float, str, bool), defaults to None (inferred from the first batch: the type
+            of the values, int widened to float if the column holds floats, str for mixed or only empty values)
+        :type dtypes: list[type], optional
+        :param columnar: also write "parquet" or "feather" (output_file with that extension), defaults to None
+        :type columnar: str, optional
+        :param batchSize: rows per write, defaults to 2**16
+        :type batchSize: int, optional
+        :raises ValueError: unknown columnar format
+        :raises ImportError: columnar output requested but pyarrow not installed
+        """
+        if columnar is not None and columnar not in STAT_EXPORT_FORMATS:
+            raise ValueError("Unknown columnar format '%s', use one of %s" % (columnar, ", ".join(STAT_EXPORT_FORMATS)))
+        if columnar is not None:
+            try:
+                import pyarrow
+            except ImportError as exc:
+                raise ImportError("pip install pyarrow to export %s" % columnar) from exc
+        self.output_file = output_file
+        self.header = list(header)
+        self.dtypes = list(dtypes) if dtypes is not None else None
+        self.columnar = columnar
+        self.columnar_file = None if columnar is None else os.path.splitext(output_file)[0] + STAT_EXPORT_FORMATS[columnar]
+        self.batchSize = batchSize
+        self.rows = 0
+        self.__batch = []
+        self.__columnar_writer = None
+        backupFile(output_file)
+        self.__outfile = open(output_file, "w")
+        self.__outfile.write("\t".join(self.header) + "\n")
+
+    def __enter__(self) -> "StatExportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write_row(self, row: Iterable[object]) -> None:
+        """adds a row, the values are written as str (None as empty field)
+
+        :param row: one value per column
+        :type row: Iterable[object]
+        """
+        self.__batch.append(row)
+        if len(self.__batch) >= self.batchSize:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Iterable[object]]) -> None:
+        """adds rows, rows may be a generator
+
+        :param rows: rows
+        :type rows: Iterable[Iterable[object]]
+        """
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self) -> None:
+        """writes the buffered rows
 
-    :param data_dictionary: dictionary containing data, must contain 'data' keyword 
+        :raises ValueError: a value does not fit the type of its column (columnar output), nothing of the batch is written
+        """
+        if not self.__batch:
+            return
+        batch, self.__batch = self.__batch, []
+        if self.dtypes is None:
+            self.dtypes = [self.__infer_dtype([row[idx] for row in batch]) for idx in range(len(self.header))]
+        # convert before writing, a value that does not fit its column must not leave the text and columnar files apart
+        columns = self.__columnar_values(batch) if self.columnar is not None else None
+        self.__outfile.write("".join("\t".join("" if value is None else str(value) for value in row) + "\n"
+                                     for row in batch))
+        if columns is not None:
+            self.__write_columnar(columns)
+        self.rows += len(batch)
+
+    # python types stored by pyarrow without loss per column type
+    __NATIVE_TYPES = {int: {int, type(None)}, float: {float, int, type(None)}, bool: {bool, type(None)}}
+
+    @staticmethod
+    def __is_bool(value: object) -> bool:
+        """True for bool and numpy.bool_ values"""
+        return type(value).__name__ in ("bool", "bool_")
+
+    @staticmethod
+    def __fits(value: object, dtype: type) -> bool:
+        """True if the value can be stored in a column of dtype without loss (None always fits)"""
+        if value is None:
+            return True
+        if dtype is bool:
+            return StatExportWriter.__is_bool(value)
+        if dtype is int:
+            return not StatExportWriter.__is_bool(value) and (isinstance(value, numbers.Integral) or
+                                                              (isinstance(value, float) and value.is_integer()))
+        if dtype is float:
+            return not StatExportWriter.__is_bool(value) and isinstance(value, numbers.Real)
+        return True
+
+    @staticmethod
+    def __infer_dtype(values: list) -> type:
+        """type of a column from its values: bool, int, float if any value is a non integer number, else str
+
+        :param values: values of the column, None for empty fields
+        :type values: list
+        :return: column type
+        :rtype: type
+        """
+        # decided per python type of the values, not per value
+        types = set(map(type, values)) - {type(None)}
+        if not types:
+            return str
+        if all(t.__name__ in ("bool", "bool_") for t in types):
+            return bool
+        if any(t.__name__ in ("bool", "bool_") or not issubclass(t, numbers.Real) for t in types):
+            return str
+        return int if all(issubclass(t, numbers.Integral) for t in types) else float
+
+    def __columnar_values(self, batch: list) -> list:
+        """values per column converted to the column type, without loss
+
+        :param batch: rows
+        :type batch: list
+        :raises ValueError: a value does not fit the type of its column (e.g. 2.5 in an int column)
+        :return: values per column
+        :rtype: list
+        """
+        columns = []
+        for idx, (name, dtype) in enumerate(zip(self.header, self.dtypes)):
+            values = [row[idx] for row in batch]
+            # common case: only values of the column type (ints in a float column), passed to pyarrow unchanged
+            if set(map(type, values)) <= self.__NATIVE_TYPES.get(dtype, {str, type(None)}):
+                columns.append(values)
+                continue
+            bad = [value for value in values if not self.__fits(value, dtype)]
+            if bad:
+                raise ValueError("Value %r does not fit column '%s' of type %s, pass dtypes" % (bad[0], name, dtype.__name__))
+            convert = {int: int, float: float, bool: bool}.get(dtype, str)
+            columns.append([None if value is None else convert(value) for value in values])
+        return columns
+
+    def __write_columnar(self, columns: list) -> None:
+        """appends the batch as record batch to the parquet/feather file
+
+        :param columns: values per column of __columnar_values
+        :type columns: list
+        """
+        import pyarrow
+        arrowTypes = {int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_(), str: pyarrow.string()}
+        schema = pyarrow.schema([(name, arrowTypes.get(dtype, pyarrow.string()))
+                                 for name, dtype in zip(self.header, self.dtypes)])
+        if self.__columnar_writer is None:
+            if self.columnar == "parquet":
+                import pyarrow.parquet
+                self.__columnar_writer = pyarrow.parquet.ParquetWriter(self.columnar_file, schema)
+            else:
+                import pyarrow.ipc
+                # feather v2 is the arrow ipc file format
+                self.__columnar_writer = pyarrow.ipc.new_file(self.columnar_file, schema)
+        arrays = [pyarrow.array(values, type=schema.field(idx).type) for idx, values in enumerate(columns)]
+        self.__columnar_writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+
+    def close(self) -> None:
+        """writes the remaining rows and closes the files"""
+        if self.__outfile.closed:
+            return
+        self.flush()
+        self.__outfile.close()
+        if self.__columnar_writer is not None:
+            self.__columnar_writer.close()
+
+
+def export_for_stat_format(data_dictionary: dict, output_file: str, columnar: str = None, dtypes: list[type] = None) -> int:
+    """writes data to file, 'data' may be a generator, the rows are written in batches with StatExportWriter
+
+    :param data_dictionary: dictionary containing data, must contain 'header' and 'data' keyword
     :type data_dictionary: dict
     :param output_file: file to write in
     :type output_file: str
+    :param columnar: also write "parquet" or "feather" with typed columns (needs pyarrow), defaults to None
+    :type columnar: str, optional
+    :param dtypes: type per column, defaults to None (inferred from the first batch, see StatExportWriter)
+    :type dtypes: list[type], optional
+    :return: number of rows
+    :rtype: int
+    """
+    with StatExportWriter(output_file, data_dictionary['header'], dtypes=dtypes, columnar=columnar) as writer:
+        writer.write_rows(data_dictionary['data'])
+    return writer.rows
+
+
+def read_stat_export(filename: str, columns: list[str] = None) -> object:
+    """reads an export of export_for_stat_format into a pandas DataFrame, parquet and feather files read only columns
+
+    :param filename: tab separated, .parquet or .feather file
+    :type filename: str
+    :param columns: columns to read, defaults to None (all)
+    :type columns: list[str], optional
+    :return: data
+    :rtype: DataFrame
     """
-    backupFile(output_file)
-    header = data_dictionary['header']
-    with open(output_file, "w") as outfile:
-        outfile.write("\t".join(header) + "\n")
-        for dt in data_dictionary['data']:
-            outfile.write("\t".join(dt) + "\n")
+    import pandas as pd
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == STAT_EXPORT_FORMATS["parquet"]:
+        return pd.read_parquet(filename, columns=columns)
+    if extension == STAT_EXPORT_FORMATS["feather"]:
+        return pd.read_feather(filename, columns=columns)
+    return pd.read_csv(filename, sep="\t", usecols=columns)
 
 
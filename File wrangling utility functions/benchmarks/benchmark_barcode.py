@@ -0,0 +1,113 @@
+"""
+Micro-benchmark of barcode parsing in parses per second: re.compile + search per file name (the former
+getDataFromBasefile) against Barcode.BarcodeParser.parse (uncached and cached) and parse_many
+
+usage:
+    python benchmark_barcode.py --files 200000 --output barcode.json
+"""
+import argparse
+import importlib
+import json
+import re
+import sys
+import time
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Barcode"
+
+
+def create_filenames(count: int) -> list[str]:
+    """synthetic Visia file names
+
+    :param count: number of files
+    :type count: int
+    :return: paths
+    :rtype: list[str]
+    """
+    lights = ("XP01", "UV02", "PL03", "ST04")
+    return ["C:\\study\\S%03dF%02dT%02d%s_%04d.jpg" % (index % 997, index % 13, index % 7, lights[index % 4], index)
+            for index in range(count)]
+
+
+def parse_legacy(filenames: list[str], parseMask: str) -> list[Optional[tuple[str, ...]]]:
+    """compiles the mask for every file name
+
+    :param filenames: paths
+    :type filenames: list[str]
+    :param parseMask: regular expression with named groups
+    :type parseMask: str
+    :return: parsed groups per file
+    :rtype: list[tuple[str, ...]]
+    """
+    results = []
+    for filename in filenames:
+        match = re.compile(parseMask).search(filename.split("\\")[-1])
+        results.append(None if match is None else match.groups())
+    return results
+
+
+def rate(function, filenames: list[str], repeats: int) -> tuple[object, float]:
+    """calls function repeats times
+
+    :param function: parser taking the list of file names
+    :type function: Callable
+    :param filenames: paths
+    :type filenames: list[str]
+    :param repeats: number of runs, the fastest is reported
+    :type repeats: int
+    :return: (result of the last run, fastest wall time in s)
+    :rtype: tuple[object, float]
+    """
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(filenames)
+        durations.append(time.perf_counter() - start)
+    return result, min(durations)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs all parsers and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if the results differ
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Barcode")
+    parser.add_argument("--files", type=int, default=200000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="barcode_results.json")
+    args = parser.parse_args(argv)
+
+    barcode = importlib.import_module(args.module)
+    filenames = create_filenames(args.files)
+    # own parser, the cache of the default parser is shared with other callers
+    barcode_parser = barcode.BarcodeParser(barcode.BARCODE_LIGHT_MASK, cacheSize=2 * args.files)
+    mask = barcode.BARCODE_LIGHT_MASK
+
+    def parse_uncached(names):
+        barcode_parser.clear_cache()
+        return [barcode_parser.parse(name) for name in names]
+
+    def parse_cached(names):
+        return [barcode_parser.parse(name) for name in names]
+    legacy, legacy_s = rate(lambda names: parse_legacy(names, mask), filenames, args.repeats)
+    cold, cold_s = rate(parse_uncached, filenames, args.repeats)
+    warm, warm_s = rate(parse_cached, filenames, args.repeats)
+    columns, many_s = rate(barcode_parser.parse_many, filenames, args.repeats)
+    identical = legacy == cold == warm and list(zip(*(columns[field].tolist() for field in barcode_parser.fields))) == legacy
+    record = {"files": args.files}
+    for name, duration in (("legacy", legacy_s), ("parse", cold_s), ("parse_cached", warm_s), ("parse_many", many_s)):
+        record[name + "_per_s"] = args.files / duration
+        print("%-13s %12.0f parses/s" % (name, record[name + "_per_s"]))
+    record["identical"] = identical
+    print("results identical: %s" % identical)
+    with open(args.output, "w") as f:
+        json.dump(record, f, indent=4)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Benchmark of grouping study files by subject, area and time: the nested loop scanning the whole file list per key
+(as in the randomization templates and Keep_last_image_from_image_batch) against Util.FileGroupIndex
+
+Synthetic filenames S<subject>F<area>T<time>_<n>.jpg, the legacy loop is skipped above --max-legacy files.
+
+usage:
+    python benchmark_grouping.py --sizes 1000 10000 50000 200000 --output grouping.json
+"""
+import argparse
+import importlib
+import json
+import re
+import sys
+import time
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+AREAS = 10
+TIMES = 5
+IMAGES_PER_KEY = 2
+BARCODE = re.compile(r"(S[0-9]{3,})(F[0-9]{2})(T[0-9]{2})")
+
+
+def create_filenames(count: int) -> tuple[list[str], list[str], list[str], list[str]]:
+    """synthetic study filenames
+
+    :param count: number of files
+    :type count: int
+    :return: (filenames, subjects, areas, times)
+    :rtype: tuple[list[str], list[str], list[str], list[str]]
+    """
+    subjects = ["S%03d" % index for index in range(1, max(count // (AREAS * TIMES * IMAGES_PER_KEY), 1) + 1)]
+    areas = ["F%02d" % index for index in range(1, AREAS + 1)]
+    times = ["T%02d" % index for index in range(1, TIMES + 1)]
+    filenames = []
+    for index in range(count):
+        subject = subjects[index // (AREAS * TIMES * IMAGES_PER_KEY) % len(subjects)]
+        area = areas[index // (TIMES * IMAGES_PER_KEY) % AREAS]
+        timepoint = times[index // IMAGES_PER_KEY % TIMES]
+        filenames.append("C:\\study\\%s%s%s_%d.jpg" % (subject, area, timepoint, index))
+    return filenames, subjects, areas, times
+
+
+def group_legacy(filenames: list[str], subjects: list[str], areas: list[str], times: list[str]) -> dict[tuple, list[str]]:
+    """the former nested loop, one scan of filenames per (subject, area, time)
+
+    :return: key -> filenames
+    :rtype: dict[tuple, list[str]]
+    """
+    groups = {}
+    for subj in subjects:
+        for ar in areas:
+            for tim in times:
+                for filepath in filenames:
+                    filenm = filepath.split("\\")[-1]
+                    if subj in filenm and ar in filenm and tim in filenm:
+                        groups.setdefault((subj, ar, tim), []).append(filepath)
+    return groups
+
+
+def group_indexed(util, filenames: list[str], subjects: list[str], areas: list[str], times: list[str]) -> dict[tuple, list[str]]:
+    """one pass over filenames into Util.FileGroupIndex, then one lookup per key
+
+    :return: key -> filenames
+    :rtype: dict[tuple, list[str]]
+    """
+    def barcode_key(filepath):
+        match = BARCODE.search(filepath.split("\\")[-1])
+        return None if match is None else match.groups()
+    index = util.FileGroupIndex(filenames, barcode_key)
+    groups = {}
+    for subj in subjects:
+        for ar in areas:
+            for tim in times:
+                group = index.get((subj, ar, tim))
+                if group:
+                    groups[(subj, ar, tim)] = list(group)
+    return groups
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs both groupings per size and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if the results differ
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="number of filenames")
+    parser.add_argument("--max-legacy", type=int, default=20000, help="largest size the nested loop is run for")
+    parser.add_argument("--output", default="grouping_results.json")
+    args = parser.parse_args(argv)
+
+    util = importlib.import_module(args.module)
+    results = []
+    exit_code = 0
+    for count in args.sizes:
+        filenames, subjects, areas, times = create_filenames(count)
+        record = {"files": count, "keys": len(subjects) * len(areas) * len(times)}
+        start = time.perf_counter()
+        indexed = group_indexed(util, filenames, subjects, areas, times)
+        record["indexed_s"] = time.perf_counter() - start
+        if count <= args.max_legacy:
+            start = time.perf_counter()
+            legacy = group_legacy(filenames, subjects, areas, times)
+            record["legacy_s"] = time.perf_counter() - start
+            record["identical"] = legacy == indexed
+            exit_code = exit_code if record["identical"] else 1
+        print("%7d files %7d keys  legacy %s  indexed %8.4f s" % (
+            count, record["keys"], "%8.3f s" % record["legacy_s"] if "legacy_s" in record else "       -  ",
+            record["indexed_s"]))
+        results.append(record)
+    with open(args.output, "w") as f:
+        json.dump({"results": results}, f, indent=4)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Throughput benchmark of multiprocess logging: producer processes log through Util.QueueHandler to one
+Util.listener_process writing the file
+
+Runs the former setup (unbounded queue, one record per queue item, flush per record) and the batched setup
+(bounded queue, batches of --batch records, flush per batch) and reports records per second,
+records found in the log file and dropped records.
+
+usage:
+    python benchmark_logging.py --producers 8 --records 20000 --batch 256 --output logging.json
+"""
+import argparse
+import functools
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+
+
+def producer(module: str, queue: object, records: int, config: dict, results: object) -> None:
+    """logs records through a QueueHandler, reports the dropped count
+
+    :param module: import path of Util
+    :type module: str
+    :param queue: logging queue
+    :type queue: multiprocessing.Queue
+    :param records: number of records
+    :type records: int
+    :param config: keyword arguments of Util.worker_configurer
+    :type config: dict
+    :param results: queue for the dropped count
+    :type results: multiprocessing.Queue
+    """
+    util = importlib.import_module(module)
+    handler = util.worker_configurer(queue, **config)
+    logger = logging.getLogger("producer.%d" % os.getpid())
+    for index in range(records):
+        logger.info("file %d of %d processed: %s", index, records, "S001F01T01_%04d.jpg" % index)
+    handler.close()
+    logging.getLogger().removeHandler(handler)
+    results.put(handler.dropped)
+
+
+def run(module: str, directory: str, name: str, producers: int, records: int, queue_size: int, worker_config: dict,
+        listener_config: dict) -> dict:
+    """one listener and the producers
+
+    :return: result record
+    :rtype: dict
+    """
+    util = importlib.import_module(module)
+    log_file = os.path.join(directory, name + ".log")
+    queue = util.create_logging_queue(queue_size)
+    results = multiprocessing.Queue()
+    configurer = functools.partial(util.listener_configurer, **listener_config)
+    listener = multiprocessing.Process(target=util.listener_process,
+                                       args=(queue, configurer, name, log_file, False, 0.5))
+    listener.start()
+    workers = [multiprocessing.Process(target=producer, args=(module, queue, records, worker_config, results))
+               for _ in range(producers)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    dropped = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    queue.put(None)
+    listener.join()
+    duration = time.perf_counter() - start
+    with open(log_file, "r") as f:
+        lines = sum(1 for line in f if " processed: " in line)
+    record = {"setup": name, "producers": producers, "records": producers * records, "queue_size": queue_size,
+              "worker": worker_config, "listener": listener_config, "wall_s": duration,
+              "records_per_s": producers * records / duration, "written": lines, "dropped": dropped}
+    print("%-8s %8d records %7.2f s %10.0f records/s  written %8d  dropped %d" % (
+        name, record["records"], duration, record["records_per_s"], lines, dropped))
+    return record
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs both setups and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if records are missing without being counted as dropped
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--records", type=int, default=20000, help="records per producer")
+    parser.add_argument("--batch", type=int, default=256, help="records per queue item and per disk write")
+    parser.add_argument("--queue-size", type=int, default=1000, help="max queue items of the batched setup")
+    parser.add_argument("--drop", action="store_true", help="drop batches if the queue is full instead of blocking")
+    parser.add_argument("--output", default="logging_results.json")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="logging_")
+    try:
+        results = [
+            run(args.module, directory, "former", args.producers, args.records, 0, {}, {}),
+            run(args.module, directory, "batched", args.producers, args.records, args.queue_size,
+                {"block": not args.drop, "batchSize": args.batch},
+                {"batchSize": args.batch}),
+        ]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"results": results}, f, indent=4)
+    return 0 if all(r["written"] + r["dropped"] == r["records"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark of secureCopyFile: the former copy + md5 of source + md5 of destination (three passes)
+against hashing while copying with one verification read, sequential and parallel, for several hashes
+
+usage:
+    python benchmark_secure_copy.py --count 1000 --size-mb 20 --hashes md5 blake2b xxh3_128 --workers 1 4 --output copy.json
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+
+
+def create_files(directory: str, count: int, size_mb: float) -> list[str]:
+    """writes count files of random data
+
+    :param directory: target directory
+    :type directory: str
+    :param count: number of files
+    :type count: int
+    :param size_mb: size of every file in MB
+    :type size_mb: float
+    :return: file paths
+    :rtype: list[str]
+    """
+    data = os.urandom(int(size_mb * 2 ** 20))
+    paths = []
+    for index in range(count):
+        paths.append(os.path.join(directory, "file_%d.bin" % index))
+        with open(paths[-1], "wb") as f:
+            f.write(data[index % 256:] + data[:index % 256])
+    return paths
+
+
+def legacy_secure_copy(util: object, inFile: str, outFile: str) -> None:
+    """the former secureCopyFile verification: copy, then md5 of both files
+
+    :param util: Util module
+    :type util: object
+    :param inFile: file to copy
+    :type inFile: str
+    :param outFile: destination
+    :type outFile: str
+    """
+    shutil.copy(inFile, outFile)
+    if util.md5_for_file(inFile) != util.md5_for_file(outFile):
+        raise RuntimeError("md5 mismatch %s" % outFile)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs all variants and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--size-mb", type=float, default=20)
+    parser.add_argument("--hashes", nargs="+", default=["md5", "blake2b", "xxh3_128"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--block-size", type=int, default=2 ** 20)
+    parser.add_argument("--dir", default=None, help="directory for the test files, defaults to the temp directory")
+    parser.add_argument("--output", default="secure_copy_results.json")
+    args = parser.parse_args(argv)
+
+    util = importlib.import_module(args.module)
+    work_dir = tempfile.mkdtemp(prefix="secure_copy_", dir=args.dir)
+    total_mb = args.count * args.size_mb
+    results = []
+    try:
+        sources = create_files(work_dir, args.count, args.size_mb)
+        target_dir = os.path.join(work_dir, "copies")
+        os.mkdir(target_dir)
+        targets = [os.path.join(target_dir, os.path.basename(path)) for path in sources]
+
+        def run(name: str, function, **record):
+            for target in targets:
+                if os.path.exists(target):
+                    os.remove(target)
+            start = time.perf_counter()
+            try:
+                function()
+            except ImportError as inst:
+                print("%-36s skipped: %s" % (name, inst))
+                return
+            duration = time.perf_counter() - start
+            record.update({"variant": name, "wall_s": duration, "mb_per_s": total_mb / duration})
+            print("%-36s %8.2f s %8.1f MB/s" % (name, duration, record["mb_per_s"]))
+            results.append(record)
+
+        run("legacy copy + 2x md5", lambda: [legacy_secure_copy(util, s, t) for s, t in zip(sources, targets)],
+            hashName="md5", workers=1)
+        for hash_name in args.hashes:
+            for workers in args.workers:
+                run("hash while copying %s, %d worker(s)" % (hash_name, workers),
+                    lambda: util.secureCopyFiles(zip(sources, targets), workers=workers, block_size=args.block_size,
+                                                 hashName=hash_name),
+                    hashName=hash_name, workers=workers)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"count": args.count, "size_mb": args.size_mb, "block_size": args.block_size, "results": results},
+                  f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
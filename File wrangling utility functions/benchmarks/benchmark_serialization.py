@@ -0,0 +1,132 @@
+"""
+Benchmark of PTX serialization with dense contours: jsonpickle (Util.write_ptx_file/read_ptx_file), json and the
+binary sidecar of Serialization (read to lists, to arrays and memory mapped). Reports save/load times and file sizes.
+The contour points are lists ([x, y] like json) or tuples ((x, y) like Util.write_ptx_file points), see --rows.
+
+usage:
+    python benchmark_serialization.py --contours 50 --points 20000 --output serialization.json
+    python benchmark_serialization.py --rows tuples
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Serialization"
+
+
+def create_points(contours: int, points: int, seed: int = 0, row_type: type = list) -> list[dict]:
+    """PTX content with dense integer contours
+
+    :param contours: number of contours
+    :type contours: int
+    :param points: points per contour
+    :type points: int
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :param row_type: type of a point, list or tuple, defaults to list
+    :type row_type: type, optional
+    :return: PTX content
+    :rtype: list[dict]
+    """
+    rng = random.Random(seed)
+    return [{"id": index, "name": "contour_%d" % index, "radius": rng.uniform(1, 50),
+             "contour": [row_type((rng.randint(0, 8000), rng.randint(0, 6000))) for _ in range(points)]}
+            for index in range(contours)]
+
+
+def timed(function: Callable, repeats: int) -> tuple[object, float]:
+    """fastest of repeats calls
+
+    :return: (result, wall time in s)
+    :rtype: tuple[object, float]
+    """
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return result, min(durations)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs all formats and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if a format does not restore the points
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Serialization")
+    parser.add_argument("--contours", type=int, default=50)
+    parser.add_argument("--points", type=int, default=20000, help="points per contour")
+    parser.add_argument("--rows", choices=["lists", "tuples"], default="lists", help="type of the contour points")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="serialization_results.json")
+    args = parser.parse_args(argv)
+
+    serialization = importlib.import_module(args.module)
+    try:
+        import jsonpickle
+    except ImportError:
+        jsonpickle = None
+        print("jsonpickle not installed, skipped")
+    points = create_points(args.contours, args.points, row_type=tuple if args.rows == "tuples" else list)
+    directory = tempfile.mkdtemp(prefix="serialization_")
+    results = []
+    exit_code = 0
+    try:
+        ptx = os.path.join(directory, "points.ptx")
+        binary = serialization.sidecar_filename(ptx)
+
+        def write_text(text):
+            with open(ptx, "w") as f:
+                f.write(text)
+
+        def read_text():
+            with open(ptx, "r") as f:
+                return f.read()
+        cases = []
+        if jsonpickle is not None:
+            cases.append(("jsonpickle", ptx, lambda: write_text(jsonpickle.encode(points)),
+                          lambda: jsonpickle.decode(read_text())))
+        cases.append(("json", ptx, lambda: write_text(json.dumps(points)), lambda: json.loads(read_text())))
+        cases.append(("binary", binary, lambda: serialization.save_binary(binary, points),
+                      lambda: serialization.load_binary(binary, arrays=False)))
+        cases.append(("binary_arrays", binary, lambda: serialization.save_binary(binary, points),
+                      lambda: serialization.load_binary(binary, arrays=True)))
+        cases.append(("binary_mmap", binary, lambda: serialization.save_binary(binary, points),
+                      lambda: serialization.load_binary(binary, mmap=True)))
+        for name, filename, save, load in cases:
+            _, save_s = timed(save, args.repeats)
+            loaded, load_s = timed(load, args.repeats)
+            if name in ("binary_arrays", "binary_mmap"):
+                restored = all(item["contour"].tolist() == [list(point) for point in original["contour"]]
+                               for item, original in zip(loaded, points))
+            elif name == "json":
+                # json has no tuples, compared as lists
+                restored = loaded == json.loads(json.dumps(points))
+            else:
+                restored = loaded == points
+            exit_code = exit_code if restored else 1
+            record = {"format": name, "save_s": save_s, "load_s": load_s, "size_mb": os.path.getsize(filename) / 2 ** 20,
+                      "restored": restored}
+            print("%-14s save %7.3f s  load %7.3f s  %8.2f MB  restored %s" % (
+                name, save_s, load_s, record["size_mb"], restored))
+            results.append(record)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"contours": args.contours, "points": args.points, "rows": args.rows, "results": results}, f, indent=4)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
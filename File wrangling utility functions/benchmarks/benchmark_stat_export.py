@@ -0,0 +1,114 @@
+"""
+Benchmark of the statistics export: the former export (all rows built as nested lists of str, then written) against
+export_for_stat_format streaming rows from a generator, as text only and with a parquet/feather file (pyarrow).
+Every case runs in a fresh interpreter and reports wall time and peak resident memory.
+
+usage:
+    python benchmark_stat_export.py --rows 1000000 --output stat_export.json
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterable, Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+HEADER = ["subject", "area", "time", "roi", "mean", "std", "pixels", "valid"]
+CASES = ("former", "streaming", "streaming_parquet", "streaming_feather")
+
+
+def create_rows(rows: int) -> Iterable[tuple]:
+    """rows of a typical roi statistics export
+
+    :param rows: number of rows
+    :type rows: int
+    :yield: (subject, area, time, roi, mean, std, pixels, valid)
+    :rtype: Iterable[tuple]
+    """
+    for idx in range(rows):
+        yield ("S%03d" % (idx // 1000), "F%02d" % (idx // 100 % 10), "T%02d" % (idx // 10 % 10), idx % 10,
+               idx * 0.37 % 255, idx * 0.11 % 40, idx % 5000, idx % 13 != 0)
+
+
+def former_export(data_dictionary: dict, output_file: str) -> None:
+    """export_for_stat_format before the streaming writer"""
+    header = data_dictionary['header']
+    with open(output_file, "w") as outfile:
+        outfile.write("\t".join(header) + "\n")
+        for dt in data_dictionary['data']:
+            outfile.write("\t".join(dt) + "\n")
+
+
+def run_case(module: str, case: str, rows: int, directory: str) -> dict:
+    """one export in this interpreter
+
+    :return: wall time, peak rss and output sizes
+    :rtype: dict
+    """
+    util = importlib.import_module(module)
+    output_file = os.path.join(directory, case + ".txt")
+    start = time.perf_counter()
+    if case == "former":
+        data = [[str(value) for value in row] for row in create_rows(rows)]
+        former_export({"header": HEADER, "data": data}, output_file)
+        files = [output_file]
+    else:
+        columnar = {"streaming": None, "streaming_parquet": "parquet", "streaming_feather": "feather"}[case]
+        util.export_for_stat_format({"header": HEADER, "data": create_rows(rows)}, output_file, columnar=columnar)
+        files = [output_file] + ([os.path.splitext(output_file)[0] + "." + columnar] if columnar else [])
+    duration = time.perf_counter() - start
+    # ru_maxrss is in kB on linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"case": case, "rows": rows, "wall_s": duration, "peak_rss_mb": peak,
+            "size_mb": {os.path.basename(f): os.path.getsize(f) / 2 ** 20 for f in files}}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs every case in a subprocess and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--run-case", choices=CASES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--directory", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default="stat_export_results.json")
+    args = parser.parse_args(argv)
+
+    if args.run_case is not None:
+        print(json.dumps(run_case(args.module, args.run_case, args.rows, args.directory)))
+        return 0
+    directory = tempfile.mkdtemp(prefix="stat_export_")
+    results = []
+    try:
+        for case in args.cases:
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), "--module", args.module,
+                                      "--rows", str(args.rows), "--run-case", case, "--directory", directory],
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8")
+            if process.returncode != 0:
+                print("%-18s failed: %s" % (case, process.stderr.strip().splitlines()[-1]))
+                continue
+            record = json.loads(process.stdout.strip().splitlines()[-1])
+            print("%-18s %8.2f s  peak %8.1f MB  %s" % (case, record["wall_s"], record["peak_rss_mb"],
+                                                       ", ".join("%s %.1f MB" % item for item in record["size_mb"].items())))
+            results.append(record)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"rows": args.rows, "results": results}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
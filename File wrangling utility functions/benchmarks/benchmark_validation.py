@@ -0,0 +1,109 @@
+"""
+Benchmark of Util.validate_study_data: builds a synthetic study (subjects x areas x times jpg files, some empty or
+damaged, some missing), validates it with 1 and --workers processes and reports wall time per run.
+Fails if the reports of the runs differ (the report must not depend on the number of workers).
+
+usage:
+    python benchmark_validation.py --subjects 200 --areas 4 --times 6 --size-kb 512 --workers 1 4 8 --hash md5
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+PARSE_MASK = r"S(?P<subject_int>[0-9]{3})F(?P<area_int>[0-9]{2})T(?P<time_int>[0-9]{2})"
+PARSE_PARAMETERS = ["subject_int", "area_int", "time_int"]
+
+
+def create_study(directory: str, subjects: int, areas: int, times: int, size: int, seed: int = 0) -> dict:
+    """one directory per subject with one jpg per area and time, 1% of the files are missing, empty or damaged
+
+    :param directory: target directory
+    :type directory: str
+    :param subjects: number of subjects
+    :type subjects: int
+    :param areas: areas per subject
+    :type areas: int
+    :param times: time points per area
+    :type times: int
+    :param size: file size in bytes
+    :type size: int
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: number of written, missing, empty and damaged files
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    payload = b"\xff\xd8\xff\xe0" + os.urandom(max(size - 4, 0))
+    counts = {"written": 0, "missing": 0, "empty": 0, "damaged": 0}
+    for subject in range(1, subjects + 1):
+        subject_dir = os.path.join(directory, "S%03d" % subject)
+        os.makedirs(subject_dir)
+        for area in range(1, areas + 1):
+            for time_point in range(1, times + 1):
+                kind = rng.choices(["written", "missing", "empty", "damaged"], [97, 1, 1, 1])[0]
+                counts[kind] += 1
+                if kind == "missing":
+                    continue
+                with open(os.path.join(subject_dir, "S%03dF%02dT%02d.jpg" % (subject, area, time_point)), "wb") as f:
+                    f.write(b"" if kind == "empty" else payload[::-1] if kind == "damaged" else payload)
+    return counts
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """validates the synthetic study per worker count and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if the reports differ
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--subjects", type=int, default=200)
+    parser.add_argument("--areas", type=int, default=4)
+    parser.add_argument("--times", type=int, default=6)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--hash", default=None, help="hash name, defaults to no hashing")
+    parser.add_argument("--directory", default=None, help="study location (e.g. a network share), defaults to a temp dir")
+    parser.add_argument("--output", default="validation_results.json")
+    args = parser.parse_args(argv)
+
+    util = importlib.import_module(args.module)
+    directory = tempfile.mkdtemp(prefix="validation_", dir=args.directory)
+    results = []
+    reports = []
+    try:
+        counts = create_study(directory, args.subjects, args.areas, args.times, args.size_kb * 1024)
+        print("study: %s" % counts)
+        for workers in args.workers:
+            start = time.perf_counter()
+            report = util.validate_study_data(directory, "*.jpg", PARSE_MASK, PARSE_PARAMETERS, 1, search_depth=1,
+                                              hashName=args.hash, workers=workers)
+            duration = time.perf_counter() - start
+            reports.append(json.dumps(report, sort_keys=True, default=str))
+            record = {"workers": workers, "wall_s": duration, "damaged": len(report["integrity"]),
+                      "missing": len(report["errors"].get("missingData", []))}
+            print("workers %3d  %8.2f s  damaged %5d  missing %5d" % (
+                workers, duration, record["damaged"], record["missing"]))
+            results.append(record)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    identical = len(set(reports)) <= 1
+    print("reports identical: %s" % identical)
+    with open(args.output, "w") as f:
+        json.dump({"study": counts, "hash": args.hash, "size_kb": args.size_kb, "results": results,
+                   "identical": identical}, f, indent=4)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
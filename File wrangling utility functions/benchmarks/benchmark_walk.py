@@ -0,0 +1,131 @@
+"""
+Benchmark of the directory walk: one os.walk per mask (the former getAllFiles loop) against Util.getAllFilesByMask (one os.scandir traversal for all masks)
+
+Builds a synthetic tree, counts the directory listings (os.scandir calls) and times both paths.
+
+usage:
+    python benchmark_walk.py --files 100000 --dirs 2000 --masks "*.jpg" "*.tif" "*.bmp" --output walk.json
+"""
+import argparse
+import fnmatch
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+DEFAULT_MASKS = ("*.jpg", "*.tif", "*.bmp")
+EXTENSIONS = (".jpg", ".JPG", ".tif", ".bmp", ".txt", ".ptx", ".xlsx")
+
+
+def create_tree(root: str, files: int, dirs: int, seed: int = 0) -> None:
+    """creates empty files in a random directory tree
+
+    :param root: root directory
+    :type root: str
+    :param files: number of files
+    :type files: int
+    :param dirs: number of directories
+    :type dirs: int
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    for index in range(dirs):
+        directory = os.path.join(rng.choice(directories), "dir_%d" % index)
+        os.mkdir(directory)
+        directories.append(directory)
+    for index in range(files):
+        open(os.path.join(rng.choice(directories), "file_%d%s" % (index, rng.choice(EXTENSIONS))), "w").close()
+
+
+def walk_per_mask(root: str, masks: list[str]) -> dict[str, list[str]]:
+    """the former getAllFiles loop, one os.walk per mask
+
+    :param root: root directory
+    :type root: str
+    :param masks: file masks
+    :type masks: list[str]
+    :return: mask -> list of paths
+    :rtype: dict[str, list[str]]
+    """
+    matches = {}
+    for mask in masks:
+        matches[mask] = []
+        for directory, dirnames, filenames in os.walk(root):
+            matches[mask].extend(os.path.normpath(os.path.join(directory, name)) for name in fnmatch.filter(filenames, mask))
+    return matches
+
+
+def count_listings(function: Callable, *args) -> tuple[object, int, float]:
+    """calls function and counts the os.scandir calls
+
+    :param function: function to call
+    :type function: Callable
+    :return: (result, number of directory listings, wall time in s)
+    :rtype: tuple[object, int, float]
+    """
+    scandir = os.scandir
+    calls = [0]
+
+    def counting_scandir(*scandir_args):
+        calls[0] += 1
+        return scandir(*scandir_args)
+    os.scandir = counting_scandir
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        duration = time.perf_counter() - start
+    finally:
+        os.scandir = scandir
+    return result, calls[0], duration
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """builds the tree, runs both walks and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if the results differ
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--masks", nargs="+", default=list(DEFAULT_MASKS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="walk_results.json")
+    args = parser.parse_args(argv)
+
+    util = importlib.import_module(args.module)
+    root = tempfile.mkdtemp(prefix="walk_tree_")
+    try:
+        create_tree(root, args.files, args.dirs)
+        # the grouped result is compared case sensitive, fnmatch.filter ignores case on Windows only
+        legacy = [count_listings(walk_per_mask, root, args.masks) for _ in range(args.repeats)]
+        single = [count_listings(util.getAllFilesByMask, root, args.masks, -1, os.path.normcase("A") != "a")
+                  for _ in range(args.repeats)]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    identical = legacy[0][0] == single[0][0]
+    record = {"files": args.files, "dirs": args.dirs, "masks": args.masks,
+              "per_mask_walks": len(args.masks), "per_mask_listings": legacy[0][1], "per_mask_s": min(r[2] for r in legacy),
+              "single_pass_walks": 1, "single_pass_listings": single[0][1], "single_pass_s": min(r[2] for r in single),
+              "identical": identical}
+    print("per mask:    %d walks, %7d listings, %6.3f s" % (len(args.masks), record["per_mask_listings"], record["per_mask_s"]))
+    print("single pass: 1 walk,  %7d listings, %6.3f s" % (record["single_pass_listings"], record["single_pass_s"]))
+    print("results identical: %s" % identical)
+    with open(args.output, "w") as f:
+        json.dump(record, f, indent=4)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
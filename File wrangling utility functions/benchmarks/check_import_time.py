@@ -0,0 +1,78 @@
+"""
+Startup check of Util: measures the import with python -X importtime in a fresh interpreter and fails
+when the cumulative import time exceeds the budget or a lazily imported dependency (dask, numpy, ...) is loaded.
+
+usage:
+    python check_import_time.py --module ImageAnalysis.Util --budget-ms 150
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Optional
+
+DEFAULT_MODULE = "ImageAnalysis.Util"
+DEFAULT_BUDGET_MS = 150.0
+# must not be imported by "import Util" alone
+LAZY_MODULES = ("dask", "numpy", "psutil", "jsonpickle", "git", "past")
+IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+
+def measure_import(module: str) -> tuple[float, dict[str, float]]:
+    """imports module in a new interpreter with -X importtime
+
+    :param module: import path
+    :type module: str
+    :raises RuntimeError: import failed
+    :return: cumulative import time of module in ms, cumulative ms of every imported module
+    :rtype: tuple[float, dict[str, float]]
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import %s" % module],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8")
+    if process.returncode != 0:
+        raise RuntimeError("import %s failed:\n%s" % (module, process.stderr))
+    imported = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is not None:
+            imported[match.group(4)] = int(match.group(2)) / 1000.0
+    return imported[module], imported
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """measures the import repeatedly and checks budget and lazy modules
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if over budget or a lazy module was imported
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="import path of Util")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="allowed cumulative import time")
+    parser.add_argument("--repeats", type=int, default=5, help="the fastest import is compared to the budget")
+    parser.add_argument("--output", default=None, help="json file for the result")
+    args = parser.parse_args(argv)
+
+    # the first run may write the .pyc files
+    runs = [measure_import(args.module) for _ in range(args.repeats + 1)][1:]
+    import_ms = min(run[0] for run in runs)
+    eager = sorted(name for name in runs[0][1] if name.split(".")[0] in LAZY_MODULES)
+    slowest = sorted(((ms, name) for name, ms in runs[0][1].items() if "." not in name), reverse=True)[:10]
+    print("import %s: %.1f ms (budget %.1f ms)" % (args.module, import_ms, args.budget_ms))
+    for ms, name in slowest:
+        print("    %8.1f ms  %s" % (ms, name))
+    if eager:
+        print("FAILED lazy dependencies imported at startup: %s" % ", ".join(eager))
+    if import_ms > args.budget_ms:
+        print("FAILED import time over budget")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"module": args.module, "import_ms": import_ms, "budget_ms": args.budget_ms,
+                       "eager_lazy_modules": eager}, f, indent=4)
+    return 1 if eager or import_ms > args.budget_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ import numba as nb
 
 from . import sRGB_conversions
 from . import adobe_conversions
-from . import COLORCONVERSION_LOGGER
+from . import vectorized_conversions
 
 
 white_point_D65 = (0.95043, 1.0, 1.0889)
@@ -19,8 +19,22 @@ _xyz_to_adobeRGB_array = np.array([[2.04159, -0.56501, -0.34473],
                                    [-0.96924, 1.87597, 0.04156],
                                    [0.01344, -0.11836, 1.01517]], dtype=np.float32).T
 
+# "vectorized" runs on whole arrays (vectorized_conversions), "numba" runs the njit per pixel loops
+ENGINES = ("vectorized", "numba")
 
-@nb.njit(fastmath=True)
+
+def __check_engine(engine: str) -> None:
+    """raises if the engine is unknown
+
+    :param engine: name of the engine
+    :type engine: str
+    :raises ValueError: engine is not in ENGINES
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine %s, use one of %s" % (engine, ", ".join(ENGINES)))
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def __xyz_to_sRGB_pixel(pixel: np.ndarray) -> np.ndarray:
     """converts a pixel from XYZ to sRGB, njit boosted
 
@@ -32,10 +46,26 @@ def __xyz_to_sRGB_pixel(pixel: np.ndarray) -> np.ndarray:
     return pixel.astype(np.float32).dot(XYZ_To_sRGB_Array)
 
 
-@nb.njit(fastmath=True)
-def xyz_to_sRGB(image: np.ndarray) -> np.ndarray:
+def xyz_to_sRGB(image: np.ndarray, engine: str = "vectorized") -> np.ndarray:
     """converts xyz to sRGB 0-1
 
+    :param image: xyz image
+    :type image: ndarray
+    :param engine: engine to use, see ENGINES, defaults to "vectorized"
+    :type engine: str, optional
+    :return: sRGB image
+    :rtype: ndarray
+    """
+    __check_engine(engine)
+    if engine == "vectorized":
+        return vectorized_conversions.xyz_to_sRGB(image)
+    return __xyz_to_sRGB_numba(image)
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
+def __xyz_to_sRGB_numba(image: np.ndarray) -> np.ndarray:
+    """converts xyz to sRGB 0-1 pixel by pixel, njit boosted
+
     :param image: xyz image
     :type image: ndarray
     :return: sRGB image in uint8
@@ -48,10 +78,26 @@ def xyz_to_sRGB(image: np.ndarray) -> np.ndarray:
     return sRGB_image
 
 
-@nb.njit(fastmath=True)
-def xyz_to_adobeRGB(image: np.ndarray) -> np.ndarray:
+def xyz_to_adobeRGB(image: np.ndarray, engine: str = "vectorized") -> np.ndarray:
     """converts xyz to adobe RGB 0-1
 
+    :param image: xyz image
+    :type image: ndarray
+    :param engine: engine to use, see ENGINES, defaults to "vectorized"
+    :type engine: str, optional
+    :return: adobe RGB image
+    :rtype: ndarray
+    """
+    __check_engine(engine)
+    if engine == "vectorized":
+        return vectorized_conversions.xyz_to_adobeRGB(image)
+    return __xyz_to_adobeRGB_numba(image)
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
+def __xyz_to_adobeRGB_numba(image: np.ndarray) -> np.ndarray:
+    """converts xyz to adobe RGB 0-1 pixel by pixel, njit boosted
+
     :param image: xyz image
     :type image: ndarray
     :return: adobe RGB image in uint8
@@ -64,7 +110,7 @@ def xyz_to_adobeRGB(image: np.ndarray) -> np.ndarray:
     return sRGB_image
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def __xyz_to_adobeRGB_pixel(pixel: np.ndarray) -> np.ndarray:
     """converts a pixel from XYZ to sRGB, njit boosted
 
@@ -76,10 +122,26 @@ def __xyz_to_adobeRGB_pixel(pixel: np.ndarray) -> np.ndarray:
     return pixel.astype(np.float32).dot(_xyz_to_adobeRGB_array)
 
 
-@nb.njit(fastmath=True)
-def xyz_to_xyY(xyz_image: np.ndarray) -> np.ndarray:
+def xyz_to_xyY(xyz_image: np.ndarray, engine: str = "vectorized") -> np.ndarray:
     """converts an array from xyz to xyY
 
+    :param xyz_image: array to convert
+    :type xyz_image: ndarray
+    :param engine: engine to use, see ENGINES, defaults to "vectorized"
+    :type engine: str, optional
+    :return: converted array
+    :rtype: ndarray
+    """
+    __check_engine(engine)
+    if engine == "vectorized":
+        return vectorized_conversions.xyz_to_xyY(xyz_image)
+    return __xyz_to_xyY_numba(xyz_image)
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
+def __xyz_to_xyY_numba(xyz_image: np.ndarray) -> np.ndarray:
+    """converts an array of xyz pixels to xyY pixel by pixel, njit boosted
+
     :param xyz_image: array to convert
     :type xyz_image: ndarray
     :return: converted array
@@ -121,7 +183,7 @@ def xyz_to_xyY_no_njit(xyz_image: np.ndarray) -> np.ndarray:
     return xyY_image
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def xyz_to_wio(xyz_image: np.ndarray, white_point: tuple[float, float, float] = white_point_D65) -> np.ndarray:
     """converts XYZ to WIO more insights: https://www.researchgate.net/publication/319905573_Tooth_Colour_and_Whiteness_A_review
 
@@ -135,7 +197,8 @@ def xyz_to_wio(xyz_image: np.ndarray, white_point: tuple[float, float, float] =
     white_point_sum = white_point[0] + white_point[1] + white_point[2]
     wp_xyY = [white_point[0] / white_point_sum,
               white_point[1] / white_point_sum, white_point[2]]
-    xyY = xyz_to_xyY(xyz_image)
+    # the engine dispatch of xyz_to_xyY is python, the njit kernel is called directly
+    xyY = __xyz_to_xyY_numba(xyz_image)
     return xyY[..., 2] + 1075.012*(wp_xyY[0]-xyY[..., 0]) + 145.516*(wp_xyY[1]-xyY[..., 1])
 
 
@@ -157,7 +220,7 @@ def xyz_to_wic(xyz_image: np.ndarray, white_point: tuple[float, float, float] =
     return xyY[..., 2] + 800.*(wp_xyY[0]-xyY[..., 0]) + 1700.*(wp_xyY[1]-xyY[..., 1])
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def xyz_to_melanin(xyz_image: np.ndarray) -> np.ndarray:
     """ from Image analysis of skin color heterogeneity focusing on skin chromophores and the age-related changes in facial skin. Kikuchi K1, Masuda Y, Yamashita T, Kawai E, Hirao T.Skin Res Technol. 2015 May;21(2):175-83
     https://onlinelibrary.wiley.com/doi/abs/10.1111/srt.12264, njit boosted
@@ -170,7 +233,7 @@ def xyz_to_melanin(xyz_image: np.ndarray) -> np.ndarray:
     return 4.861 * np.log10(xyz_image[:, :, 0]) - 1.268 * np.log10(xyz_image[:, :, 1]) - 4.669 * np.log10(xyz_image[:, :, 2]) + 0.066
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def xyz_to_hemoglobine(xyz_image: np.ndarray) -> np.ndarray:
     """ from Image analysis of skin color heterogeneity focusing on skin chromophores and the age-related changes in facial skin. Kikuchi K1, Masuda Y, Yamashita T, Kawai E, Hirao T.Skin Res Technol. 2015 May;21(2):175-83
     https://onlinelibrary.wiley.com/doi/abs/10.1111/srt.12264, njit boosted
@@ -184,6 +247,50 @@ def xyz_to_hemoglobine(xyz_image: np.ndarray) -> np.ndarray:
     return 32.218 * np.log10(xyz_image[:, :, 0]) - 37.499 * np.log10(xyz_image[:, :, 1]) + 4.495 * np.log10(xyz_image[:, :, 2]) + 0.444
 
 
+# Robertson isotemperature lines, reciprocal temperature (K) and (u, v, slope) of each line
+# Reference: Wyszecki & Stiles, "Color Science", Second Edition, 1982, pp. 227, 228
+robertson_reciprocal_temp = np.array([
+    np.finfo(float).eps,  10.0e-6,  20.0e-6,  30.0e-6,  40.0e-6,  50.0e-6,
+    60.0e-6,  70.0e-6,  80.0e-6,  90.0e-6, 100.0e-6, 125.0e-6,
+    150.0e-6, 175.0e-6, 200.0e-6, 225.0e-6, 250.0e-6, 275.0e-6,
+    300.0e-6, 325.0e-6, 350.0e-6, 375.0e-6, 400.0e-6, 425.0e-6,
+    450.0e-6, 475.0e-6, 500.0e-6, 525.0e-6, 550.0e-6, 575.0e-6,
+    600.0e-6])
+robertson_uvt = np.array([
+    [0.18006, 0.26352, -0.24341],
+    [0.18066, 0.26589, -0.25479],
+    [0.18133, 0.26846, -0.26876],
+    [0.18208, 0.27119, -0.28539],
+    [0.18293, 0.27407, -0.30470],
+    [0.18388, 0.27709, -0.32675],
+    [0.18494, 0.28021, -0.35156],
+    [0.18611, 0.28342, -0.37915],
+    [0.18740, 0.28668, -0.40955],
+    [0.18880, 0.28997, -0.44278],
+    [0.19032, 0.29326, -0.47888],
+    [0.19462, 0.30141, -0.58204],
+    [0.19962, 0.30921, -0.70471],
+    [0.20525, 0.31647, -0.84901],
+    [0.21142, 0.32312, -1.0182],
+    [0.21807, 0.32909, -1.2168],
+    [0.22511, 0.33439, -1.4512],
+    [0.23247, 0.33904, -1.7298],
+    [0.24010, 0.34308, -2.0637],
+    [0.24792, 0.34655, -2.4681],    # Note: 0.24792 is a corrected value
+    # for the error found in W&S as 0.24702
+    [0.25591, 0.34951, -2.9641],
+    [0.26400, 0.35200, -3.5814],
+    [0.27218, 0.35407, -4.3633],
+    [0.28039, 0.35577, -5.3762],
+    [0.28863, 0.35714, -6.7262],
+    [0.29685, 0.35823, -8.5955],
+    [0.30505, 0.35907, -11.324],
+    [0.31320, 0.35968, -15.628],
+    [0.32129, 0.36011, -23.325],
+    [0.32931, 0.36038, -40.770],
+    [0.33724, 0.36051, -116.45]])
+
+
 def xyz_to_cct(X: float, Y: float, Z: float) -> float:
     """
     Convert from XYZ to correlated color temperature.
@@ -207,50 +314,12 @@ def xyz_to_cct(X: float, Y: float, Z: float) -> float:
     :return: correlated color temperature
     :rtype: float
     """
-    COLORCONVERSION_LOGGER.info("NOT TESTED")
-    reciprocal_temp = [  # reciprocal temperature (K)
-        np.finfo(np.float).eps,  10.0e-6,  20.0e-6,  30.0e-6,  40.0e-6,  50.0e-6,
-        60.0e-6,  70.0e-6,  80.0e-6,  90.0e-6, 100.0e-6, 125.0e-6,
-        150.0e-6, 175.0e-6, 200.0e-6, 225.0e-6, 250.0e-6, 275.0e-6,
-        300.0e-6, 325.0e-6, 350.0e-6, 375.0e-6, 400.0e-6, 425.0e-6,
-        450.0e-6, 475.0e-6, 500.0e-6, 525.0e-6, 550.0e-6, 575.0e-6,
-        600.0e-6]
-    uvt = [[0.18006, 0.26352, -0.24341],
-           [0.18066, 0.26589, -0.25479],
-           [0.18133, 0.26846, -0.26876],
-           [0.18208, 0.27119, -0.28539],
-           [0.18293, 0.27407, -0.30470],
-           [0.18388, 0.27709, -0.32675],
-           [0.18494, 0.28021, -0.35156],
-           [0.18611, 0.28342, -0.37915],
-           [0.18740, 0.28668, -0.40955],
-           [0.18880, 0.28997, -0.44278],
-           [0.19032, 0.29326, -0.47888],
-           [0.19462, 0.30141, -0.58204],
-           [0.19962, 0.30921, -0.70471],
-           [0.20525, 0.31647, -0.84901],
-           [0.21142, 0.32312, -1.0182],
-           [0.21807, 0.32909, -1.2168],
-           [0.22511, 0.33439, -1.4512],
-           [0.23247, 0.33904, -1.7298],
-           [0.24010, 0.34308, -2.0637],
-           [0.24792, 0.34655, -2.4681],    # Note: 0.24792 is a corrected value
-           # for the error found in W&S as 0.24702
-           [0.25591, 0.34951, -2.9641],
-           [0.26400, 0.35200, -3.5814],
-           [0.27218, 0.35407, -4.3633],
-           [0.28039, 0.35577, -5.3762],
-           [0.28863, 0.35714, -6.7262],
-           [0.29685, 0.35823, -8.5955],
-           [0.30505, 0.35907, -11.324],
-           [0.31320, 0.35968, -15.628],
-           [0.32129, 0.36011, -23.325],
-           [0.32931, 0.36038, -40.770],
-           [0.33724, 0.36051, -116.45]]
+    reciprocal_temp = robertson_reciprocal_temp
+    uvt = robertson_uvt
     if ((X < 1.0e-20) and (Y < 1.0e-20) and (Z < 1.0e-20)):
         return None  # protect against possible divide-by-zero failure
-    us = (4.0 * X) // (X + 15.0 * Y + 3.0 * Z)
-    vs = (6.0 * Y) // (X + 15.0 * Y + 3.0 * Z)
+    us = (4.0 * X) / (X + 15.0 * Y + 3.0 * Z)
+    vs = (6.0 * Y) / (X + 15.0 * Y + 3.0 * Z)
     dm = 0.0
     i = 0
     while i < 31:
@@ -263,22 +332,111 @@ def xyz_to_cct(X: float, Y: float, Z: float) -> float:
         # bad XYZ input, color temp would be less than minimum of 1666.7
         # degrees, or too far towards blue
         return None
-    di = di // np.sqrt(1.0 + uvt[i][2] * uvt[i][2])
-    dm = dm // np.sqrt(1.0 + uvt[i - 1][2] * uvt[i - 1][2])
+    di = di / np.sqrt(1.0 + uvt[i][2] * uvt[i][2])
+    dm = dm / np.sqrt(1.0 + uvt[i - 1][2] * uvt[i - 1][2])
     # p = interpolation parameter, 0.0 : i-1, 1.0 : i
-    p = dm // (dm - di)
-    # (np.interp(reciprocal_temp[i - 1], reciprocal_temp[i], p))
-    p = 1.0 // ((reciprocal_temp[i] - reciprocal_temp[i - 1])
-                * p + reciprocal_temp[i - 1])
-    return p
+    p = dm / (dm - di)
+    p = 1.0 / ((reciprocal_temp[i] - reciprocal_temp[i - 1])
+               * p + reciprocal_temp[i - 1])
+    return float(p)
+
+
+def xyz_to_cct_map(xyz_image: np.ndarray) -> np.ndarray:
+    """computes the correlated color temperature of every pixel with Robertson's method (see xyz_to_cct)
+
+    :param xyz_image: image in XYZ, channels in the last axis
+    :type xyz_image: ndarray
+    :return: correlated color temperature in K per pixel, nan where xyz_to_cct returns None
+    :rtype: ndarray
+    """
+    pixels = np.ascontiguousarray(xyz_image, dtype=np.float64).reshape(-1, 3)
+    cct = np.empty(pixels.shape[0], dtype=np.float64)
+    __xyz_to_cct_kernel(pixels, cct)
+    return cct.reshape(np.shape(xyz_image)[:-1])
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
+def __xyz_to_cct_kernel(pixels: np.ndarray, cct: np.ndarray) -> None:
+    """Robertson's method for every xyz pixel writing into cct (nan if out of range), njit boosted
+
+    :param pixels: xyz pixels as (N, 3) array
+    :type pixels: ndarray
+    :param cct: preallocated output with N values
+    :type cct: ndarray
+    """
+    uvt = robertson_uvt
+    reciprocal_temp = robertson_reciprocal_temp
+    for index in range(pixels.shape[0]):
+        x_value = pixels[index, 0]
+        y_value = pixels[index, 1]
+        z_value = pixels[index, 2]
+        cct[index] = np.nan
+        denominator = x_value + 15.0 * y_value + 3.0 * z_value
+        if (x_value < 1.0e-20 and y_value < 1.0e-20 and z_value < 1.0e-20) or denominator == 0:
+            continue
+        us = 4.0 * x_value / denominator
+        vs = 6.0 * y_value / denominator
+        dm = 0.0
+        di = 0.0
+        i = 0
+        while i < 31:
+            di = (vs - uvt[i, 1]) - uvt[i, 2] * (us - uvt[i, 0])
+            if i > 0 and ((di < 0.0 and dm >= 0.0) or (di >= 0.0 and dm < 0.0)):
+                break
+            dm = di
+            i += 1
+        if i == 31:
+            continue
+        di = di / np.sqrt(1.0 + uvt[i, 2] * uvt[i, 2])
+        dm = dm / np.sqrt(1.0 + uvt[i - 1, 2] * uvt[i - 1, 2])
+        p = dm / (dm - di)
+        cct[index] = 1.0 / ((reciprocal_temp[i] - reciprocal_temp[i - 1]) * p + reciprocal_temp[i - 1])
+
+
+def xyz_to_cct_region(xyz_image: np.ndarray, mask: np.ndarray = None) -> float:
+    """computes the correlated color temperature of the mean XYZ of a masked region
+
+    :param xyz_image: image in XYZ, channels in the last axis
+    :type xyz_image: ndarray
+    :param mask: boolean mask of the region (image shape without channels), defaults to None (whole image)
+    :type mask: ndarray, optional
+    :raises ValueError: the region has no pixels
+    :return: correlated color temperature in K, None if out of range
+    :rtype: float
+    """
+    if mask is None:
+        pixels = xyz_image.reshape(-1, 3)
+    else:
+        pixels = xyz_image[mask.astype(bool)]
+    if pixels.shape[0] == 0:
+        raise ValueError("Region without pixels, the CCT of an empty mask is undefined")
+    return xyz_to_cct(*pixels.mean(axis=0))
 
 
-@nb.njit(fastmath=True)
-def xyz_to_lab(image) -> np.ndarray:
+def xyz_to_lab(image: np.ndarray, engine: str = "vectorized") -> np.ndarray:
     """converts an xyz image to lab. Source: http://www.brucelindbloom.com/index.html?Eqn_RGB_XYZ_Matrix.html
 
     :param image: xyz image
     :type image: ndarray
+    :param engine: engine to use, see ENGINES, defaults to "vectorized"
+    :type engine: str, optional
+    :return: lab image
+    :rtype: ndarray
+    """
+    __check_engine(engine)
+    if engine == "vectorized":
+        return vectorized_conversions.xyz_to_lab(image)
+    return __xyz_to_lab_numba(image)
+
+
+@nb.njit(fastmath=True, nogil=True, cache=True)
+def __xyz_to_lab_numba(image: np.ndarray) -> np.ndarray:
+    """converts an xyz image to lab pixel by pixel, njit boosted
+
+    :param image: xyz image
+    :type image: ndarray
+    :return: lab image
+    :rtype: ndarray
     """
     lab_image = np.zeros_like(image)
     # iterate over each pixel
@@ -297,7 +455,7 @@ def xyz_to_lab(image) -> np.ndarray:
     return lab_image
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def __xyz_to_lab_f_function(t_value: float) -> float:
     """function needed to calculate lab values. Source: http://www.brucelindbloom.com/index.html?Eqn_RGB_XYZ_Matrix.html
 
@@ -102,7 +102,7 @@ def __adobe_gamma_remove(image: np.ndarray) -> np.ndarray:
     return np.power(image, 563/256)
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def adobe_add_gamma(image: np.ndarray) -> np.ndarray:
     """adds adobe gamma to image, inverse from add remove
 
@@ -114,7 +114,7 @@ def adobe_add_gamma(image: np.ndarray) -> np.ndarray:
     return np.power(image, 256/563)
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def __adobe_to_xyz_matrix_mult(image: np.ndarray):
     """converts adobe to XYZ, njit boosted
 
@@ -0,0 +1,286 @@
+"""
+Benchmark and regression harness for the ColorConversion functions
+
+Every (function, size, dtype) case runs in a fresh process so numba JIT compile time and peak RSS are measured per case.
+Results are written as JSON, a run can be compared against an older result file and fails when a case got slower than the threshold.
+
+usage:
+    python benchmark_conversions.py --output results.json
+    python benchmark_conversions.py --sizes 1 --dtypes uint8 --baseline results.json --threshold 1.25
+"""
+import argparse
+import datetime
+import functools
+import importlib
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Optional
+import numpy as np
+
+# import path of the ColorConversion package
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+DEFAULT_SIZES = (1, 6, 24)
+DEFAULT_DTYPES = ("uint8", "uint16")
+DEFAULT_REPEATS = 3
+
+# function name -> (module, input kind), see prepare_input for the input kinds
+CASES = {
+    "sRGB_to_xyz": ("sRGB_conversions", "rgb"),
+    "sRGB_to_lab": ("sRGB_conversions", "rgb"),
+    "sRGB_to_lab_fused": ("sRGB_conversions", "rgb"),
+    "sRGB_to_hsv": ("sRGB_conversions", "rgb"),
+    "sRGB_to_norm_sRGB": ("sRGB_conversions", "rgb"),
+    "sRGB_to_adobe": ("sRGB_conversions", "rgb"),
+    "adobe_to_xyz": ("adobe_conversions", "rgb"),
+    "adobe_to_lab": ("adobe_conversions", "rgb"),
+    "adobe_to_hsv": ("adobe_conversions", "rgb"),
+    "adobe_to_sRGB": ("adobe_conversions", "rgb"),
+    "xyz_to_sRGB": ("XYZ_conversions", "xyz"),
+    "xyz_to_adobeRGB": ("XYZ_conversions", "xyz"),
+    "xyz_to_lab": ("XYZ_conversions", "xyz"),
+    "xyz_to_xyY": ("XYZ_conversions", "xyz"),
+    "xyz_to_cct_map": ("XYZ_conversions", "xyz"),
+    "lab_to_xyz": ("lab_conversions", "lab"),
+    "lab_to_srgb": ("lab_conversions", "lab"),
+    "convert_RGB_to_HSV": ("rgb_conversions", "float_rgb"),
+    "rgb_to_gray_image": ("rgb_conversions", "float_rgb"),
+    "hsv_to_sRGB": ("hsv_conversions", "hsv"),
+}
+
+
+def synthetic_image(megapixels: float, dtype: str, seed: int = 0) -> np.ndarray:
+    """creates a random rgb image with 3:2 aspect ratio
+
+    :param megapixels: size of the image in megapixels
+    :type megapixels: float
+    :param dtype: uint8 or uint16
+    :type dtype: str
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: image (height, width, 3)
+    :rtype: ndarray
+    """
+    height = int(round(np.sqrt(megapixels * 1e6 * 2 / 3)))
+    width = int(round(megapixels * 1e6 / height))
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, np.iinfo(dtype).max, size=(height, width, 3), endpoint=True, dtype=dtype)
+
+
+def prepare_input(package: str, kind: str, image: np.ndarray) -> np.ndarray:
+    """converts the synthetic rgb image to the input a function expects (not timed)
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param kind: rgb, float_rgb, xyz, lab or hsv
+    :type kind: str
+    :param image: synthetic uint8/uint16 rgb image
+    :type image: ndarray
+    :return: input image
+    :rtype: ndarray
+    """
+    if kind == "rgb":
+        return image
+    float_rgb = image / float(np.iinfo(image.dtype).max)
+    if kind == "float_rgb":
+        return float_rgb
+    sRGB_conversions = importlib.import_module(package + ".sRGB_conversions")
+    xyz = sRGB_conversions.sRGB_to_xyz(image)
+    if kind == "xyz":
+        return xyz
+    if kind == "lab":
+        return importlib.import_module(package + ".XYZ_conversions").xyz_to_lab(xyz)
+    if kind == "hsv":
+        return importlib.import_module(package + ".rgb_conversions").convert_RGB_to_HSV(float_rgb)
+    raise ValueError("Unknown input kind %s" % kind)
+
+
+def peak_rss_mb() -> float:
+    """peak resident set size of this process
+
+    :return: peak RSS in MB
+    :rtype: float
+    """
+    try:
+        import resource
+        # linux reports kB, macOS bytes
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+
+
+def timed(function: Callable, image: np.ndarray) -> float:
+    """calls function once
+
+    :param function: function to time
+    :type function: Callable
+    :param image: input of the function
+    :type image: ndarray
+    :return: wall time in s
+    :rtype: float
+    """
+    start = time.perf_counter()
+    function(image)
+    return time.perf_counter() - start
+
+
+def run_case(package: str, name: str, megapixels: float, dtype: str, repeats: int, engine: Optional[str] = None) -> dict:
+    """runs one case, meant to be called in a fresh process
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param name: function name, key of CASES
+    :type name: str
+    :param megapixels: image size
+    :type megapixels: float
+    :param dtype: uint8 or uint16
+    :type dtype: str
+    :param repeats: number of steady state runs, the fastest is reported
+    :type repeats: int
+    :param engine: engine passed to functions with an engine argument, defaults to None (their default)
+    :type engine: str, optional
+    :return: result record
+    :rtype: dict
+    """
+    module_name, kind = CASES[name]
+    function = getattr(importlib.import_module(package + "." + module_name), name)
+    if "engine" in inspect.signature(function).parameters:
+        if engine is not None:
+            function = functools.partial(function, engine=engine)
+        else:
+            engine = inspect.signature(function).parameters["engine"].default
+    else:
+        engine = None
+    record = {"function": name, "module": module_name, "megapixels": megapixels, "dtype": dtype, "engine": engine}
+    try:
+        # first call on a tiny image of the same dtype compiles the njit kernels
+        tiny = prepare_input(package, kind, synthetic_image(1e-4, dtype))
+        record["first_call_s"] = timed(function, tiny)
+        record["steady_tiny_s"] = timed(function, tiny)
+        record["jit_compile_s"] = max(record["first_call_s"] - record["steady_tiny_s"], 0.0)
+        image = prepare_input(package, kind, synthetic_image(megapixels, dtype))
+        rss_before = peak_rss_mb()
+        wall = min(timed(function, image) for _ in range(repeats))
+        record["wall_s"] = wall
+        record["mpix_per_s"] = megapixels / wall if wall > 0 else float("inf")
+        record["peak_rss_mb"] = peak_rss_mb()
+        record["peak_rss_increase_mb"] = record["peak_rss_mb"] - rss_before
+    except Exception as inst:
+        record["error"] = "%s: %s" % (type(inst).__name__, inst)
+    return record
+
+
+def run_benchmarks(package: str, names: list[str], sizes: list[float], dtypes: list[str], repeats: int,
+                   engine: Optional[str] = None) -> list[dict]:
+    """runs every case in its own spawned process
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param names: function names, keys of CASES
+    :type names: list[str]
+    :param sizes: image sizes in megapixels
+    :type sizes: list[float]
+    :param dtypes: uint8 and/or uint16
+    :type dtypes: list[str]
+    :param repeats: number of steady state runs per case
+    :type repeats: int
+    :param engine: engine passed to functions with an engine argument, defaults to None (their default)
+    :type engine: str, optional
+    :return: list of result records
+    :rtype: list[dict]
+    """
+    results = []
+    for name in names:
+        for megapixels in sizes:
+            for dtype in dtypes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                    record = executor.submit(run_case, package, name, megapixels, dtype, repeats, engine).result()
+                if "error" in record:
+                    print("%-20s %5.1f MP %-6s ERROR %s" % (name, megapixels, dtype, record["error"]))
+                else:
+                    print("%-20s %5.1f MP %-6s %8.3f s %8.2f MPix/s  jit %6.2f s  peak RSS %7.0f MB" % (
+                        name, megapixels, dtype, record["wall_s"], record["mpix_per_s"], record["jit_compile_s"],
+                        record["peak_rss_mb"]))
+                results.append(record)
+    return results
+
+
+def compare_to_baseline(results: list[dict], baseline_file: str, threshold: float) -> list[str]:
+    """compares steady state wall times to an older result file
+
+    :param results: current results
+    :type results: list[dict]
+    :param baseline_file: json file written by an older run
+    :type baseline_file: str
+    :param threshold: allowed slowdown factor, e.g. 1.25
+    :type threshold: float
+    :return: descriptions of all cases slower than threshold
+    :rtype: list[str]
+    """
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)
+
+    def key(record):
+        return (record["function"], record["megapixels"], record["dtype"], record.get("engine"))
+    baseline_by_key = {key(r): r for r in baseline["results"] if "wall_s" in r}
+    regressions = []
+    for record in results:
+        old = baseline_by_key.get(key(record))
+        if old is None or "wall_s" not in record:
+            continue
+        ratio = record["wall_s"] / old["wall_s"]
+        if ratio > threshold:
+            regressions.append("%s %s MP %s: %.3f s -> %.3f s (x%.2f)" % (
+                record["function"], record["megapixels"], record["dtype"], old["wall_s"], record["wall_s"], ratio))
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs the benchmarks, writes the json and checks for regressions
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if a regression or an error was found
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--functions", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=float, default=list(DEFAULT_SIZES), help="image sizes in MP")
+    parser.add_argument("--dtypes", nargs="+", default=list(DEFAULT_DTYPES), choices=list(DEFAULT_DTYPES))
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--engine", default=None, help="engine for functions with an engine argument, e.g. numba")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="older result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown factor against baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.package, args.functions, args.sizes, args.dtypes, args.repeats, args.engine)
+    with open(args.output, "w") as f:
+        json.dump({"meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+                            "python": platform.python_version(),
+                            "numpy": np.__version__,
+                            "platform": platform.platform(),
+                            "cpu_count": os.cpu_count(),
+                            "package": args.package},
+                   "results": results}, f, indent=4)
+    print("Results written to %s" % args.output)
+    exit_code = 1 if any("error" in r for r in results) else 0
+    if args.baseline is not None:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
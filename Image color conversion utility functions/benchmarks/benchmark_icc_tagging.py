@@ -0,0 +1,124 @@
+"""
+Benchmark of icc tagging: one exiftool process per file (helper_functions.set_colorspace_to_icc)
+against the batch API (helper_functions.set_colorspace_to_icc_batch, in process for JPEG/TIFF, one exiftool -stay_open process otherwise)
+
+The exiftool runs are skipped when no exiftool executable is found.
+
+usage:
+    python benchmark_icc_tagging.py --count 500 --formats jpg tif png --exiftool /usr/bin/exiftool --output icc.json
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+import numpy as np
+from PIL import Image, ImageCms
+
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+
+
+def create_images(directory: str, file_format: str, count: int, megapixels: float) -> list[str]:
+    """writes count copies of a random rgb image
+
+    :param directory: target directory
+    :type directory: str
+    :param file_format: jpg, tif or png
+    :type file_format: str
+    :param count: number of files
+    :type count: int
+    :param megapixels: image size
+    :type megapixels: float
+    :return: file paths
+    :rtype: list[str]
+    """
+    height = int(round(np.sqrt(megapixels * 1e6 * 2 / 3)))
+    width = int(round(megapixels * 1e6 / height))
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 255, size=(height, width, 3), dtype=np.uint8))
+    first = os.path.join(directory, "image_0.%s" % file_format)
+    image.save(first)
+    paths = [first]
+    for index in range(1, count):
+        paths.append(os.path.join(directory, "image_%d.%s" % (index, file_format)))
+        shutil.copyfile(first, paths[-1])
+    return paths
+
+
+def tag_per_file(paths: list[str], icc_path: str, exiftool_path: str) -> None:
+    """the old path, one exiftool process per file
+
+    :param paths: images
+    :type paths: list[str]
+    :param icc_path: icc profile
+    :type icc_path: str
+    :param exiftool_path: exiftool executable
+    :type exiftool_path: str
+    """
+    for path in paths:
+        subprocess.call([exiftool_path, "-icc_profile<=%s" % icc_path, "-overwrite_original", path],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs both paths per format and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if files could not be tagged
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--count", type=int, default=200, help="number of images per format")
+    parser.add_argument("--megapixels", type=float, default=1.0)
+    parser.add_argument("--formats", nargs="+", default=["jpg", "tif", "png"], choices=["jpg", "tif", "png"])
+    parser.add_argument("--exiftool", default=shutil.which("exiftool"), help="exiftool executable")
+    parser.add_argument("--output", default="icc_tagging_results.json")
+    args = parser.parse_args(argv)
+
+    helper_functions = importlib.import_module(args.package + ".helper_functions")
+    exiftool_found = args.exiftool is not None and os.path.isfile(args.exiftool)
+    if not exiftool_found:
+        print("exiftool not found, exiftool runs are skipped")
+    results = []
+    exit_code = 0
+    work_dir = tempfile.mkdtemp(prefix="icc_tagging_")
+    try:
+        icc_path = os.path.join(work_dir, "profile.icc")
+        with open(icc_path, "wb") as f:
+            f.write(ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes())
+        for file_format in args.formats:
+            record = {"format": file_format, "count": args.count, "megapixels": args.megapixels}
+            if exiftool_found:
+                directory = tempfile.mkdtemp(dir=work_dir)
+                paths = create_images(directory, file_format, args.count, args.megapixels)
+                start = time.perf_counter()
+                tag_per_file(paths, icc_path, args.exiftool)
+                record["per_file_s"] = time.perf_counter() - start
+            if file_format != "png" or exiftool_found:
+                directory = tempfile.mkdtemp(dir=work_dir)
+                paths = create_images(directory, file_format, args.count, args.megapixels)
+                start = time.perf_counter()
+                failed = helper_functions.set_colorspace_to_icc_batch(paths, icc_path, args.exiftool)
+                record["batch_s"] = time.perf_counter() - start
+                record["batch_failed"] = len(failed)
+                exit_code = 1 if failed else exit_code
+            print("%-4s %5d files  per file %s  batch %s" % (
+                file_format, args.count,
+                "%8.2f s" % record["per_file_s"] if "per_file_s" in record else "       -  ",
+                "%8.2f s" % record["batch_s"] if "batch_s" in record else "       -  "))
+            results.append(record)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"exiftool": args.exiftool if exiftool_found else None, "results": results}, f, indent=4)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Startup benchmark for the ColorConversion functions: time to first converted image in a fresh process
+
+The first run uses an empty numba cache directory (cold, every kernel compiles), the following runs reuse it (warm, cache=True).
+With --warm-up the cache is filled by jit_warmup before the first timed run.
+
+usage:
+    python benchmark_startup.py --runs 3 --output startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+
+# runs in the child process, prints the timings as json
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import numpy as np
+from {package} import sRGB_conversions
+imported = time.perf_counter()
+image = np.random.default_rng(0).integers(0, 255, size=(816, 1224, 3), endpoint=True, dtype=np.uint8)
+sRGB_conversions.{function}(image)
+done = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "first_image_s": done - imported, "total_s": done - start}}))
+"""
+
+
+def run_child(package: str, function: str, cache_dir: str) -> dict:
+    """converts one 1 MP image in a fresh interpreter
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param function: sRGB_conversions function to call
+    :type function: str
+    :param cache_dir: numba cache directory
+    :type cache_dir: str
+    :return: timings of the child process
+    :rtype: dict
+    """
+    env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT.format(package=package, function=function)],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs cold and warm startups and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--function", default="sRGB_to_lab", help="sRGB_conversions function to time")
+    parser.add_argument("--runs", type=int, default=3, help="number of fresh processes")
+    parser.add_argument("--warm-up", action="store_true", help="fill the cache with jit_warmup first")
+    parser.add_argument("--output", default="startup_results.json")
+    args = parser.parse_args(argv)
+
+    cache_dir = tempfile.mkdtemp(prefix="numba_cache_")
+    results = []
+    try:
+        if args.warm_up:
+            subprocess.run([sys.executable, "-m", args.package + ".jit_warmup"],
+                           env=dict(os.environ, NUMBA_CACHE_DIR=cache_dir), check=True)
+        for run in range(args.runs):
+            record = run_child(args.package, args.function, cache_dir)
+            record["run"] = run
+            record["cache"] = "warm" if (run > 0 or args.warm_up) else "cold"
+            print("run %d (%s cache): import %.2f s, first image %.2f s, total %.2f s" % (
+                run, record["cache"], record["import_s"], record["first_image_s"], record["total_s"]))
+            results.append(record)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    with open(args.output, "w") as f:
+        json.dump({"function": args.function, "results": results}, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Check of the correlated color temperature: xyz_to_cct, xyz_to_cct_map and xyz_to_cct_region on the XYZ white points of
+standard illuminants against their published CCT, black and out of range pixels and an empty region.
+Fails if a value is off by more than --tolerance K or an edge case is not handled as documented.
+
+usage:
+    python check_cct.py
+    python check_cct.py --package ImageAnalysis.ColorConversion --tolerance 1
+"""
+import argparse
+import importlib
+import json
+import sys
+import warnings
+from typing import Optional
+import numpy as np
+
+# import path of the ColorConversion package
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+
+# illuminant -> (XYZ white point with Y = 1, CCT in K) of Robertson's method, Wyszecki & Stiles pp. 227, 228
+REFERENCES = {
+    "D65": ((0.95047, 1.0, 1.08883), 6502.0),
+    "A": ((1.09850, 1.0, 0.35585), 2856.0),
+    "D50": ((0.96422, 1.0, 0.82521), 5002.0),
+}
+
+
+def check(package: str, tolerance: float) -> list[dict]:
+    """runs all checks
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param tolerance: allowed difference to the published CCT in K
+    :type tolerance: float
+    :return: result record per check
+    :rtype: list[dict]
+    """
+    XYZ_conversions = importlib.import_module(package + ".XYZ_conversions")
+    results = []
+    # one row per illuminant, the map must give the scalar value for every pixel
+    image = np.array([[xyz] * 4 for xyz, _ in REFERENCES.values()], dtype=np.float64)
+    cct_map = XYZ_conversions.xyz_to_cct_map(image)
+    for row, (name, (xyz, reference)) in enumerate(REFERENCES.items()):
+        mask = np.zeros(image.shape[:2], dtype=bool)
+        mask[row] = True
+        values = {"xyz_to_cct": XYZ_conversions.xyz_to_cct(*xyz),
+                  "xyz_to_cct_map": float(cct_map[row].max()),
+                  "xyz_to_cct_region": XYZ_conversions.xyz_to_cct_region(image, mask)}
+        for function, value in values.items():
+            passed = value is not None and abs(value - reference) <= tolerance
+            if function == "xyz_to_cct_map":
+                passed = passed and np.ptp(cct_map[row]) == 0
+            results.append({"check": "%s %s" % (function, name), "value": value, "expected": reference,
+                            "passed": bool(passed)})
+
+    # black pixels and pixels far off the Planckian locus (pure blue) have no CCT
+    edge = np.array([[[0.0, 0.0, 0.0], [0.18, 0.07, 0.95]]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        edge_map = XYZ_conversions.xyz_to_cct_map(edge)
+        scalar = [XYZ_conversions.xyz_to_cct(*xyz) for xyz in edge[0]]
+        results.append({"check": "no CCT: xyz_to_cct_map nan, xyz_to_cct None", "value": [str(v) for v in edge_map[0]],
+                         "expected": "nan", "passed": bool(np.isnan(edge_map).all()) and scalar == [None, None]})
+        try:
+            XYZ_conversions.xyz_to_cct_region(image, np.zeros(image.shape[:2], dtype=bool))
+            outcome = "no error"
+        except ValueError:
+            outcome = "ValueError"
+        except RuntimeWarning as inst:
+            outcome = "RuntimeWarning: %s" % inst
+    results.append({"check": "xyz_to_cct_region empty mask", "value": outcome, "expected": "ValueError",
+                    "passed": outcome == "ValueError"})
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs the checks and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if a check failed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed difference to the published CCT in K")
+    parser.add_argument("--output", default="check_cct_results.json")
+    args = parser.parse_args(argv)
+
+    results = check(args.package, args.tolerance)
+    for record in results:
+        value = "%.1f K" % record["value"] if isinstance(record["value"], float) else record["value"]
+        print("%-45s %-22s expected %-12s %s" % (record["check"], value, record["expected"],
+                                                  "ok" if record["passed"] else "FAILED"))
+    passed = all(record["passed"] for record in results)
+    print("CCT checks passed: %s" % passed)
+    with open(args.output, "w") as f:
+        json.dump({"results": results, "passed": passed}, f, indent=4)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
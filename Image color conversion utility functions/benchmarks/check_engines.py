@@ -0,0 +1,138 @@
+"""
+Check of the conversion engines: runs every XYZ conversion with an engine argument with engine="vectorized" and
+engine="numba" on synthetic images per dtype and compares the results.
+The vectorized engine normalises uint8/uint16 input to 0-1, the numba engine gets the same image as float32 0-1.
+Fails if a result has another dtype or differs by more than the tolerance of its dtype.
+
+usage:
+    python check_engines.py
+    python check_engines.py --package ImageAnalysis.ColorConversion --dtypes float32 uint8
+"""
+import argparse
+import importlib
+import json
+import sys
+import warnings
+from typing import Optional
+import numpy as np
+
+# import path of the ColorConversion package
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+DTYPES = ("float32", "float64", "uint8", "uint16")
+
+# function name -> dimensions of the input, xyz_to_xyY takes a list of pixels
+CASES = {
+    "xyz_to_sRGB": 3,
+    "xyz_to_adobeRGB": 3,
+    "xyz_to_lab": 3,
+    "xyz_to_xyY": 2,
+}
+
+# (rtol, atol) by dtype of the result, the numba kernels are compiled with fastmath
+TOLERANCES = {"float32": (1e-5, 2e-4), "float64": (1e-9, 1e-9)}
+
+
+def synthetic_xyz(ndim: int, dtype: str, seed: int = 0) -> np.ndarray:
+    """random xyz image with black pixels, values below the lab epsilon and around the sRGB gamma threshold
+
+    :param ndim: 3 for an image (64, 48, 3), 2 for a list of 3072 pixels
+    :type ndim: int
+    :param dtype: float32, float64, uint8 or uint16
+    :type dtype: str
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: xyz image, 0-1 for float dtypes
+    :rtype: ndarray
+    """
+    rng = np.random.default_rng(seed)
+    if dtype.startswith("uint"):
+        image = rng.integers(0, np.iinfo(dtype).max, size=(64, 48, 3), endpoint=True, dtype=dtype)
+        image[0] = 0
+        image[1] = np.iinfo(dtype).max
+    else:
+        image = rng.random((64, 48, 3)).astype(dtype)
+        image[0] = 0
+        image[1] = 1
+        image[2] = rng.uniform(0, 0.01, (48, 3))
+        image[3] = rng.uniform(0.003, 0.0035, (48, 3))
+    return image.reshape(-1, 3) if ndim == 2 else image
+
+
+def compare(vectorized: np.ndarray, numba: np.ndarray) -> dict:
+    """compares the results of both engines
+
+    :param vectorized: result of the vectorized engine
+    :type vectorized: ndarray
+    :param numba: result of the numba engine
+    :type numba: ndarray
+    :return: dtypes, max abs difference (nan in both counts as equal) and passed
+    :rtype: dict
+    """
+    record = {"vectorized_dtype": vectorized.dtype.name, "numba_dtype": numba.dtype.name, "max_abs_diff": None,
+              "passed": False}
+    if vectorized.dtype != numba.dtype or vectorized.shape != numba.shape:
+        return record
+    difference = np.abs(vectorized.astype(np.float64) - numba.astype(np.float64))
+    difference[np.isnan(vectorized) & np.isnan(numba)] = 0
+    record["max_abs_diff"] = float(np.max(difference))
+    rtol, atol = TOLERANCES[vectorized.dtype.name]
+    record["passed"] = bool(np.allclose(vectorized, numba, rtol=rtol, atol=atol, equal_nan=True))
+    return record
+
+
+def check(package: str, dtypes: list[str]) -> list[dict]:
+    """runs both engines for every function and dtype
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param dtypes: input dtypes, see DTYPES
+    :type dtypes: list[str]
+    :return: result record per function and dtype
+    :rtype: list[dict]
+    """
+    XYZ_conversions = importlib.import_module(package + ".XYZ_conversions")
+    results = []
+    for name, ndim in CASES.items():
+        function = getattr(XYZ_conversions, name)
+        for dtype in dtypes:
+            image = synthetic_xyz(ndim, dtype)
+            numba_input = image
+            if dtype.startswith("uint"):
+                numba_input = (image / float(np.iinfo(dtype).max)).astype(np.float32)
+            with warnings.catch_warnings():
+                # adobe gamma of negative values is nan in both engines
+                warnings.simplefilter("ignore", RuntimeWarning)
+                record = compare(function(image, engine="vectorized"), function(numba_input, engine="numba"))
+            record.update({"function": name, "dtype": dtype})
+            print("%-16s %-8s %-8s %-8s max abs diff %-10s %s" % (
+                name, dtype, record["vectorized_dtype"], record["numba_dtype"],
+                "-" if record["max_abs_diff"] is None else "%.2e" % record["max_abs_diff"],
+                "ok" if record["passed"] else "MISMATCH"))
+            results.append(record)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs the check and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if an engine result differs
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--dtypes", nargs="+", default=list(DTYPES), choices=list(DTYPES))
+    parser.add_argument("--output", default="check_engines_results.json")
+    args = parser.parse_args(argv)
+
+    results = check(args.package, args.dtypes)
+    passed = all(record["passed"] for record in results)
+    print("engines equal: %s" % passed)
+    with open(args.output, "w") as f:
+        json.dump({"results": results, "passed": passed}, f, indent=4)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Parity check of the HSV conversions: the sector kernels of convert_RGB_to_HSV and hsv_to_sRGB against the former
+branch ladder kernels (copied below), the "vectorized" engine against the kernels and both against cv2.cvtColor.
+Synthetic images cover grays, black, white, ties of the max channel and hue sector boundaries.
+Fails if a difference exceeds the limits in LIMITS (ulp of the dtype at the channel range, degrees or absolute for cv2).
+
+usage:
+    python check_hsv_kernels.py
+    python check_hsv_kernels.py --package ImageAnalysis.ColorConversion --pixels 1000000
+"""
+import argparse
+import importlib
+import json
+import sys
+from typing import Optional
+import numpy as np
+from numba import njit
+
+# import path of the ColorConversion package
+DEFAULT_PACKAGE = "ImageAnalysis.ColorConversion"
+DTYPES = ("float32", "float64")
+HSV_RANGE = (360, 1, 1)
+RGB_RANGE = (1, 1, 1)
+
+# comparison -> max difference per dtype: ulp of the channel range for the kernels and engines, for cv2 the share of
+# the bound of cv2_hsv_bounds and absolute for rgb. The only tolerance between the kernels and the vectorized engine is
+# HSV to RGB: fastmath lets LLVM replace H / 60 by H * (1 / 60) in the kernel, numpy divides (without fastmath both
+# are bit identical), float32 rounds the difference away except in a few pixels close to 0
+LIMITS = {
+    "rgb_to_hsv numba vs former": {"float32": 0, "float64": 0},
+    "hsv_to_rgb numba vs former": {"float32": 0, "float64": 0},
+    "rgb_to_hsv vectorized vs numba": {"float32": 0, "float64": 0},
+    "hsv_to_rgb vectorized vs numba": {"float32": 1, "float64": 4},
+    "rgb_to_hsv cv2 H": {"float32": 1},
+    "rgb_to_hsv cv2 S, V": {"float32": 1},
+    "hsv_to_rgb cv2": {"float32": 1e-5},
+}
+
+
+@njit(fastmath=True, nogil=True)
+def former_rgb_to_hsv(image_array: np.ndarray) -> np.ndarray:
+    """convert_RGB_to_HSV before the sector kernel"""
+    new_image = np.zeros_like(image_array)
+    for index in np.ndindex(image_array.shape[:2]):
+        c_min = np.min(image_array[index])
+        c_max = np.max(image_array[index])
+        delta = c_max - c_min
+        if delta != 0:
+            r_value = image_array[index][0]
+            g_value = image_array[index][1]
+            b_value = image_array[index][2]
+            if c_max == r_value:
+                new_image[index][0] = np.mod(60 * (g_value - b_value) / delta, 360)
+            elif c_max == g_value:
+                new_image[index][0] = 60 * (b_value - r_value) / delta + 120
+            elif c_max == b_value:
+                new_image[index][0] = 60 * (r_value - g_value) / delta + 240
+        new_image[index][2] = c_max
+        if c_max != 0:
+            new_image[index][1] = delta / c_max
+    return new_image
+
+
+@njit(fastmath=True, nogil=True)
+def former_hsv_to_rgb(image_array: np.ndarray) -> np.ndarray:
+    """hsv_conversions.__hsv_to_rgb before the sector table, in place"""
+    for index in np.ndindex(image_array.shape[:2]):
+        H = image_array[index][0]
+        S = image_array[index][1]
+        V = image_array[index][2]
+        C = V * S
+        X = C * (1 - np.absolute((H/60) % 2 - 1))
+        m = V - C
+        if 0 <= H < 60:
+            pre_r_g_b = (C, X, 0)
+        elif 60 <= H < 120:
+            pre_r_g_b = (X, C, 0)
+        elif 120 <= H < 180:
+            pre_r_g_b = (0, C, X)
+        elif 180 <= H < 240:
+            pre_r_g_b = (0, X, C)
+        elif 240 <= H < 300:
+            pre_r_g_b = (X, 0, C)
+        elif 300 <= H < 360:
+            pre_r_g_b = (C, 0, X)
+        else:
+            raise ValueError("H out of range should be 0-360")
+        image_array[index][0] = (pre_r_g_b[0] + m)
+        image_array[index][1] = (pre_r_g_b[1] + m)
+        image_array[index][2] = (pre_r_g_b[2] + m)
+    return image_array
+
+
+def synthetic_rgb(pixels: int, dtype: str, seed: int = 0) -> np.ndarray:
+    """random rgb 0-1 with grays, black, white, primaries and ties of the max channel
+
+    :param pixels: approximate number of pixels
+    :type pixels: int
+    :param dtype: float32 or float64
+    :type dtype: str
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: image (rows, 100, 3)
+    :rtype: ndarray
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.random((max(pixels // 100, 8), 100, 3)).astype(dtype)
+    image[0] = image[0, :, :1]
+    image[1, :50] = 0
+    image[1, 50:] = 1
+    image[2] = np.eye(3, dtype=dtype)[np.arange(100) % 3]
+    image[3, :, 1] = image[3, :, 0]
+    image[4, :, 2] = image[4, :, 1]
+    image[5, :, 0] = image[5, :, 2]
+    return image
+
+
+def synthetic_hsv(pixels: int, dtype: str, seed: int = 0) -> np.ndarray:
+    """random hsv (H 0-360, S and V 0-1) with H on and next to the 60 degree sector boundaries, S and V of 0 and 1
+
+    :param pixels: approximate number of pixels
+    :type pixels: int
+    :param dtype: float32 or float64
+    :type dtype: str
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: image (rows, 100, 3)
+    :rtype: ndarray
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.random((max(pixels // 100, 8), 100, 3)).astype(dtype)
+    # float32 random values close to 1 round to H = 360
+    zero = np.zeros(1, dtype=dtype)
+    last_hue = np.nextafter(np.array([360], dtype=dtype), zero)
+    image[..., 0] = np.minimum(image[..., 0] * 360, last_hue)
+    boundaries = np.arange(0, 360, 60, dtype=dtype)
+    image[0, :, 0] = np.resize(boundaries, 100)
+    image[1, :, 0] = np.resize(np.nextafter(boundaries[1:], zero), 100)
+    image[2, :, 0] = last_hue
+    image[3, :, 1] = 0
+    image[4, :, 1:] = 1
+    return image
+
+
+def ulp_difference(first: np.ndarray, second: np.ndarray, channel_range: tuple) -> float:
+    """largest difference in units in the last place of the channel range (360 for H, 1 for S, V and rgb).
+    Relative to the value itself, results of V - C close to 0 would differ by thousands of ulp
+
+    :param first: image
+    :type first: ndarray
+    :param second: image of the same dtype
+    :type second: ndarray
+    :param channel_range: largest value per channel
+    :type channel_range: tuple
+    :return: max difference in ulp, inf if the dtypes differ
+    :rtype: float
+    """
+    if first.dtype != second.dtype or first.shape != second.shape:
+        return float("inf")
+    spacing = np.spacing(np.array(channel_range, dtype=first.dtype))
+    return float(np.max(np.abs(first.astype(np.float64) - second) / spacing))
+
+
+def hue_difference(first: np.ndarray, second: np.ndarray) -> float:
+    """difference of two hue arrays in degrees, 0 and 360 are the same hue
+
+    :param first: hue in degrees
+    :type first: ndarray
+    :param second: hue in degrees
+    :type second: ndarray
+    :return: difference in degrees per pixel
+    :rtype: ndarray
+    """
+    difference = np.abs(first.astype(np.float64) - second) % 360
+    return np.minimum(difference, 360 - difference)
+
+
+def cv2_hsv_bounds(rgb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """allowed difference of H and S to cv2.cvtColor(COLOR_RGB2HSV) per pixel. cv2 adds FLT_EPSILON to the
+    denominators, 60 * (g - b) / (delta + eps) and delta / (V + eps), which changes H by up to 60 * eps / delta degrees
+    and S by up to eps / V, e.g. 0.008 degrees for a chroma of 0.001
+
+    :param rgb: float32 rgb image
+    :type rgb: ndarray
+    :return: bound of H in degrees, bound of S
+    :rtype: tuple[ndarray, ndarray]
+    """
+    epsilon = float(np.finfo(np.float32).eps)
+    c_max = rgb.max(axis=-1).astype(np.float64)
+    delta = c_max - rgb.min(axis=-1)
+    with np.errstate(divide="ignore"):
+        hue_bound = 1e-4 + 2 * 60 * epsilon / delta
+        saturation_bound = 1e-6 + 2 * epsilon / c_max
+    return hue_bound, saturation_bound
+
+
+def check(package: str, dtypes: list[str], pixels: int) -> list[dict]:
+    """runs all comparisons
+
+    :param package: import path of the ColorConversion package
+    :type package: str
+    :param dtypes: float32 and/or float64
+    :type dtypes: list[str]
+    :param pixels: approximate number of pixels of the synthetic images
+    :type pixels: int
+    :return: result record per comparison and dtype
+    :rtype: list[dict]
+    """
+    rgb_conversions = importlib.import_module(package + ".rgb_conversions")
+    hsv_conversions = importlib.import_module(package + ".hsv_conversions")
+    vectorized_conversions = importlib.import_module(package + ".vectorized_conversions")
+    hsv_to_rgb_kernel = getattr(hsv_conversions, "__hsv_to_rgb")
+    results = []
+    for dtype in dtypes:
+        rgb = synthetic_rgb(pixels, dtype)
+        hsv = synthetic_hsv(pixels, dtype)
+        hsv_numba = rgb_conversions.convert_RGB_to_HSV(rgb, engine="numba")
+        rgb_numba = hsv_to_rgb_kernel(hsv.copy())
+        differences = {
+            "rgb_to_hsv numba vs former": ulp_difference(hsv_numba, former_rgb_to_hsv(rgb), HSV_RANGE),
+            "hsv_to_rgb numba vs former": ulp_difference(rgb_numba, former_hsv_to_rgb(hsv.copy()), RGB_RANGE),
+            "rgb_to_hsv vectorized vs numba": ulp_difference(
+                rgb_conversions.convert_RGB_to_HSV(rgb, engine="vectorized"), hsv_numba, HSV_RANGE),
+            "hsv_to_rgb vectorized vs numba": ulp_difference(vectorized_conversions.hsv_to_rgb(hsv), rgb_numba,
+                                                             RGB_RANGE),
+        }
+        if dtype == "float32":
+            try:
+                import cv2
+            except ImportError:
+                print("cv2 not installed, cv2.cvtColor skipped")
+            else:
+                hsv_cv2 = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+                hue_bound, saturation_bound = cv2_hsv_bounds(rgb)
+                differences["rgb_to_hsv cv2 H"] = float(np.max(
+                    hue_difference(hsv_numba[..., 0], hsv_cv2[..., 0]) / hue_bound))
+                differences["rgb_to_hsv cv2 S, V"] = float(max(
+                    np.max(np.abs(hsv_numba[..., 1] - hsv_cv2[..., 1].astype(np.float64)) / saturation_bound),
+                    np.max(np.abs(hsv_numba[..., 2] - hsv_cv2[..., 2])) / 1e-6))
+                differences["hsv_to_rgb cv2"] = float(np.max(np.abs(rgb_numba - cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB))))
+        for name, difference in differences.items():
+            record = {"comparison": name, "dtype": dtype, "difference": difference, "limit": LIMITS[name][dtype],
+                      "passed": difference <= LIMITS[name][dtype]}
+            print("%-32s %-8s %10.3g  limit %-8g %s" % (name, dtype, difference, record["limit"],
+                                                         "ok" if record["passed"] else "MISMATCH"))
+            results.append(record)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """runs the check and writes the json
+
+    :param argv: command line arguments, defaults to None (sys.argv)
+    :type argv: list[str], optional
+    :return: exit code, 1 if a comparison exceeds its limit
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--package", default=DEFAULT_PACKAGE, help="import path of the ColorConversion package")
+    parser.add_argument("--dtypes", nargs="+", default=list(DTYPES), choices=list(DTYPES))
+    parser.add_argument("--pixels", type=int, default=200000)
+    parser.add_argument("--output", default="check_hsv_kernels_results.json")
+    args = parser.parse_args(argv)
+
+    results = check(args.package, args.dtypes, args.pixels)
+    passed = all(record["passed"] for record in results)
+    print("HSV parity: %s" % passed)
+    with open(args.output, "w") as f:
+        json.dump({"results": results, "passed": passed}, f, indent=4)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,11 +7,31 @@ from io import BytesIO
 import cv2
 import numpy as np
 from PIL import Image, ImageCms
+from . import icc_tagging
+from . import image_header
 from . import COLORCONVERSION_LOGGER
 
 
 def get_colorprofile(filename: str) -> tuple[str, str, int]:
-    """get the colorprofile
+    """get the colorprofile, JPEG/PNG/TIFF files are probed from the header (see image_header.probe_image_header),
+    other files are decoded
+
+    :param filename: file path
+    :type filename: str
+    :raises NotImplemented: if image shape is to big ( must <= 3)
+    :return: (colorspace definition, color mode ,bpp)
+    :rtype: tuple[str, str, int
+    """
+    try:
+        header = image_header.probe_image_header(filename)
+    except ValueError as exc:
+        COLORCONVERSION_LOGGER.debug("Header probe failed (%s), decoding %s" % (exc, filename))
+        return __get_colorprofile_decoded(filename)
+    return __get_colorspace_definition(header.icc_profile), header.mode, header.bpp
+
+
+def __get_colorprofile_decoded(filename: str) -> tuple[str, str, int]:
+    """get the colorprofile by decoding the image
 
     :param filename: file path
     :type filename: str
@@ -51,9 +71,19 @@ def __get_colorprofile_freeimage(pil_image: Image) -> tuple[str, str]:
     :rtype: tuple[str, str]
     """
     bpp = mode_to_bpp(pil_image.mode)
+    return __get_colorspace_definition(pil_image.info.get('icc_profile')), pil_image.mode
+
+
+def __get_colorspace_definition(icc_profile: bytes) -> str:
+    """maps the description of an icc profile to the colorspace definition
+
+    :param icc_profile: embedded icc profile, None falls back to srgb
+    :type icc_profile: bytes
+    :return: colorspace definition, e.g. srgb or adobe
+    :rtype: str
+    """
     try:
-        icc = pil_image.info.get('icc_profile')
-        bytes_object = BytesIO(icc)
+        bytes_object = BytesIO(icc_profile)
         colorspace_name = ImageCms.ImageCmsProfile(
             bytes_object).profile.profile_description
     except Exception:
@@ -78,7 +108,7 @@ def __get_colorprofile_freeimage(pil_image: Image) -> tuple[str, str]:
             colorspace_name_real = 'srgb'
         else:
             raise exc
-    return colorspace_name_real, pil_image.mode
+    return colorspace_name_real
 
 
 def convert_0_to_1(img_as_np: np.ndarray) -> np.ndarray:
@@ -183,3 +213,32 @@ def set_adobe_icc_profile_to_file(file_path: str) -> None:
     icc_path = os.path.join(os.path.dirname(__file__),
                             "icc_profiles", "AdobeRGB1998.icc")
     set_colorspace_to_icc(file_path, icc_path)
+
+
+def set_colorspace_to_icc_batch(file_paths: list[str], icc_profile_path: str, exiftool_path: str = None) -> list[str]:
+    """sets a profile to many images, JPEG and TIFF files are written in process,
+    other formats by one exiftool process for the whole batch (see icc_tagging.set_icc_profile_to_files)
+
+    :param file_paths: file paths of the images
+    :type file_paths: list[str]
+    :param icc_profile_path: absolute path to the icc profile to use for conversion
+    :type icc_profile_path: str
+    :param exiftool_path: absolute path to the exiftool.exe, defaults to None
+    :type exiftool_path: str, optional
+    :return: files that could not be tagged
+    :rtype: list[str]
+    """
+    return icc_tagging.set_icc_profile_to_files(file_paths, icc_profile_path, exiftool_path)
+
+
+def set_adobe_icc_profile_to_files(file_paths: list[str]) -> list[str]:
+    """sets the adobe icc profile to many images
+
+    :param file_paths: file paths of the images
+    :type file_paths: list[str]
+    :return: files that could not be tagged
+    :rtype: list[str]
+    """
+    icc_path = os.path.join(os.path.dirname(__file__),
+                            "icc_profiles", "AdobeRGB1998.icc")
+    return set_colorspace_to_icc_batch(file_paths, icc_path)
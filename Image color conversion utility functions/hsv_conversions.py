@@ -1,59 +1,70 @@
 import numpy as np
 from numba import njit
 from . import sRGB_conversions
+from . import vectorized_conversions
 
 
-def hsv_to_sRGB(image_array: np.ndarray) -> np.ndarray:
+def hsv_to_sRGB(image_array: np.ndarray, engine: str = "numba") -> np.ndarray:
     """converts from hsv to sRGB 0-1
 
     :param image_array: hsv image in 0-1
     :type image_array: ndarray
+    :param engine: "numba" (njit sector kernel) or "vectorized" (numpy whole array), defaults to "numba"
+    :type engine: str, optional
+    :raises ValueError: unknown engine
     :return: sRGB image with gamma
     :rtype: ndarray
     """
-    sRGB_image = image_array.copy()
-    sRGB_image = __hsv_to_rgb(sRGB_image)
+    if engine == "numba":
+        sRGB_image = image_array.copy()
+        sRGB_image = __hsv_to_rgb(sRGB_image)
+    elif engine == "vectorized":
+        sRGB_image = vectorized_conversions.hsv_to_rgb(image_array)
+    else:
+        raise ValueError("Unknown engine %s, use numba or vectorized" % engine)
     # add gamma
     sRGB_image = sRGB_conversions.sRGB_add_gamma(sRGB_image).clip(0, 1)
     return sRGB_image
 
 
-@njit(fastmath=True)
+# position of (C, X, 0) in (r, g, b) for each 60 degree hue sector
+hue_sector_order = np.array([[0, 1, 2],
+                             [1, 0, 2],
+                             [2, 0, 1],
+                             [2, 1, 0],
+                             [1, 2, 0],
+                             [0, 2, 1]], dtype=np.int64)
+
+
+@njit(fastmath=True, nogil=True, cache=True)
 def __hsv_to_rgb(image_array: np.ndarray) -> np.ndarray:
-    """converts from hsv to rgb 0-1
+    """converts from hsv to rgb 0-1 in place, njit boosted.
+    The channel order of (C, X, 0) is looked up from the hue sector instead of a branch ladder
 
     :param image_array: image as hsv in 0-1
     :type image_array: ndarray
+    :raises ValueError: H out of range
     :return: image as rgb
     :rtype: ndarray
     """
-    for index in np.ndindex(image_array.shape[:2]):
-        # HSV from 0 to 360 degree
-        H = image_array[index][0]
-        S = image_array[index][1]
-        V = image_array[index][2]
-        C = V * S
-        X = C * (1 - np.absolute((H/60) % 2 - 1))
-        m = V - C
-        pre_r_g_b = (None, None, None)
-        if 0 <= H < 60:
-            pre_r_g_b = (C, X, 0)
-        elif 60 <= H < 120:
-            pre_r_g_b = (X, C, 0)
-        elif 120 <= H < 180:
-            pre_r_g_b = (0, C, X)
-        elif 180 <= H < 240:
-            pre_r_g_b = (0, X, C)
-        elif 240 <= H < 300:
-            pre_r_g_b = (X, 0, C)
-        elif 300 <= H < 360:
-            pre_r_g_b = (C, 0, X)
-        else:
-            raise ValueError("H out of range should be 0-360")
-        # r value
-        image_array[index][0] = (pre_r_g_b[0] + m)
-        # g  value
-        image_array[index][1] = (pre_r_g_b[1] + m)
-        # b value
-        image_array[index][2] = (pre_r_g_b[2] + m)
+    # float64 like the former (C, X, 0) tuple, X is float64 and a float32 scratch would round it before adding m
+    pre_r_g_b = np.zeros(3, dtype=np.float64)
+    for row in range(image_array.shape[0]):
+        for col in range(image_array.shape[1]):
+            # HSV from 0 to 360 degree
+            H = image_array[row, col, 0]
+            S = image_array[row, col, 1]
+            V = image_array[row, col, 2]
+            if not 0 <= H < 360:
+                raise ValueError("H out of range should be 0-360")
+            C = V * S
+            X = C * (1 - np.absolute((H/60) % 2 - 1))
+            m = V - C
+            pre_r_g_b[0] = C
+            pre_r_g_b[1] = X
+            pre_r_g_b[2] = 0
+            sector = int(H // 60)
+            image_array[row, col, 0] = pre_r_g_b[hue_sector_order[sector, 0]] + m
+            image_array[row, col, 1] = pre_r_g_b[hue_sector_order[sector, 1]] + m
+            image_array[row, col, 2] = pre_r_g_b[hue_sector_order[sector, 2]] + m
     return image_array
@@ -0,0 +1,285 @@
+"""
+Batch tagging of images with an ICC profile without re-encoding the pixels
+
+JPEG files get the profile as APP2 ICC_PROFILE segments, TIFF files as tag 34675 in a new first IFD appended to the file.
+Other files are tagged by one long-lived exiftool -stay_open process instead of one process per file.
+"""
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+from . import COLORCONVERSION_LOGGER
+
+_JPEG_ICC_IDENTIFIER = b"ICC_PROFILE\x00"
+# segment length field (2) + identifier (12) + sequence number and count (2)
+_JPEG_ICC_MAX_CHUNK = 0xFFFF - 2 - len(_JPEG_ICC_IDENTIFIER) - 2
+_JPEG_STANDALONE_MARKERS = frozenset((0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8))
+_TIFF_ICC_PROFILE = 34675
+_TIFF_UNDEFINED = 7
+
+
+def default_exiftool_path() -> str:
+    """exiftool next to this module (as used by helper_functions.set_colorspace_to_icc)
+
+    :return: path to exiftool.exe
+    :rtype: str
+    """
+    return os.path.join(os.path.dirname(__file__), "exiftool.exe")
+
+
+def embed_icc_profile(file_path: str, icc_profile: bytes) -> None:
+    """writes the icc profile into a JPEG or TIFF file, the pixel data is copied unchanged.
+    An existing profile is replaced
+
+    :param file_path: JPEG or TIFF file
+    :type file_path: str
+    :param icc_profile: content of the .icc file
+    :type icc_profile: bytes
+    :raises NotImplementedError: other file formats (e.g. PNG, BigTIFF)
+    """
+    with open(file_path, "rb") as f:
+        start = f.read(4)
+    if start[:2] == b"\xff\xd8":
+        __embed_icc_jpeg(file_path, icc_profile)
+    elif start in (b"II*\x00", b"MM\x00*"):
+        __embed_icc_tiff(file_path, icc_profile)
+    else:
+        raise NotImplementedError("Embedding icc profiles is only implemented for JPEG and TIFF: %s" % file_path)
+
+
+def __jpeg_icc_segments(icc_profile: bytes) -> bytes:
+    """splits a profile into APP2 segments
+
+    :param icc_profile: content of the .icc file
+    :type icc_profile: bytes
+    :return: encoded segments
+    :rtype: bytes
+    """
+    chunks = [icc_profile[start:start + _JPEG_ICC_MAX_CHUNK] for start in range(0, len(icc_profile), _JPEG_ICC_MAX_CHUNK)]
+    if len(chunks) > 255:
+        raise ValueError("icc profile too large for JPEG (%d bytes)" % len(icc_profile))
+    segments = []
+    for sequence, chunk in enumerate(chunks, start=1):
+        payload = _JPEG_ICC_IDENTIFIER + bytes((sequence, len(chunks))) + chunk
+        segments.append(b"\xff\xe2" + struct.pack(">H", len(payload) + 2) + payload)
+    return b"".join(segments)
+
+
+def __embed_icc_jpeg(file_path: str, icc_profile: bytes) -> None:
+    """rewrites the JPEG header with new APP2 segments after the leading APP0/APP1 segments,
+    the entropy coded data is copied as is. The file is replaced atomically
+
+    :param file_path: JPEG file
+    :type file_path: str
+    :param icc_profile: content of the .icc file
+    :type icc_profile: bytes
+    """
+    with open(file_path, "rb") as source:
+        source.seek(2)
+        leading = []
+        others = []
+        while True:
+            marker_bytes = __read_marker(source)
+            marker = marker_bytes[1]
+            if marker in _JPEG_STANDALONE_MARKERS:
+                others.append(marker_bytes)
+                continue
+            if marker == 0xDA:
+                # start of scan, everything from here on is copied
+                source.seek(-2, os.SEEK_CUR)
+                break
+            length_bytes = source.read(2)
+            segment = marker_bytes + length_bytes + source.read(struct.unpack(">H", length_bytes)[0] - 2)
+            if marker == 0xE2 and segment[4:4 + len(_JPEG_ICC_IDENTIFIER)] == _JPEG_ICC_IDENTIFIER:
+                continue
+            if marker in (0xE0, 0xE1) and not others:
+                leading.append(segment)
+            else:
+                others.append(segment)
+        header = b"\xff\xd8" + b"".join(leading) + __jpeg_icc_segments(icc_profile) + b"".join(others)
+        __replace_file(file_path, header, source)
+
+
+def __read_marker(f: BinaryIO) -> bytes:
+    """reads the next marker, skips fill bytes
+
+    :param f: open JPEG file
+    :type f: BinaryIO
+    :raises ValueError: no marker at the current position
+    :return: 0xFF and the marker byte
+    :rtype: bytes
+    """
+    if f.read(1) != b"\xff":
+        raise ValueError("Invalid JPEG marker")
+    marker = f.read(1)
+    while marker == b"\xff":
+        marker = f.read(1)
+    if not marker:
+        raise ValueError("No start of scan in JPEG")
+    return b"\xff" + marker
+
+
+def __replace_file(file_path: str, header: bytes, rest: BinaryIO) -> None:
+    """writes header and the remaining content of rest to a temporary file in the same directory and replaces file_path
+
+    :param file_path: file to replace
+    :type file_path: str
+    :param header: new beginning of the file
+    :type header: bytes
+    :param rest: open file positioned at the data to copy
+    :type rest: BinaryIO
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".icc_tmp")
+    try:
+        with os.fdopen(handle, "wb") as target:
+            target.write(header)
+            shutil.copyfileobj(rest, target, 1024 * 1024)
+        shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def __embed_icc_tiff(file_path: str, icc_profile: bytes) -> None:
+    """appends the profile and a copy of the first IFD with the icc tag to the file, then points the header to the new IFD.
+    Offsets of all other entries stay valid, so strips/tiles are not touched
+
+    :param file_path: TIFF file
+    :type file_path: str
+    :param icc_profile: content of the .icc file
+    :type icc_profile: bytes
+    :raises NotImplementedError: file would exceed 4 GB
+    """
+    with open(file_path, "r+b") as f:
+        byte_order = "<" if f.read(2) == b"II" else ">"
+        ifd_offset = struct.unpack(byte_order + "HI", f.read(6))[1]
+        f.seek(ifd_offset)
+        entry_count = struct.unpack(byte_order + "H", f.read(2))[0]
+        entries = [f.read(12) for _ in range(entry_count)]
+        next_ifd = f.read(4)
+        entries = [entry for entry in entries if struct.unpack(byte_order + "H", entry[:2])[0] != _TIFF_ICC_PROFILE]
+
+        end = f.seek(0, os.SEEK_END)
+        # offsets must be word aligned
+        padding = end % 2
+        profile_offset = end + padding
+        new_ifd_offset = profile_offset + len(icc_profile) + len(icc_profile) % 2
+        new_ifd_size = 2 + (len(entries) + 1) * 12 + 4
+        if new_ifd_offset + new_ifd_size > 0xFFFFFFFF:
+            raise NotImplementedError("TIFF would exceed 4 GB: %s" % file_path)
+        entries.append(struct.pack(byte_order + "HHII", _TIFF_ICC_PROFILE, _TIFF_UNDEFINED, len(icc_profile), profile_offset))
+        entries.sort(key=lambda entry: struct.unpack(byte_order + "H", entry[:2])[0])
+
+        f.write(b"\x00" * padding + icc_profile + b"\x00" * (len(icc_profile) % 2))
+        f.write(struct.pack(byte_order + "H", len(entries)) + b"".join(entries) + next_ifd)
+        f.flush()
+        # switch to the new IFD last, an interrupted write leaves the old file valid
+        f.seek(4)
+        f.write(struct.pack(byte_order + "I", new_ifd_offset))
+
+
+class ExiftoolProcess:
+    """one exiftool process in -stay_open mode, arguments are fed through its argument file (stdin)
+
+    usage:
+        with ExiftoolProcess() as exiftool:
+            exiftool.execute("-icc_profile<=AdobeRGB1998.icc", "-overwrite_original", "image.png")
+    """
+
+    def __init__(self, exiftool_path: Optional[str] = None):
+        """
+        :param exiftool_path: absolute path to the exiftool executable, defaults to None (exiftool.exe next to this module)
+        :type exiftool_path: str, optional
+        """
+        self.exiftool_path = default_exiftool_path() if exiftool_path is None else exiftool_path
+        self.process = None
+
+    def __enter__(self) -> "ExiftoolProcess":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """starts the process"""
+        self.process = subprocess.Popen([self.exiftool_path, "-stay_open", "True", "-@", "-"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        encoding="utf-8")
+
+    def execute(self, *args: str) -> str:
+        """runs one exiftool command
+
+        :param args: command line arguments, one per line of the argument file
+        :type args: str
+        :return: output of the command
+        :rtype: str
+        """
+        if self.process is None:
+            self.start()
+        self.process.stdin.write("\n".join(("-charset", "filename=utf8") + args + ("-execute",)) + "\n")
+        self.process.stdin.flush()
+        output = []
+        for line in self.process.stdout:
+            if line.startswith("{ready"):
+                return "".join(output)
+            output.append(line)
+        raise RuntimeError("exiftool terminated: %s" % "".join(output))
+
+    def close(self) -> None:
+        """stops the process"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.write("-stay_open\nFalse\n")
+            self.process.stdin.flush()
+            self.process.communicate(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+
+def set_icc_profile_to_files(file_paths: Iterable[str], icc_profile_path: str,
+                             exiftool_path: Optional[str] = None) -> list[str]:
+    """tags many images with one icc profile. JPEG and TIFF files are written in process,
+    the others by a single exiftool process started on the first file that needs it
+
+    :param file_paths: images to tag
+    :type file_paths: Iterable[str]
+    :param icc_profile_path: absolute path to the icc profile
+    :type icc_profile_path: str
+    :param exiftool_path: absolute path to the exiftool executable, defaults to None (exiftool.exe next to this module)
+    :type exiftool_path: str, optional
+    :return: files that could not be tagged
+    :rtype: list[str]
+    """
+    with open(icc_profile_path, "rb") as f:
+        icc_profile = f.read()
+    failed = []
+    exiftool = ExiftoolProcess(exiftool_path)
+    try:
+        for file_path in file_paths:
+            try:
+                embed_icc_profile(file_path, icc_profile)
+                continue
+            except (NotImplementedError, ValueError, struct.error) as inst:
+                COLORCONVERSION_LOGGER.debug("Using exiftool for %s: %s" % (file_path, inst))
+            except OSError as inst:
+                # missing, locked or read only file, exiftool would fail the same way
+                COLORCONVERSION_LOGGER.error("Could not set icc profile to %s: %s" % (file_path, inst))
+                failed.append(file_path)
+                continue
+            try:
+                output = exiftool.execute("-icc_profile<=%s" % icc_profile_path, "-overwrite_original", file_path)
+            except (OSError, RuntimeError) as inst:
+                output = str(inst)
+            if "1 image files updated" not in output:
+                COLORCONVERSION_LOGGER.error("Could not set icc profile to %s: %s" % (file_path, output.strip()))
+                failed.append(file_path)
+    finally:
+        exiftool.close()
+    return failed
@@ -0,0 +1,342 @@
+"""
+Header-only probing of JPEG, PNG and TIFF files: ICC profile, bit depth, channels and dimensions without decoding pixels
+"""
+import os
+import struct
+import zlib
+from functools import lru_cache
+from typing import BinaryIO, NamedTuple, Optional
+
+# number of probed files kept in memory
+PROBE_CACHE_SIZE = 4096
+
+# JPEG start of frame markers (baseline, progressive, lossless, arithmetic), not DHT/JPG/DAC
+_JPEG_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+# JPEG markers without length field
+_JPEG_STANDALONE_MARKERS = frozenset((0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8))
+_JPEG_ICC_IDENTIFIER = b"ICC_PROFILE\x00"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# TIFF field type -> (struct format, size in bytes)
+_TIFF_TYPES = {1: ("B", 1), 2: ("B", 1), 3: ("H", 2), 4: ("I", 4), 6: ("b", 1), 7: ("B", 1), 8: ("h", 2), 9: ("i", 4),
+               13: ("I", 4)}
+_TIFF_WIDTH = 256
+_TIFF_HEIGHT = 257
+_TIFF_BITS_PER_SAMPLE = 258
+_TIFF_PHOTOMETRIC = 262
+_TIFF_SAMPLES_PER_PIXEL = 277
+_TIFF_SAMPLE_FORMAT = 339
+_TIFF_ICC_PROFILE = 34675
+
+
+class ImageHeader(NamedTuple):
+    """information read from the file header"""
+    format: str
+    width: int
+    height: int
+    bits_per_sample: int
+    samples_per_pixel: int
+    mode: str
+    icc_profile: Optional[bytes]
+
+    @property
+    def decoded_channels(self) -> int:
+        """number of channels cv2.imread(IMREAD_UNCHANGED) returns, palettes are expanded to rgb
+
+        :return: number of channels
+        :rtype: int
+        """
+        if self.mode == "P":
+            return 3
+        if self.mode == "LA":
+            return 4
+        if self.mode == "CMYK" and self.format == "jpeg":
+            return 3
+        return self.samples_per_pixel
+
+    @property
+    def decoded_bits(self) -> int:
+        """bits per sample of the decoded array, cv2 stores 1-8 bit data as uint8
+
+        :return: 8, 16 or 32
+        :rtype: int
+        """
+        if self.bits_per_sample <= 8:
+            return 8
+        if self.bits_per_sample <= 16:
+            return 16
+        return 32
+
+    @property
+    def bpp(self) -> int:
+        """bits per pixel of the decoded array
+
+        :return: bits per pixel
+        :rtype: int
+        """
+        return self.decoded_bits * self.decoded_channels
+
+
+def probe_image_header(filename: str) -> ImageHeader:
+    """reads ICC profile, bit depth, channels and dimensions from the header of a JPEG, PNG or TIFF file.
+    Results are memoized by (path, mtime, size), a changed file is probed again
+
+    :param filename: file path
+    :type filename: str
+    :raises ValueError: unsupported format or broken header
+    :return: header information
+    :rtype: ImageHeader
+    """
+    stat = os.stat(filename)
+    return __probe_cached(os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+
+
+def clear_probe_cache() -> None:
+    """empties the memoized probe results"""
+    __probe_cached.cache_clear()
+
+
+@lru_cache(maxsize=PROBE_CACHE_SIZE)
+def __probe_cached(filename: str, mtime_ns: int, size: int) -> ImageHeader:
+    """probes a file, mtime and size are only part of the cache key
+
+    :param filename: absolute file path
+    :type filename: str
+    :param mtime_ns: modification time of the file in ns
+    :type mtime_ns: int
+    :param size: file size in bytes
+    :type size: int
+    :return: header information
+    :rtype: ImageHeader
+    """
+    with open(filename, "rb") as f:
+        start = f.read(8)
+        f.seek(0)
+        try:
+            if start[:2] == b"\xff\xd8":
+                return __probe_jpeg(f)
+            if start == _PNG_SIGNATURE:
+                return __probe_png(f)
+            if start[:4] in (b"II*\x00", b"MM\x00*"):
+                return __probe_tiff(f)
+        except struct.error as exc:
+            raise ValueError("Truncated header in %s" % filename) from exc
+    raise ValueError("Unsupported image format of %s" % filename)
+
+
+def __read_exactly(f: BinaryIO, size: int) -> bytes:
+    """reads size bytes
+
+    :param f: open file
+    :type f: BinaryIO
+    :param size: number of bytes
+    :type size: int
+    :raises ValueError: end of file reached
+    :return: data
+    :rtype: bytes
+    """
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of file")
+    return data
+
+
+def __probe_jpeg(f: BinaryIO) -> ImageHeader:
+    """walks the JPEG markers up to the start of frame, collects the APP2 ICC chunks on the way
+
+    :param f: open file positioned at SOI
+    :type f: BinaryIO
+    :raises ValueError: no start of frame found
+    :return: header information
+    :rtype: ImageHeader
+    """
+    f.seek(2)
+    icc_chunks = {}
+    while True:
+        byte = __read_exactly(f, 1)
+        if byte != b"\xff":
+            raise ValueError("Invalid JPEG marker")
+        marker = __read_exactly(f, 1)[0]
+        # fill bytes
+        while marker == 0xFF:
+            marker = __read_exactly(f, 1)[0]
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("No JPEG start of frame before scan data")
+        length = struct.unpack(">H", __read_exactly(f, 2))[0] - 2
+        if marker == 0xE2:
+            data = __read_exactly(f, length)
+            if data.startswith(_JPEG_ICC_IDENTIFIER):
+                icc_chunks[data[12]] = data[14:]
+        elif marker in _JPEG_SOF_MARKERS:
+            precision, height, width, components = struct.unpack(">BHHB", __read_exactly(f, 6))
+            icc_profile = b"".join(icc_chunks[seq] for seq in sorted(icc_chunks)) if icc_chunks else None
+            mode = {1: "L", 3: "RGB", 4: "CMYK"}.get(components)
+            if mode is None:
+                raise ValueError("Unsupported number of JPEG components %d" % components)
+            return ImageHeader("jpeg", width, height, precision, components, mode, icc_profile)
+        else:
+            f.seek(length, os.SEEK_CUR)
+
+
+def __png_mode(color_type: int, bit_depth: int) -> tuple[str, int]:
+    """PIL mode and samples per pixel of a PNG color type
+
+    :param color_type: IHDR color type
+    :type color_type: int
+    :param bit_depth: IHDR bit depth
+    :type bit_depth: int
+    :raises ValueError: unknown color type
+    :return: (mode, samples per pixel)
+    :rtype: tuple[str, int]
+    """
+    if color_type == 0:
+        if bit_depth == 1:
+            return "1", 1
+        return ("I;16" if bit_depth == 16 else "L"), 1
+    modes = {2: ("RGB", 3), 3: ("P", 1), 4: ("LA", 2), 6: ("RGBA", 4)}
+    if color_type not in modes:
+        raise ValueError("Unknown PNG color type %d" % color_type)
+    return modes[color_type]
+
+
+def __probe_png(f: BinaryIO) -> ImageHeader:
+    """reads IHDR and iCCP, stops at the first IDAT chunk
+
+    :param f: open file positioned at the signature
+    :type f: BinaryIO
+    :raises ValueError: no IHDR chunk
+    :return: header information
+    :rtype: ImageHeader
+    """
+    f.seek(len(_PNG_SIGNATURE))
+    ihdr = None
+    icc_profile = None
+    has_transparency = False
+    while True:
+        length, chunk_type = struct.unpack(">I4s", __read_exactly(f, 8))
+        if chunk_type == b"IHDR":
+            ihdr = struct.unpack(">IIBB", __read_exactly(f, 10))
+            f.seek(length - 10 + 4, os.SEEK_CUR)
+        elif chunk_type == b"iCCP":
+            data = __read_exactly(f, length)
+            # profile name, null separator, compression method, zlib stream
+            compressed = data[data.index(b"\x00") + 2:]
+            icc_profile = zlib.decompress(compressed)
+            f.seek(4, os.SEEK_CUR)
+        elif chunk_type in (b"IDAT", b"IEND"):
+            break
+        else:
+            has_transparency = has_transparency or chunk_type == b"tRNS"
+            f.seek(length + 4, os.SEEK_CUR)
+    if ihdr is None:
+        raise ValueError("PNG without IHDR chunk")
+    width, height, bit_depth, color_type = ihdr
+    mode, samples = __png_mode(color_type, bit_depth)
+    header = ImageHeader("png", width, height, bit_depth, samples, mode, icc_profile)
+    if mode == "P" and has_transparency:
+        # cv2 expands palettes with transparency to bgra
+        header = header._replace(samples_per_pixel=4, mode="RGBA")
+    return header
+
+
+def __tiff_values(f: BinaryIO, byte_order: str, field_type: int, count: int, value_field: bytes) -> tuple:
+    """reads the values of one IFD entry, inline or from the offset
+
+    :param f: open file
+    :type f: BinaryIO
+    :param byte_order: < or >
+    :type byte_order: str
+    :param field_type: TIFF field type
+    :type field_type: int
+    :param count: number of values
+    :type count: int
+    :param value_field: 4 byte value/offset field of the entry
+    :type value_field: bytes
+    :return: values
+    :rtype: tuple
+    """
+    if field_type not in _TIFF_TYPES:
+        return ()
+    code, size = _TIFF_TYPES[field_type]
+    if count * size <= 4:
+        data = value_field[:count * size]
+    else:
+        position = f.tell()
+        f.seek(struct.unpack(byte_order + "I", value_field)[0])
+        data = __read_exactly(f, count * size)
+        f.seek(position)
+    return struct.unpack(byte_order + code * count, data)
+
+
+def __tiff_mode(photometric: int, samples: int, bits: int, sample_format: int, byte_order: str) -> str:
+    """PIL mode of a TIFF image
+
+    :param photometric: PhotometricInterpretation
+    :type photometric: int
+    :param samples: SamplesPerPixel
+    :type samples: int
+    :param bits: BitsPerSample
+    :type bits: int
+    :param sample_format: SampleFormat (1 uint, 2 int, 3 float)
+    :type sample_format: int
+    :param byte_order: < or >
+    :type byte_order: str
+    :return: mode
+    :rtype: str
+    """
+    if photometric in (0, 1) and samples == 1:
+        if bits == 1:
+            return "1"
+        if bits == 16:
+            return "I;16" if byte_order == "<" else "I;16B"
+        if bits == 32:
+            return "F" if sample_format == 3 else "I"
+        return "L"
+    if photometric in (0, 1) and samples == 2:
+        return "LA"
+    if photometric == 3:
+        return "P"
+    if photometric == 5:
+        return "CMYK"
+    if photometric == 6:
+        return "YCbCr"
+    return "RGBA" if samples == 4 else "RGB"
+
+
+def __probe_tiff(f: BinaryIO) -> ImageHeader:
+    """reads the first IFD of a TIFF file
+
+    :param f: open file positioned at the byte order mark
+    :type f: BinaryIO
+    :raises ValueError: width or height missing
+    :return: header information
+    :rtype: ImageHeader
+    """
+    byte_order = "<" if __read_exactly(f, 2) == b"II" else ">"
+    _, ifd_offset = struct.unpack(byte_order + "HI", __read_exactly(f, 6))
+    f.seek(ifd_offset)
+    entry_count = struct.unpack(byte_order + "H", __read_exactly(f, 2))[0]
+    entries = __read_exactly(f, entry_count * 12)
+    tags = {}
+    icc_profile = None
+    for index in range(entry_count):
+        tag, field_type, count, value_field = struct.unpack(byte_order + "HHI4s", entries[index * 12:index * 12 + 12])
+        if tag == _TIFF_ICC_PROFILE:
+            position = f.tell()
+            f.seek(struct.unpack(byte_order + "I", value_field)[0])
+            icc_profile = __read_exactly(f, count)
+            f.seek(position)
+        elif tag in (_TIFF_WIDTH, _TIFF_HEIGHT, _TIFF_BITS_PER_SAMPLE, _TIFF_PHOTOMETRIC, _TIFF_SAMPLES_PER_PIXEL,
+                     _TIFF_SAMPLE_FORMAT):
+            tags[tag] = __tiff_values(f, byte_order, field_type, count, value_field)
+    if _TIFF_WIDTH not in tags or _TIFF_HEIGHT not in tags:
+        raise ValueError("TIFF without ImageWidth/ImageLength")
+    samples = tags.get(_TIFF_SAMPLES_PER_PIXEL, (1,))[0]
+    bits = tags.get(_TIFF_BITS_PER_SAMPLE, (1,))[0]
+    photometric = tags.get(_TIFF_PHOTOMETRIC, (1,))[0]
+    sample_format = tags.get(_TIFF_SAMPLE_FORMAT, (1,))[0]
+    mode = __tiff_mode(photometric, samples, bits, sample_format, byte_order)
+    return ImageHeader("tiff", tags[_TIFF_WIDTH][0], tags[_TIFF_HEIGHT][0], bits, samples, mode, icc_profile)
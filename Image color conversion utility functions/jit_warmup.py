@@ -0,0 +1,102 @@
+"""
+Ahead of time compilation of the njit kernels of the ColorConversion functions
+
+All kernels are decorated with cache=True, compiling the signatures below once (e.g. after installation)
+fills numba's on-disk cache so short lived scripts load the machine code instead of compiling on first call.
+Other argument types still compile lazily.
+
+usage:
+    python -m ImageAnalysis.ColorConversion.jit_warmup
+
+If the package directory is not writable set NUMBA_CACHE_DIR to a writable directory.
+"""
+import time
+from numba import types
+from . import XYZ_conversions
+from . import adobe_conversions
+from . import hsv_conversions
+from . import lab_conversions
+from . import rgb_conversions
+from . import sRGB_conversions
+from . import COLORCONVERSION_LOGGER
+
+FLOAT_TYPES = (types.float32, types.float64)
+INT_TYPES = (types.uint8, types.uint16)
+
+
+def __image(dtype: types.Type, ndim: int = 3) -> types.Array:
+    """C contiguous array type
+
+    :param dtype: numba scalar type
+    :type dtype: types.Type
+    :param ndim: number of dimensions, defaults to 3
+    :type ndim: int, optional
+    :return: array type
+    :rtype: types.Array
+    """
+    return types.Array(dtype, ndim, "C")
+
+
+def __float_image_signatures(ndim: int = 3) -> list[tuple]:
+    """signatures of kernels taking one float32/float64 image
+
+    :param ndim: number of dimensions, defaults to 3
+    :type ndim: int, optional
+    :return: list of argument type tuples
+    :rtype: list[tuple]
+    """
+    return [(__image(dtype, ndim),) for dtype in FLOAT_TYPES]
+
+
+def kernel_signatures() -> list[tuple[object, list[tuple]]]:
+    """the njit kernels with the argument types they get from the public conversion functions
+
+    :return: list of (dispatcher, list of argument type tuples)
+    :rtype: list[tuple[object, list[tuple]]]
+    """
+    image_kernels = [sRGB_conversions.sRGB_add_gamma,
+                     sRGB_conversions.sRGB_remove_gamma,
+                     getattr(sRGB_conversions, "__sRGB_to_xyz_mat_mult"),
+                     getattr(XYZ_conversions, "__xyz_to_sRGB_numba"),
+                     getattr(XYZ_conversions, "__xyz_to_adobeRGB_numba"),
+                     getattr(XYZ_conversions, "__xyz_to_lab_numba"),
+                     XYZ_conversions.xyz_to_melanin,
+                     XYZ_conversions.xyz_to_hemoglobine,
+                     adobe_conversions.adobe_add_gamma,
+                     getattr(hsv_conversions, "__hsv_to_rgb"),
+                     lab_conversions.lab_to_xyz,
+                     rgb_conversions.rgb_to_gray_image,
+                     getattr(rgb_conversions, "__convert_RGB_to_HSV_numba")]
+    signatures = [(kernel, __float_image_signatures()) for kernel in image_kernels]
+    signatures.append((getattr(XYZ_conversions, "__xyz_to_xyY_numba"), __float_image_signatures(2)))
+    # called without white point, the default is compiled in as omitted argument
+    signatures.append((XYZ_conversions.xyz_to_wio, [(__image(dtype, 2), types.Omitted(XYZ_conversions.white_point_D65))
+                                                    for dtype in FLOAT_TYPES]))
+    signatures.append((getattr(adobe_conversions, "__adobe_to_xyz_matrix_mult"), __float_image_signatures(2)))
+    signatures.append((getattr(XYZ_conversions, "__xyz_to_cct_kernel"),
+                       [(__image(types.float64, 2), __image(types.float64, 1))]))
+    signatures.append((getattr(sRGB_conversions, "__sRGB_to_lab_lut_kernel"),
+                       [(__image(in_type), __image(types.float64, 1), __image(out_type))
+                        for in_type in INT_TYPES for out_type in FLOAT_TYPES]))
+    signatures.append((getattr(sRGB_conversions, "__sRGB_to_lab_float_kernel"),
+                       [(__image(in_type), __image(out_type)) for in_type in FLOAT_TYPES for out_type in FLOAT_TYPES]))
+    return signatures
+
+
+def warm_up() -> float:
+    """compiles every kernel signature, loads from the on-disk cache when already compiled
+
+    :return: time needed in s
+    :rtype: float
+    """
+    start = time.perf_counter()
+    for kernel, signatures in kernel_signatures():
+        for signature in signatures:
+            kernel.compile(signature)
+    duration = time.perf_counter() - start
+    COLORCONVERSION_LOGGER.info("Compiled njit kernels in %.2f s" % duration)
+    return duration
+
+
+if __name__ == "__main__":
+    print("Compiled njit kernels in %.2f s" % warm_up())
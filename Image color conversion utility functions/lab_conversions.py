@@ -3,7 +3,7 @@ import numba as nb
 from . import XYZ_conversions
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def lab_to_xyz(image: np.ndarray) -> np.ndarray:
     """converts lab to xyz
 
@@ -27,7 +27,6 @@ def lab_to_xyz(image: np.ndarray) -> np.ndarray:
     return xyz_image
 
 
-@nb.njit(fastmath=True)
 def lab_to_srgb(image: np.ndarray) -> np.ndarray:
     """converts lab to srgb 0-1 via xyz
 
@@ -39,7 +38,7 @@ def lab_to_srgb(image: np.ndarray) -> np.ndarray:
     return XYZ_conversions.xyz_to_sRGB(lab_to_xyz(image))
 
 
-@nb.njit(fastmath=True)
+@nb.njit(fastmath=True, nogil=True, cache=True)
 def __lab_to_xyz_f_function(t_value: float) -> float:
     """function needed to calc xyz values
 
@@ -1,8 +1,9 @@
 import numpy as np
 from numba import njit
+from . import vectorized_conversions
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def rgb_to_gray_image(img: np.ndarray) -> np.ndarray:
     """transforms rgb to gray image
 
@@ -24,37 +25,53 @@ def rgb_to_gray_image(img: np.ndarray) -> np.ndarray:
     return new_img
 
 
-@njit(fastmath=True)
-def convert_RGB_to_HSV(image_array: np.ndarray) -> np.ndarray:
+def convert_RGB_to_HSV(image_array: np.ndarray, engine: str = "numba") -> np.ndarray:
     """converts an image from RGB to HSV colorspace, expects 0-1 values
 
+    :param image_array: image in in 0-1
+    :type image_array: ndarray
+    :param engine: "numba" (njit sector kernel) or "vectorized" (numpy whole array), defaults to "numba"
+    :type engine: str, optional
+    :raises ValueError: unknown engine
+    :return: image in HSV colorspace
+    :rtype: ndarray
+    """
+    if engine == "numba":
+        return __convert_RGB_to_HSV_numba(image_array)
+    if engine == "vectorized":
+        return vectorized_conversions.rgb_to_hsv(image_array)
+    raise ValueError("Unknown engine %s, use numba or vectorized" % engine)
+
+
+@njit(fastmath=True, nogil=True, cache=True)
+def __convert_RGB_to_HSV_numba(image_array: np.ndarray) -> np.ndarray:
+    """converts an image from RGB to HSV colorspace, expects 0-1 values, njit boosted.
+    Reads the channels as scalars and picks the hue formula from the sector of the max channel (r, g, b in that order)
+
     :param image_array: image in in 0-1
     :type image_array: ndarray
     :return: image in HSV colorspace
     :rtype: ndarray
     """
     new_image = np.zeros_like(image_array)
-    # iterate over each pixel
-    for index in np.ndindex(image_array.shape[:2]):
-        c_min = np.min(image_array[index])
-        c_max = np.max(image_array[index])
-        delta = c_max - c_min  # chroma
-        if delta != 0:
-            # get R/G/B
-            r_value = image_array[index][0]
-            g_value = image_array[index][1]
-            b_value = image_array[index][2]
-            # calc and set H Value
-            if c_max == r_value:
-                new_image[index][0] = np.mod(
-                    60 * (g_value - b_value) / delta, 360)
-            elif c_max == g_value:
-                new_image[index][0] = 60 * (b_value - r_value) / delta + 120
-            elif c_max == b_value:
-                new_image[index][0] = 60 * (r_value - g_value) / delta + 240
-        # calc and set V value
-        new_image[index][2] = c_max
-        # calc and set S value
-        if c_max != 0:
-            new_image[index][1] = delta / c_max
+    for row in range(image_array.shape[0]):
+        for col in range(image_array.shape[1]):
+            r_value = image_array[row, col, 0]
+            g_value = image_array[row, col, 1]
+            b_value = image_array[row, col, 2]
+            c_max = max(r_value, g_value, b_value)
+            delta = c_max - min(r_value, g_value, b_value)  # chroma
+            if delta != 0:
+                # calc and set H Value
+                if c_max == r_value:
+                    new_image[row, col, 0] = np.mod(60 * (g_value - b_value) / delta, 360)
+                elif c_max == g_value:
+                    new_image[row, col, 0] = 60 * (b_value - r_value) / delta + 120
+                else:
+                    new_image[row, col, 0] = 60 * (r_value - g_value) / delta + 240
+            # calc and set S value
+            if c_max != 0:
+                new_image[row, col, 1] = delta / c_max
+            # calc and set V value
+            new_image[row, col, 2] = c_max
     return new_image
@@ -3,6 +3,7 @@ from numba import njit
 from . import helper_functions
 from . import XYZ_conversions
 from . import rgb_conversions
+from . import vectorized_conversions
 
 # inverse of XYZTosRGBArray
 sRGB_to_XYZ_array = np.array([[0.41239557, 0.21258622, 0.01929721],
@@ -66,6 +67,33 @@ def sRGB_to_lab(image_numpy: np.ndarray) -> np.ndarray:
     return XYZ_conversions.xyz_to_lab(lab_image)
 
 
+def sRGB_to_lab_fused(image_numpy: np.ndarray, dtype: type = np.float32) -> np.ndarray:
+    """converts an array from sRGB to CIELAB colorspace in one pass without intermediate arrays
+    (rescaling, gamma removal, XYZ matrix and lab transform are fused in one njit pass over the pixels)
+
+    :param image_numpy: image in uint8/uint16 or 0-1 to convert
+    :type image_numpy: ndarray
+    :param dtype: output data type, np.float32 or np.float64, defaults to np.float32
+    :type dtype: type, optional
+    :raises ValueError: float image with values outside 0-1 or unsupported dtype
+    :return: converted array
+    :rtype: ndarray
+    """
+    if np.dtype(dtype) not in (np.dtype(np.float32), np.dtype(np.float64)):
+        raise ValueError("Only float32/float64 output is implemented")
+    lab_image = np.empty(image_numpy.shape, dtype=dtype)
+    if vectorized_conversions.is_lut_dtype(image_numpy):
+        # uint8/uint16 codes index straight into the linear values
+        gamma_lut = vectorized_conversions.sRGB_remove_gamma(
+            vectorized_conversions.normalisation_lut(image_numpy.dtype.name).astype(np.float64)).clip(0, 1)
+        __sRGB_to_lab_lut_kernel(image_numpy, gamma_lut, lab_image)
+    elif np.issubdtype(image_numpy.dtype, np.floating):
+        __sRGB_to_lab_float_kernel(image_numpy, lab_image)
+    else:
+        raise ValueError("Array type %s is not supported, use uint8/uint16 or float 0-1" % str(image_numpy.dtype))
+    return lab_image
+
+
 def sRGB_to_adobe(image_numpy: np.ndarray) -> np.ndarray:
     """converts an array from sRGB to AdobeRGB
 
@@ -80,7 +108,7 @@ def sRGB_to_adobe(image_numpy: np.ndarray) -> np.ndarray:
     return XYZ_conversions.xyz_to_adobeRGB(xyz)
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def sRGB_add_gamma(image: np.ndarray) -> np.ndarray:
     """adds gamma to sRGB image, njit boosted
 
@@ -99,7 +127,7 @@ def sRGB_add_gamma(image: np.ndarray) -> np.ndarray:
     return x_out
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
 def sRGB_remove_gamma(image: np.ndarray) -> np.ndarray:
     """removes gamma from sRGB image, njit boosted
 
@@ -118,7 +146,84 @@ def sRGB_remove_gamma(image: np.ndarray) -> np.ndarray:
     return x_out
 
 
-@njit(fastmath=True)
+@njit(fastmath=True, nogil=True, cache=True)
+def __sRGB_remove_gamma_value(value: float) -> float:
+    """removes gamma from one sRGB value and clips to 0-1, njit boosted
+
+    :param value: value in 0-1
+    :type value: float
+    :return: value without gamma
+    :rtype: float
+    """
+    if value <= 0.04045:
+        value = value / 12.92
+    else:
+        value = ((value + 0.055) / 1.055) ** 2.4
+    return min(max(value, 0.0), 1.0)
+
+
+@njit(fastmath=True, nogil=True, cache=True)
+def __linear_sRGB_to_lab_pixel(r_value: float, g_value: float, b_value: float) -> tuple[float, float, float]:
+    """converts one linear sRGB pixel via XYZ to lab, njit boosted
+
+    :param r_value: linear red value in 0-1
+    :type r_value: float
+    :param g_value: linear green value in 0-1
+    :type g_value: float
+    :param b_value: linear blue value in 0-1
+    :type b_value: float
+    :return: (L, a, b)
+    :rtype: tuple[float, float, float]
+    """
+    matrix = sRGB_to_XYZ_array
+    f_x = XYZ_conversions.__xyz_to_lab_f_function(
+        (r_value * matrix[0, 0] + g_value * matrix[1, 0] + b_value * matrix[2, 0]) / XYZ_conversions.Xn)
+    f_y = XYZ_conversions.__xyz_to_lab_f_function(
+        (r_value * matrix[0, 1] + g_value * matrix[1, 1] + b_value * matrix[2, 1]) / XYZ_conversions.Yn)
+    f_z = XYZ_conversions.__xyz_to_lab_f_function(
+        (r_value * matrix[0, 2] + g_value * matrix[1, 2] + b_value * matrix[2, 2]) / XYZ_conversions.Zn)
+    return 116 * f_y - 16, 500 * (f_x - f_y), 200 * (f_y - f_z)
+
+
+@njit(fastmath=True, nogil=True, cache=True)
+def __sRGB_to_lab_lut_kernel(image: np.ndarray, gamma_lut: np.ndarray, lab_image: np.ndarray) -> None:
+    """fused sRGB to lab conversion of an uint8/uint16 image writing into lab_image, njit boosted
+
+    :param image: image as uint8/uint16
+    :type image: ndarray
+    :param gamma_lut: linear value (0-1) for every integer code
+    :type gamma_lut: ndarray
+    :param lab_image: preallocated output with same shape as image
+    :type lab_image: ndarray
+    """
+    for row in range(image.shape[0]):
+        for col in range(image.shape[1]):
+            lab_image[row, col, 0], lab_image[row, col, 1], lab_image[row, col, 2] = __linear_sRGB_to_lab_pixel(
+                gamma_lut[image[row, col, 0]], gamma_lut[image[row, col, 1]], gamma_lut[image[row, col, 2]])
+
+
+@njit(fastmath=True, nogil=True, cache=True)
+def __sRGB_to_lab_float_kernel(image: np.ndarray, lab_image: np.ndarray) -> None:
+    """fused sRGB to lab conversion of a 0-1 float image writing into lab_image, njit boosted
+
+    :param image: image in 0-1
+    :type image: ndarray
+    :param lab_image: preallocated output with same shape as image
+    :type lab_image: ndarray
+    :raises ValueError: values outside 0-1
+    """
+    for row in range(image.shape[0]):
+        for col in range(image.shape[1]):
+            r_value = image[row, col, 0]
+            g_value = image[row, col, 1]
+            b_value = image[row, col, 2]
+            if min(r_value, g_value, b_value) < 0 or max(r_value, g_value, b_value) > 1:
+                raise ValueError("Values are not between 0-1 after rescaling, image type could be float!")
+            lab_image[row, col, 0], lab_image[row, col, 1], lab_image[row, col, 2] = __linear_sRGB_to_lab_pixel(
+                __sRGB_remove_gamma_value(r_value), __sRGB_remove_gamma_value(g_value), __sRGB_remove_gamma_value(b_value))
+
+
+@njit(fastmath=True, nogil=True, cache=True)
 def __sRGB_to_xyz_mat_mult(image: np.ndarray) -> np.ndarray:
     """converts sRGB to XYZ format, njit boosted
 
@@ -0,0 +1,72 @@
+"""
+Tiled execution of ColorConversion functions, splits an image into row bands and converts them in parallel
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+import numpy as np
+
+# default number of rows per band, a 6000 px wide float64 rgb band is ~37 MB
+DEFAULT_BAND_ROWS = 256
+
+
+def iter_bands(height: int, band_rows: int = DEFAULT_BAND_ROWS) -> Iterable[slice]:
+    """yields the row slices of the bands of an image
+
+    :param height: number of rows of the image
+    :type height: int
+    :param band_rows: rows per band, defaults to DEFAULT_BAND_ROWS
+    :type band_rows: int, optional
+    :yield: row slice of the next band
+    :rtype: Generator[slice]
+    """
+    if band_rows < 1:
+        raise ValueError("band_rows must be >= 1")
+    for start in range(0, height, band_rows):
+        yield slice(start, min(start + band_rows, height))
+
+
+def run_tiled(conversion: Callable, image: np.ndarray, band_rows: int = DEFAULT_BAND_ROWS, workers: Optional[int] = None,
+              out: Optional[np.ndarray] = None, **kwargs) -> np.ndarray:
+    """runs a conversion (e.g. sRGB_conversions.sRGB_to_lab) band by band on a thread pool.
+    The numpy and njit (nogil) kernels release the GIL, so the bands run on all cores.
+    Only 2 * workers bands are in flight at a time, peak memory is the output plus a few bands,
+    the image may also be a np.memmap of a file that does not fit in RAM
+
+    :param conversion: function converting an image (rows, width, channels) pixel wise
+    :type conversion: Callable
+    :param image: image to convert
+    :type image: ndarray
+    :param band_rows: rows per band, defaults to DEFAULT_BAND_ROWS
+    :type band_rows: int, optional
+    :param workers: number of threads, defaults to None (os.cpu_count())
+    :type workers: int, optional
+    :param out: preallocated output array (e.g. np.lib.format.open_memmap), defaults to None
+    :type out: ndarray, optional
+    :param kwargs: passed on to the conversion
+    :return: converted image
+    :rtype: ndarray
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    bands = list(iter_bands(image.shape[0], band_rows))
+    if not bands:
+        return conversion(image, **kwargs)
+    # first band defines output shape and dtype
+    first = conversion(image[bands[0]], **kwargs)
+    if out is None:
+        out = np.empty((image.shape[0],) + first.shape[1:], dtype=first.dtype)
+    out[bands[0]] = first
+    del first
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for band in bands[1:]:
+            in_flight.append((band, executor.submit(conversion, image[band], **kwargs)))
+            if len(in_flight) >= 2 * workers:
+                done_band, future = in_flight.popleft()
+                out[done_band] = future.result()
+        while in_flight:
+            done_band, future = in_flight.popleft()
+            out[done_band] = future.result()
+    return out
@@ -0,0 +1,254 @@
+"""
+Whole-array engine for ColorConversion functions, uses matrix multiplications over (H*W, 3) views
+and precomputed lookup tables instead of per pixel loops
+"""
+from functools import lru_cache
+import numpy as np
+from . import XYZ_conversions
+
+
+@lru_cache(maxsize=None)
+def normalisation_lut(dtype_name: str) -> np.ndarray:
+    """lookup table mapping every uint8/uint16 code to 0-1
+
+    :param dtype_name: name of the integer data type, uint8 or uint16
+    :type dtype_name: str
+    :return: lookup table with one float32 entry per code
+    :rtype: ndarray
+    """
+    max_value = np.iinfo(dtype_name).max
+    return (np.arange(max_value + 1, dtype=np.float64) / max_value).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def sRGB_remove_gamma_lut(dtype_name: str) -> np.ndarray:
+    """lookup table removing the sRGB gamma from every uint8/uint16 code
+
+    :param dtype_name: name of the integer data type, uint8 or uint16
+    :type dtype_name: str
+    :return: lookup table with the linear value (0-1) of every code
+    :rtype: ndarray
+    """
+    return sRGB_remove_gamma(normalisation_lut(dtype_name).astype(np.float64)).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def lab_f_lut(dtype_name: str, white_value: float) -> np.ndarray:
+    """lookup table of the lab f() function for every uint8/uint16 code of one XYZ channel
+
+    :param dtype_name: name of the integer data type, uint8 or uint16
+    :type dtype_name: str
+    :param white_value: white point value of the channel (Xn, Yn or Zn)
+    :type white_value: float
+    :return: lookup table with f(code / max / white_value)
+    :rtype: ndarray
+    """
+    return lab_f_function(normalisation_lut(dtype_name).astype(np.float64) / white_value).astype(np.float32)
+
+
+def is_lut_dtype(image: np.ndarray) -> bool:
+    """checks if the image can be indexed into the lookup tables
+
+    :param image: image to check
+    :type image: ndarray
+    :return: True for uint8 and uint16 images
+    :rtype: bool
+    """
+    return image.dtype.type is np.uint8 or image.dtype.type is np.uint16
+
+
+def to_float(image: np.ndarray) -> np.ndarray:
+    """converts uint8/uint16 images to float32 0-1 via lookup table, float images are returned unchanged
+
+    :param image: image to convert
+    :type image: ndarray
+    :return: float image
+    :rtype: ndarray
+    """
+    if is_lut_dtype(image):
+        return normalisation_lut(image.dtype.name)[image]
+    return image
+
+
+def sRGB_add_gamma(image: np.ndarray) -> np.ndarray:
+    """adds gamma to sRGB image, whole-array version of sRGB_conversions.sRGB_add_gamma
+
+    :param image: image in 0-1
+    :type image: ndarray
+    :return: image with gamma
+    :rtype: ndarray
+    """
+    linear = image * 12.92
+    curved = 1.055 * np.power(np.maximum(image, 0.0031308).astype(np.float64), 1.0 / 2.4) - 0.055
+    return np.where(image <= 0.0031308, linear, curved).astype(image.dtype)
+
+
+def sRGB_remove_gamma(image: np.ndarray) -> np.ndarray:
+    """removes gamma from sRGB image, whole-array version of sRGB_conversions.sRGB_remove_gamma,
+    uint8/uint16 images are indexed into a lookup table
+
+    :param image: image in 0-1 or as uint8/uint16
+    :type image: ndarray
+    :return: image without gamma
+    :rtype: ndarray
+    """
+    if is_lut_dtype(image):
+        return sRGB_remove_gamma_lut(image.dtype.name)[image]
+    linear = image / 12.92
+    curved = np.power((np.maximum(image, 0.04045).astype(np.float64) + 0.055) / 1.055, 2.4)
+    return np.where(image <= 0.04045, linear, curved).astype(image.dtype)
+
+
+def lab_f_function(t_value: np.ndarray) -> np.ndarray:
+    """function needed to calculate lab values, whole-array version. Source: http://www.brucelindbloom.com/index.html?Eqn_RGB_XYZ_Matrix.html
+
+    :param t_value: target values to run function on
+    :type t_value: ndarray
+    :return: calculated values
+    :rtype: ndarray
+    """
+    epsilon = 0.008856
+    k = 903.3
+    return np.where(t_value > epsilon, np.cbrt(t_value), (k * t_value + 16) / 116)
+
+
+def matrix_mult(image: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """multiplies every pixel with a 3x3 matrix in one call over a (H*W, 3) view
+
+    :param image: image with 3 channels in the last axis
+    :type image: ndarray
+    :param matrix: matrix to multiply with (pixel.dot(matrix))
+    :type matrix: ndarray
+    :return: converted image in float32 with the same shape
+    :rtype: ndarray
+    """
+    shape = image.shape
+    pixels = image.reshape(-1, 3).astype(np.float32, copy=False)
+    return np.matmul(pixels, matrix).reshape(shape)
+
+
+def xyz_to_sRGB(image: np.ndarray) -> np.ndarray:
+    """converts xyz to sRGB 0-1
+
+    :param image: xyz image
+    :type image: ndarray
+    :return: sRGB image
+    :rtype: ndarray
+    """
+    image = to_float(image)
+    sRGB_image = matrix_mult(image, XYZ_conversions.XYZ_To_sRGB_Array).astype(image.dtype, copy=False)
+    return sRGB_add_gamma(sRGB_image)
+
+
+def xyz_to_adobeRGB(image: np.ndarray) -> np.ndarray:
+    """converts xyz to adobe RGB 0-1
+
+    :param image: xyz image
+    :type image: ndarray
+    :return: adobe RGB image in float64 like the numba engine
+    :rtype: ndarray
+    """
+    image = to_float(image)
+    adobe_image = matrix_mult(image, XYZ_conversions._xyz_to_adobeRGB_array).astype(image.dtype, copy=False)
+    # numba computes the power of float32 arrays in float64
+    return np.power(adobe_image.astype(np.float64), 256/563)
+
+
+def xyz_to_xyY(xyz_image: np.ndarray) -> np.ndarray:
+    """converts an array from xyz to xyY
+
+    :param xyz_image: array to convert
+    :type xyz_image: ndarray
+    :return: converted array
+    :rtype: ndarray
+    """
+    xyz_image = to_float(xyz_image)
+    xyz_sum = xyz_image.sum(axis=-1)
+    valid = xyz_sum > 0
+    safe_sum = np.where(valid, xyz_sum, 1)
+    xyY_image = np.empty_like(xyz_image)
+    xyY_image[..., 0] = np.where(valid, xyz_image[..., 0] / safe_sum, XYZ_conversions.white_point_D65[0])
+    xyY_image[..., 1] = np.where(valid, xyz_image[..., 1] / safe_sum, XYZ_conversions.white_point_D65[1])
+    xyY_image[..., 2] = xyz_image[..., 1]
+    return xyY_image
+
+
+def xyz_to_lab(image: np.ndarray) -> np.ndarray:
+    """converts an xyz image to lab, uint8/uint16 images are indexed into f() lookup tables.
+    Source: http://www.brucelindbloom.com/index.html?Eqn_RGB_XYZ_Matrix.html
+
+    :param image: xyz image
+    :type image: ndarray
+    :return: lab image
+    :rtype: ndarray
+    """
+    if is_lut_dtype(image):
+        f_x = lab_f_lut(image.dtype.name, XYZ_conversions.Xn)[image[..., 0]]
+        f_y = lab_f_lut(image.dtype.name, XYZ_conversions.Yn)[image[..., 1]]
+        f_z = lab_f_lut(image.dtype.name, XYZ_conversions.Zn)[image[..., 2]]
+        lab_image = np.empty(image.shape, dtype=np.float32)
+    else:
+        f_x = lab_f_function(image[..., 0] / XYZ_conversions.Xn)
+        f_y = lab_f_function(image[..., 1] / XYZ_conversions.Yn)
+        f_z = lab_f_function(image[..., 2] / XYZ_conversions.Zn)
+        lab_image = np.empty_like(image)
+    lab_image[..., 0] = 116 * f_y - 16
+    lab_image[..., 1] = 500 * (f_x - f_y)
+    lab_image[..., 2] = 200 * (f_y - f_z)
+    return lab_image
+
+
+def rgb_to_hsv(image: np.ndarray) -> np.ndarray:
+    """converts an image from RGB to HSV colorspace (H 0-360, S and V 0-1) using the sector of the max channel,
+    whole-array version of rgb_conversions.convert_RGB_to_HSV
+
+    :param image: image in 0-1
+    :type image: ndarray
+    :return: image in HSV colorspace
+    :rtype: ndarray
+    """
+    # the types of the njit kernel: differences and S in the input dtype, the hue formula in float64 (numba promotes
+    # 60 * float32 to float64), result in the input dtype
+    hsv_image = np.empty_like(image)
+    r_value = image[..., 0]
+    g_value = image[..., 1]
+    b_value = image[..., 2]
+    c_max = image.max(axis=-1)
+    delta = c_max - image.min(axis=-1)
+    safe_delta = np.where(delta != 0, delta, 1).astype(np.float64)
+    hue = np.select([r_value == c_max, g_value == c_max],
+                    [np.mod(60 * (g_value - b_value).astype(np.float64) / safe_delta, 360),
+                     60 * (b_value - r_value).astype(np.float64) / safe_delta + 120],
+                    60 * (r_value - g_value).astype(np.float64) / safe_delta + 240)
+    hsv_image[..., 0] = np.where(delta != 0, hue, 0)
+    hsv_image[..., 1] = np.where(c_max != 0, delta / np.where(c_max != 0, c_max, 1), 0)
+    hsv_image[..., 2] = c_max
+    return hsv_image
+
+
+def hsv_to_rgb(image: np.ndarray) -> np.ndarray:
+    """converts from hsv (H 0-360, S and V 0-1) to rgb 0-1 by choosing the channel order from the 60 degree sector,
+    whole-array version of hsv_conversions.__hsv_to_rgb
+
+    :param image: image as hsv
+    :type image: ndarray
+    :raises ValueError: H out of range
+    :return: image as rgb
+    :rtype: ndarray
+    """
+    # the types of the njit kernel: C and m in the input dtype, X and the sums in float64 (numba promotes H / 60 to
+    # float64), result in the input dtype
+    rgb_image = np.empty_like(image)
+    hue = image[..., 0].astype(np.float64)
+    if np.any((hue < 0) | (hue >= 360)):
+        raise ValueError("H out of range should be 0-360")
+    chroma = image[..., 2] * image[..., 1]
+    m_value = image[..., 2] - chroma
+    chroma = chroma.astype(np.float64)
+    second = chroma * (1 - np.absolute((hue / 60) % 2 - 1))
+    zero = np.zeros_like(chroma)
+    sector = (hue // 60).astype(np.intp)
+    rgb_image[..., 0] = np.choose(sector, [chroma, second, zero, zero, second, chroma]) + m_value
+    rgb_image[..., 1] = np.choose(sector, [second, chroma, chroma, second, zero, zero]) + m_value
+    rgb_image[..., 2] = np.choose(sector, [zero, zero, second, chroma, chroma, second]) + m_value
+    return rgb_image
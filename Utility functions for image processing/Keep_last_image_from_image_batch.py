@@ -14,8 +14,8 @@ Key functionalities:
 import os
 import inspect
 import logging
-import re
 import Util
+import Barcode
 import shutil
 from typing import List, Optional
 
@@ -43,6 +43,9 @@ study_areaInd = 1
 study_timeInd = 2
 study_restNameInd = 3
 
+# compiled once, results cached per file name
+BASEFILE_PARSER = Barcode.BarcodeParser(REGEX_PTRN, fields=("subj_int", "area_int", "visit_int", "imnr_int"))
+
 def getDataFromBasefile(filename: str, fullfile: str) -> Optional[List]:
     """
     Extracts metadata from a filename using a regex pattern.
@@ -51,18 +54,10 @@ def getDataFromBasefile(filename: str, fullfile: str) -> Optional[List]:
     :param fullfile: Full file path.
     :return: List of extracted metadata [subject ID, area, visit, image number, filename, fullfile], or None if regex doesn't match.
     """
-    fileformat = re.compile(REGEX_PTRN)
-    match = fileformat.search(filename)
-    if match is None:
+    values = BASEFILE_PARSER.parse(filename)
+    if values is None:
         return None
-    return [
-        int(match.group("subj_int")),
-        int(match.group("area_int")),
-        int(match.group("visit_int")),
-        int(match.group("imnr_int")),
-        filename,
-        fullfile,
-    ]
+    return [int(value) for value in values] + [filename, fullfile]
 
 
 def process_files(raw_path: str, output_path: str, output_path_wrong: str, extensions: List[str]) -> None:
@@ -103,25 +98,14 @@ def process_files(raw_path: str, output_path: str, output_path_wrong: str, exten
         # Process files into superseeded and keep lists
         superseeded_files = []
         keep_files = []
-        volumes = set(x[study_subjInd] for x in file_data)
-        areas = set(x[study_areaInd] for x in file_data)
-        time_list = set(x[study_timeInd] for x in file_data)
-
-        for vol in volumes:
-            for area in areas:
-                for time in time_list:
-                    relevant_data = [
-                        x
-                        for x in file_data
-                        if x[study_subjInd] == vol
-                        and x[study_areaInd] == area
-                        and x[study_timeInd] == time
-                    ]
-                    if len(relevant_data) > 1:
-                        relevant_data.sort(key=lambda x: x[study_restNameInd])
-                        superseeded_files.extend([x[-1] for x in relevant_data[:-1]])
-                    elif relevant_data:
-                        keep_files.append(relevant_data[-1][-1])
+        groups = Util.FileGroupIndex(file_data, lambda x: (x[study_subjInd], x[study_areaInd], x[study_timeInd]))
+
+        for key, relevant_data in groups.items(sort=True):
+            if len(relevant_data) > 1:
+                relevant_data = sorted(relevant_data, key=lambda x: x[study_restNameInd])
+                superseeded_files.extend([x[-1] for x in relevant_data[:-1]])
+            else:
+                keep_files.append(relevant_data[-1][-1])
 
         # Move superseeded files to the output directory
         Util.createDirectory(output_path)